@@ -0,0 +1,126 @@
+"""
+Prefix autocomplete over recipe titles and ingredient names.
+
+Typeahead sends a request per keystroke, so suggestions come from a
+process-local ``PrefixIndex`` instead of the database. The index is a sorted
+list of normalized keys searched with ``bisect``; every word of a name gets
+its own key, so "pot" finds "Sweet Potato Mash" as well as "Potato Wedges".
+
+Like the planner's ``EligibilityIndex`` (see catalog.py) it is tagged with
+the catalog version and rebuilt once that version moves on. Lookups never
+touch the database: the version is read at most every
+``AUTOCOMPLETE_VERSION_CHECK_INTERVAL`` seconds, and catalog changes made
+in this process expire the index straight away (``expire_prefix_index``,
+called from signals.py). Other processes pick them up at their next check.
+"""
+import logging
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+from django.conf import settings
+
+from .catalog import get_catalog_version
+
+logger = logging.getLogger(__name__)
+
+RECIPE = "recipe"
+INGREDIENT = "ingredient"
+KINDS = (RECIPE, INGREDIENT)
+
+# How many matching keys a lookup inspects before ranking them
+MAX_SCAN = 500
+
+
+def normalize(text):
+    """Lower-case ``text``, strip accents and collapse whitespace, so "Crème" matches "creme"."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.split())
+
+
+class PrefixIndex:
+    """Sorted ``(key, word_position, label, kind, id)`` entries, one per word of each name."""
+
+    def __init__(self, version, names):
+        self.version = version
+        self.checked_at = time.monotonic()  # when the version was last confirmed current
+        entries = []
+        for kind, item_id, label in names:
+            words = normalize(label).split(" ")
+            for position in range(len(words)):
+                entries.append((" ".join(words[position:]), position, label, kind, item_id))
+        entries.sort()
+        self.entries = entries
+        self.keys = [entry[0] for entry in entries]
+
+    @classmethod
+    def build(cls, version):
+        from .models import Ingredient, Recipe
+
+        started = time.perf_counter()
+        names = [(RECIPE, recipe_id, title) for recipe_id, title in Recipe.objects.values_list("id", "title")]
+        names += [
+            (INGREDIENT, ingredient_id, name)
+            for ingredient_id, name in Ingredient.objects.values_list("id", "name")
+        ]
+        index = cls(version, names)
+        logger.info(
+            f"🔤 Built autocomplete index v{version}: {len(index.keys)} keys in {time.perf_counter() - started:.3f}s"
+        )
+        return index
+
+    def complete(self, prefix, kinds=KINDS, limit=10):
+        """
+        Up to ``limit`` ``{"type", "id", "label"}`` suggestions for ``prefix``.
+
+        Names that start with the prefix come before names where a later
+        word does; ties are broken alphabetically.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        matches = {}
+        start = bisect_left(self.keys, prefix)
+        for key, position, label, kind, item_id in self.entries[start:start + MAX_SCAN]:
+            if not key.startswith(prefix):
+                break
+            if kind in kinds:
+                rank = (position > 0, label.casefold())
+                if (kind, item_id) not in matches or rank < matches[kind, item_id][0]:
+                    matches[kind, item_id] = (rank, label)
+        best = sorted(matches.items(), key=lambda match: match[1][0])[:limit]
+        return [{"type": kind, "id": item_id, "label": label} for (kind, item_id), (_, label) in best]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_prefix_index():
+    """
+    Return the process-local index, rebuilding it if the catalog version moved on.
+
+    The version is only read once the index hasn't been checked for
+    ``AUTOCOMPLETE_VERSION_CHECK_INTERVAL`` seconds.
+    """
+    global _index
+    index = _index
+    interval = getattr(settings, "AUTOCOMPLETE_VERSION_CHECK_INTERVAL", 30)
+    if index is not None and time.monotonic() - index.checked_at < interval:
+        return index
+    version = get_catalog_version()
+    with _index_lock:
+        if _index is None or _index.version != version:
+            _index = PrefixIndex.build(version)
+        else:
+            _index.checked_at = time.monotonic()
+        return _index
+
+
+def expire_prefix_index():
+    """Make the next lookup check the catalog version, after a change made in this process."""
+    index = _index
+    if index is not None:
+        index.checked_at = float("-inf")
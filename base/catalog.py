@@ -0,0 +1,249 @@
+"""
+In-memory view of the recipe catalog used by the meal planner.
+
+The planner used to run one multi-join query per meal type every time a plan
+was generated. Instead we keep a process-local ``EligibilityIndex`` that maps
+meal types, ages, allergens and ingredients to recipe bitsets (plain Python
+ints, one bit per recipe), so finding candidate recipes is a handful of
+bitwise operations with no SQL at all.
+
+The index is tagged with the catalog version, a counter kept in the database
+(``CatalogVersion``) so every web worker and management command sees the
+same value. Any change to recipes, ingredients or meal types bumps that
+version (see signals.py) and the next lookup, in any process, rebuilds the
+index.
+
+Many children share the same constraints, so each index also memoizes the
+candidate pools it hands out in a small LRU/TTL cache keyed by a hash of the
+constraint signature. The pool cache lives on the index, so a catalog change
+throws it away together with the bitsets.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import F, Subquery
+
+from .dietary import ALLERGEN_BITS, allergy_bit
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_ID = 1
+
+
+def get_catalog_version():
+    """Return the current catalog version (one primary key lookup), creating the counter if needed."""
+    from .models import CatalogVersion
+
+    version = CatalogVersion.objects.filter(id=CATALOG_VERSION_ID).values_list("version", flat=True).first()
+    if version is None:
+        # Start from the clock, so a fresh database never reuses versions
+        # that shared cache entries may still be keyed on
+        version = CatalogVersion.objects.get_or_create(
+            id=CATALOG_VERSION_ID, defaults={"version": time.time_ns()}
+        )[0].version
+    return version
+
+
+def catalog_version_subquery():
+    """The catalog version as a subquery, for reading it in the same query as the rows that depend on it."""
+    from .models import CatalogVersion
+
+    return Subquery(CatalogVersion.objects.filter(id=CATALOG_VERSION_ID).values("version")[:1])
+
+
+def bump_catalog_version():
+    """Mark every catalog-derived structure as stale, in every process."""
+    from .models import CatalogVersion
+
+    if not CatalogVersion.objects.filter(id=CATALOG_VERSION_ID).update(version=F("version") + 1):
+        get_catalog_version()
+
+
+def parse_allergies(allergies):
+    """Split a child's comma-separated allergy string into clean allergen names."""
+    if not allergies:
+        return []
+    return [allergen.strip() for allergen in allergies.split(',') if allergen.strip()]
+
+
+def _to_bitset(positions, size):
+    buf = bytearray((size + 7) // 8)
+    for pos in positions:
+        buf[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(buf, "little")
+
+
+def bit_positions(mask):
+    """Positions of the bits set in ``mask``, lowest first."""
+    bits = bin(mask)[:1:-1]  # least significant bit first
+    positions = []
+    pos = bits.find("1")
+    while pos != -1:
+        positions.append(pos)
+        pos = bits.find("1", pos + 1)
+    return positions
+
+
+def constraint_signature(meal_type, age_months, allergies=(), dislikes=(), exclude_purees=False):
+    """Canonical hash of a candidate-pool query; the order of allergies and dislikes does not matter."""
+    canonical = "|".join([
+        meal_type,
+        str(age_months),
+        ",".join(sorted(set(allergies))),
+        ",".join(sorted(set(map(str, dislikes)))),
+        "1" if exclude_purees else "0",
+    ])
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class CandidatePoolCache:
+    """Thread-safe LRU cache with a per-entry time to live."""
+
+    def __init__(self, maxsize=1024, ttl=600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class EligibilityIndex:
+    """Recipe bitsets keyed by meal type, age in months, allergen bit (see dietary.py) and ingredient."""
+
+    def __init__(self, version, recipe_ids, meal_type_bits, age_bits, allergen_bits, ingredient_bits, puree_bits):
+        self.version = version
+        self.recipe_ids = recipe_ids
+        self.meal_type_bits = meal_type_bits
+        self.age_bits = age_bits
+        self.allergen_bits = allergen_bits
+        self.ingredient_bits = ingredient_bits
+        self.puree_bits = puree_bits
+        self.pool_cache = CandidatePoolCache(
+            maxsize=getattr(settings, 'CANDIDATE_POOL_CACHE_SIZE', 1024),
+            ttl=getattr(settings, 'CANDIDATE_POOL_CACHE_TTL', 600),
+        )
+
+    @classmethod
+    def build(cls, version):
+        from .models import Recipe, RecipeIngredient
+
+        started = time.perf_counter()
+        rows = list(
+            Recipe.objects.order_by("id").values_list(
+                "id", "min_age_months", "max_age_months", "is_puree", "allergen_mask"
+            )
+        )
+        recipe_ids = [row[0] for row in rows]
+        position = {recipe_id: pos for pos, recipe_id in enumerate(recipe_ids)}
+        size = len(recipe_ids)
+
+        max_age = max((row[2] for row in rows), default=0)
+        by_age = [[] for _ in range(max_age + 1)]
+        puree_positions = []
+        by_allergen = {}
+        for pos, (_, min_age, max_age_months, is_puree, recipe_allergens) in enumerate(rows):
+            for month in range(max(min_age, 0), max_age_months + 1):
+                by_age[month].append(pos)
+            if is_puree:
+                puree_positions.append(pos)
+            for bit in ALLERGEN_BITS.values():
+                if recipe_allergens & bit:
+                    by_allergen.setdefault(bit, []).append(pos)
+
+        by_meal_type = {}
+        meal_type_links = Recipe.meal_types.through.objects.values_list("recipe_id", "mealtype__name")
+        for recipe_id, meal_type in meal_type_links:
+            by_meal_type.setdefault(meal_type, []).append(position[recipe_id])
+
+        by_ingredient = {}
+        for recipe_id, ingredient_id in RecipeIngredient.objects.values_list("recipe_id", "ingredient_id"):
+            by_ingredient.setdefault(ingredient_id, []).append(position[recipe_id])
+
+        index = cls(
+            version=version,
+            recipe_ids=recipe_ids,
+            meal_type_bits={name: _to_bitset(p, size) for name, p in by_meal_type.items()},
+            age_bits=[_to_bitset(p, size) for p in by_age],
+            allergen_bits={bit: _to_bitset(p, size) for bit, p in by_allergen.items()},
+            ingredient_bits={ingredient_id: _to_bitset(p, size) for ingredient_id, p in by_ingredient.items()},
+            puree_bits=_to_bitset(puree_positions, size),
+        )
+        logger.info(f"📚 Built eligibility index v{version}: {size} recipes in {time.perf_counter() - started:.3f}s")
+        return index
+
+    def candidate_mask(self, meal_type, age_months, allergies=(), dislikes=(), exclude_purees=False):
+        """Bitset of recipes that fit the given meal type and child constraints."""
+        if age_months < 0 or age_months >= len(self.age_bits):
+            return 0
+        mask = self.meal_type_bits.get(meal_type, 0) & self.age_bits[age_months]
+        for allergen in allergies:
+            mask &= ~self.allergen_bits.get(allergy_bit(allergen), 0)
+        for ingredient_id in dislikes:
+            mask &= ~self.ingredient_bits.get(ingredient_id, 0)
+        if exclude_purees:
+            mask &= ~self.puree_bits
+        return mask
+
+    def candidates(self, meal_type, age_months, allergies=(), dislikes=(), exclude_purees=False):
+        """
+        Recipe ids that fit the given meal type and child constraints, in catalog order.
+
+        Pools are memoized by constraint signature, so the returned tuple is
+        shared between callers and must not be modified.
+        """
+        key = constraint_signature(meal_type, age_months, allergies, dislikes, exclude_purees)
+        pool = self.pool_cache.get(key)
+        if pool is None:
+            mask = self.candidate_mask(meal_type, age_months, allergies, dislikes, exclude_purees)
+            pool = tuple(self.recipe_ids[pos] for pos in bit_positions(mask))
+            self.pool_cache.set(key, pool)
+        return pool
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_eligibility_index():
+    """Return the process-local index, rebuilding it if the catalog version moved on."""
+    global _index
+    version = get_catalog_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _index_lock:
+        if _index is None or _index.version != version:
+            _index = EligibilityIndex.build(version)
+        return _index
@@ -0,0 +1,182 @@
+"""
+Data loading for the dashboard.
+
+The dashboard shows every child of the signed-in parent with their meal plan
+for one week: seven meals, four recipe slots each. Loading that lazily costs a
+query per child, per meal and per recipe slot, so ``load_dashboard_week``
+fetches everything up front in a fixed number of queries, however many
+children the family has:
+
+1. the children,
+2. their plans for the week,
+3. the plans' meals joined to the four recipes (id and title only).
+
+The rendered week grid of each plan is cached (``render_week_fragments``).
+The cache key carries the plan's ``updated_at``, so every write to a plan's
+meals must go through ``invalidate_week_fragment``; step 3 then only runs
+for plans whose grid is not cached. It also carries the catalog version,
+read from the database along with the plans in step 2, so a renamed recipe
+retires the grid in every process. The same version backs the ETag of the
+JSON week API (``week_etag``).
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch, prefetch_related_objects
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+from django.utils.timezone import now
+
+from .catalog import catalog_version_subquery
+from .models import Child, Meal, MealPlan
+
+RECIPE_SLOTS = ["breakfast", "lunch", "dinner", "snack"]
+
+
+def dashboard_meals():
+    """Meals with their recipe slots joined in, limited to the columns the week grid renders."""
+    recipe_fields = [f"{slot}__{field}" for slot in RECIPE_SLOTS for field in ("id", "title")]
+    return (
+        Meal.objects.select_related(*RECIPE_SLOTS)
+        .only("id", "day", "meal_plan_id", *recipe_fields)
+        .order_by("id")
+    )
+
+
+def load_dashboard_week(user, week_start, prefetch_meals=True):
+    """
+    Return ``(children, [(child, meal_plan_or_None), ...])`` for ``user`` and the week starting ``week_start``.
+
+    With ``prefetch_meals`` plans come with ``meals`` prefetched (see
+    ``dashboard_meals``), so the template can walk ``meal_plan.meals.all``
+    and the recipe titles without further queries. The dashboard view turns
+    it off and leaves meal loading to ``render_week_fragments``. Plans also
+    carry the current ``catalog_version``.
+    """
+    children = list(Child.objects.filter(parent=user).order_by("id"))
+    if not children:
+        return children, []
+
+    plans = MealPlan.objects.filter(child__in=children, start_date=week_start).annotate(
+        catalog_version=catalog_version_subquery()
+    )
+    if prefetch_meals:
+        plans = plans.prefetch_related(Prefetch("meals", queryset=dashboard_meals()))
+    plans_by_child = {plan.child_id: plan for plan in plans}
+    return children, [(child, plans_by_child.get(child.id)) for child in children]
+
+
+def meal_plan_version(meal_plan_id, updated_at, catalog_version):
+    """Opaque version of what a plan's week looks like: its meals plus the recipe titles they show."""
+    return f"{meal_plan_id}:{updated_at.timestamp()}:{catalog_version}"
+
+
+def week_fragment_key(meal_plan, week_offset):
+    # Links in the grid carry the week offset
+    version = meal_plan_version(meal_plan.pk, meal_plan.updated_at, meal_plan.catalog_version)
+    return f"dashboard:week:{version}:{week_offset}"
+
+
+def render_week_fragments(meal_plans, week_offset):
+    """
+    Return ``{meal_plan.pk: html}`` with the rendered week grid of each plan
+    (loaded by ``load_dashboard_week``).
+
+    Cached grids are fetched in one round trip; the meals of the remaining
+    plans are loaded in one query, rendered and stored for
+    ``DASHBOARD_FRAGMENT_CACHE_TIMEOUT`` seconds.
+    """
+    if not meal_plans:
+        return {}
+    keys = {plan.pk: week_fragment_key(plan, week_offset) for plan in meal_plans}
+    fragments = cache.get_many(keys.values())
+
+    misses = [plan for plan in meal_plans if keys[plan.pk] not in fragments]
+    if misses:
+        prefetch_related_objects(misses, Prefetch("meals", queryset=dashboard_meals()))
+        rendered = {
+            keys[plan.pk]: render_to_string("_meal_plan_week.html", {"meal_plan": plan, "week_offset": week_offset})
+            for plan in misses
+        }
+        cache.set_many(rendered, getattr(settings, "DASHBOARD_FRAGMENT_CACHE_TIMEOUT", 60 * 60 * 24))
+        fragments.update(rendered)
+
+    return {plan.pk: mark_safe(fragments[keys[plan.pk]]) for plan in meal_plans}
+
+
+def week_etag(meal_plan_id, updated_at, catalog_version):
+    """Strong ETag for the JSON week of a plan, derived from ``meal_plan_version``."""
+    version = meal_plan_version(meal_plan_id, updated_at, catalog_version)
+    return hashlib.blake2b(version.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def serialize_week(meal_plan):
+    """JSON-ready week of a plan whose ``meals`` were loaded with ``dashboard_meals``."""
+    days = []
+    for meal in meal_plan.meals.all():
+        slots = {}
+        for slot in RECIPE_SLOTS:
+            recipe = getattr(meal, slot)
+            slots[slot] = {"id": recipe.id, "title": recipe.title} if recipe else None
+        days.append({"day": meal.day, "meal_id": meal.id, "slots": slots})
+    return {
+        "child_id": meal_plan.child_id,
+        "meal_plan_id": meal_plan.pk,
+        "start_date": meal_plan.start_date.isoformat(),
+        "end_date": meal_plan.end_date.isoformat(),
+        "days": days,
+    }
+
+
+def update_meal_slot(user, meal_id, slot, recipe_id):
+    """
+    Point one recipe slot of one of ``user``'s meals at ``recipe_id`` (None clears it).
+
+    The slot's current recipe, which the plan's shopping list needs to
+    subtract (see shopping.py), is read under the write lock, so it is still
+    the one the UPDATE replaces. Ownership is checked by that read. Returns
+    False if the meal doesn't exist or belongs to someone else.
+    """
+    from .planner import write_transaction
+    from .shopping import apply_shopping_list_delta
+
+    if slot not in RECIPE_SLOTS:
+        raise ValueError(f"Unknown meal slot: {slot}")
+    with write_transaction():
+        meal = Meal.objects.select_for_update(of=("self",)).filter(
+            id=meal_id, meal_plan__child__parent=user
+        ).values_list("meal_plan_id", f"{slot}_id").first()
+        if meal is None:
+            return False
+        meal_plan_id, old_recipe_id = meal
+        Meal.objects.filter(pk=meal_id).update(**{f"{slot}_id": recipe_id})
+        MealPlan.objects.filter(pk=meal_plan_id).update(updated_at=now())
+        if old_recipe_id != recipe_id:
+            apply_shopping_list_delta(meal_plan_id, {old_recipe_id: -1, recipe_id: 1})
+    return True
+
+
+def slot_data(meal_id, day, slot, recipe, week_offset=0):
+    """What the dashboard needs to redraw one slot after a swap or removal."""
+    swap_url = (
+        f"{reverse('recipe_library')}?meal_type={slot}&swap=1&day={day}&week={week_offset}&meal_id={meal_id}"
+    )
+    return {
+        "meal_id": meal_id,
+        "day": day,
+        "meal_type": slot,
+        "week_offset": week_offset,
+        "recipe": {
+            "id": recipe.id,
+            "title": recipe.title,
+            "url": f"{reverse('recipe_detail', args=[recipe.id])}?from=dashboard",
+        } if recipe else None,
+        "swap_url": swap_url,
+    }
+
+
+def invalidate_week_fragment(meal_plan_id):
+    """Mark a plan's meals as changed, so its cached week grid is no longer used."""
+    MealPlan.objects.filter(pk=meal_plan_id).update(updated_at=now())
@@ -0,0 +1,112 @@
+"""
+Allergen and dietary summary stored on each Recipe.
+
+Which allergens a recipe contains, and whether it is vegetarian or vegan,
+follow from its ingredients. Deriving them on the fly means joining through
+RecipeIngredient to Ingredient for every recipe shown or filtered, so each
+Recipe keeps a precomputed copy instead:
+
+* ``allergen_mask``: one bit per allergen in ``ALLERGENS``,
+* ``is_vegetarian`` / ``is_vegan``: whether all of its ingredients are.
+
+``refresh_recipe_summaries`` recomputes them. It runs from the RecipeIngredient
+and Ingredient signals and at the end of upload_recipe_data.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bit positions are stored in the database: only ever append to this list.
+# Allergen types the list doesn't know about are recorded as "Other".
+ALLERGENS = [
+    "Dairy", "Eggs", "Fish", "Shellfish", "Molluscs", "Nuts", "Tree Nuts", "Peanuts", "Gluten",
+    "Soy", "Sesame", "Mustard", "Celery", "Lupin", "Sulphites", "Poultry", "Other",
+]
+OTHER_ALLERGEN = "Other"
+ALLERGEN_BITS = {name: 1 << position for position, name in enumerate(ALLERGENS)}
+_ALLERGEN_BITS_BY_LOWER_NAME = {name.lower(): bit for name, bit in ALLERGEN_BITS.items()}
+
+# Ingredient.allergen_type values that mean "no allergen"
+NOT_ALLERGENS = {"", "None", "Gluten-Free"}
+
+
+def allergen_bit(allergen_type):
+    """The bit for one Ingredient.allergen_type value (0 if it isn't an allergen)."""
+    allergen_type = (allergen_type or "").strip()
+    if allergen_type in NOT_ALLERGENS:
+        return 0
+    return ALLERGEN_BITS.get(allergen_type, ALLERGEN_BITS[OTHER_ALLERGEN])
+
+
+def allergy_bit(allergy):
+    """
+    The bit for one allergy a parent typed for their child (Child.allergies).
+
+    Names are matched case-insensitively; names ``ALLERGENS`` doesn't list
+    give 0 rather than "Other", so a typo never hides unrelated recipes.
+    """
+    return _ALLERGEN_BITS_BY_LOWER_NAME.get((allergy or "").strip().lower(), 0)
+
+
+def allergen_mask(allergen_types):
+    """Combined bitmask of several allergen names or allergen types."""
+    mask = 0
+    for allergen_type in allergen_types:
+        mask |= allergen_bit(allergen_type)
+    return mask
+
+
+def allergen_names(mask):
+    """Allergen names set in ``mask``, in ``ALLERGENS`` order."""
+    return [name for name, bit in ALLERGEN_BITS.items() if mask & bit]
+
+
+def summarize_ingredients(ingredients):
+    """``(allergen_mask, is_vegetarian, is_vegan)`` for ``(allergen_type, is_vegetarian, is_vegan)`` rows."""
+    mask, vegetarian, vegan = 0, True, True
+    for allergen_type, is_vegetarian, is_vegan in ingredients:
+        mask |= allergen_bit(allergen_type)
+        vegetarian = vegetarian and is_vegetarian
+        vegan = vegan and is_vegan
+    return mask, vegetarian, vegan
+
+
+def refresh_recipe_summaries(recipe_ids=None):
+    """
+    Recompute the allergen and dietary summary of ``recipe_ids`` (all recipes if None).
+
+    Two reads and one bulk update of the recipes that actually changed.
+    Returns how many recipes were updated.
+    """
+    from .catalog import bump_catalog_version
+    from .models import Recipe, RecipeIngredient
+
+    recipes = Recipe.objects.only("id", "allergen_mask", "is_vegetarian", "is_vegan")
+    links = RecipeIngredient.objects.all()
+    if recipe_ids is not None:
+        recipe_ids = list(recipe_ids)
+        if not recipe_ids:
+            return 0
+        recipes = recipes.filter(id__in=recipe_ids)
+        links = links.filter(recipe_id__in=recipe_ids)
+
+    ingredients_by_recipe = {}
+    for recipe_id, *ingredient in links.values_list(
+        "recipe_id", "ingredient__allergen_type", "ingredient__is_vegetarian", "ingredient__is_vegan"
+    ):
+        ingredients_by_recipe.setdefault(recipe_id, []).append(ingredient)
+
+    changed = []
+    for recipe in recipes:
+        summary = summarize_ingredients(ingredients_by_recipe.get(recipe.id, []))
+        if summary != (recipe.allergen_mask, recipe.is_vegetarian, recipe.is_vegan):
+            recipe.allergen_mask, recipe.is_vegetarian, recipe.is_vegan = summary
+            changed.append(recipe)
+
+    if changed:
+        Recipe.objects.bulk_update(changed, ["allergen_mask", "is_vegetarian", "is_vegan"], batch_size=500)
+        # bulk_update sends no signals, and the planner's index reads these columns
+        bump_catalog_version()
+    if len(changed) > 1:
+        logger.info(f"🥜 Refreshed allergen and dietary summary of {len(changed)} recipes")
+    return len(changed)
@@ -0,0 +1,115 @@
+"""
+Resized copies ("derivatives") of uploaded images.
+
+Recipe and blog images are served from media/ at whatever size they were
+uploaded, so a page of recipe cards can pull down megabytes. For each image
+we store a WebP and a JPEG copy at a few widths next to it::
+
+    recipes/pancakes.png -> recipes/derivatives/pancakes-png-card.webp
+                            recipes/derivatives/pancakes-png-card.jpg, ...
+
+The source extension is part of the name, so pancakes.png and pancakes.jpg
+in the same directory don't overwrite each other's derivatives.
+
+Derivatives are made when a Recipe or blog Post is saved with an image
+(see the signals) and by the ``generate_image_derivatives`` command for
+existing files. Templates use the ``responsive_image`` tag from
+templatetags/images.py, which writes the ``srcset`` attributes.
+"""
+import logging
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Derivative name -> width in pixels. Images are never scaled up.
+DERIVATIVE_WIDTHS = {
+    "thumb": 160,
+    "card": 480,
+    "hero": 1200,
+}
+
+# Format -> (file extension, Pillow save options)
+DERIVATIVE_FORMATS = {
+    "webp": ("webp", {"format": "WEBP", "quality": 80, "method": 4}),
+    "jpeg": ("jpg", {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def derivative_name(name, size, image_format):
+    """Storage name of one derivative of the image stored as ``name``."""
+    directory, filename = posixpath.split(name)
+    stem, source_extension = posixpath.splitext(filename)
+    if source_extension:
+        stem = f"{stem}-{source_extension[1:]}"
+    extension = DERIVATIVE_FORMATS[image_format][0]
+    return posixpath.join(directory, "derivatives", f"{stem}-{size}.{extension}")
+
+
+def derivatives_exist(name, storage=default_storage):
+    """Whether the last derivative ``make_derivatives`` writes for ``name`` is there."""
+    size, image_format = list(DERIVATIVE_WIDTHS)[-1], list(DERIVATIVE_FORMATS)[-1]
+    return storage.exists(derivative_name(name, size, image_format))
+
+
+def make_derivatives(name, storage=default_storage, force=False):
+    """
+    Write every derivative of the image stored as ``name``.
+
+    Skips images whose derivatives already exist unless ``force``. Returns the
+    number of files written.
+    """
+    if not force and derivatives_exist(name, storage):
+        return 0
+    with storage.open(name, "rb") as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+
+    written = 0
+    for size, width in DERIVATIVE_WIDTHS.items():
+        resized = image.copy()
+        resized.thumbnail((width, width * 10), Image.LANCZOS)
+        for image_format, (_, options) in DERIVATIVE_FORMATS.items():
+            # JPEG has no alpha channel; WebP keeps transparency
+            converted = resized if resized.mode in ("RGB", "RGBA") else resized.convert("RGBA")
+            if options["format"] == "JPEG" and converted.mode == "RGBA":
+                background = Image.new("RGB", converted.size, "white")
+                background.paste(converted, mask=converted.getchannel("A"))
+                converted = background
+            buffer = BytesIO()
+            converted.save(buffer, **options)
+
+            target = derivative_name(name, size, image_format)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(buffer.getvalue()))
+            written += 1
+    logger.info(f"🖼️ Wrote {written} derivatives of {name}")
+    return written
+
+
+def srcset(name, image_format, storage=default_storage):
+    """``srcset`` value listing every derivative width of ``name`` in ``image_format``."""
+    return ", ".join(
+        f"{storage.url(derivative_name(name, size, image_format))} {width}w"
+        for size, width in DERIVATIVE_WIDTHS.items()
+    )
+
+
+def ensure_derivatives(image):
+    """
+    Make the derivatives of an image field's file if it has none yet.
+
+    Called from post_save, so a file Pillow can't read is logged instead of
+    failing the save; the original is still served.
+    """
+    if not image or not image.name or not image.storage.exists(image.name):
+        return  # no file, e.g. an imported row without an image
+    try:
+        make_derivatives(image.name, image.storage)
+    except (OSError, ValueError) as exc:
+        logger.error(f"❌ Could not create derivatives of {image.name}: {exc}")
@@ -0,0 +1,115 @@
+"""
+Database-backed job queue that keeps meal plan generation out of the request path.
+
+Views call ``enqueue_meal_plan`` and return straight away; the
+``run_meal_plan_jobs`` management command claims pending jobs and runs them.
+With ``MEAL_PLAN_JOBS_EAGER = True`` (development settings and tests) the job
+runs inline instead, so no worker is needed there.
+"""
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.timezone import now
+
+from .models import MealPlan, MealPlanJob
+from .planner import generate_meal_plans_for_dates, regenerate_meals_for_plan
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_JOB_STATUSES = [MealPlanJob.STATUS_PENDING, MealPlanJob.STATUS_RUNNING]
+
+
+def enqueue_meal_plan(child, start_date, kind=MealPlanJob.KIND_GENERATE):
+    """
+    Queue a meal plan (re)generation for ``child`` and the week starting ``start_date``.
+
+    An identical job that is still pending or running is reused, so repeated
+    dashboard loads never queue the same week twice. The
+    ``unique_active_meal_plan_job`` constraint settles the race when two
+    requests try to queue the same week at once: the loser picks up the
+    winner's job.
+    """
+    active_jobs = MealPlanJob.objects.filter(
+        child=child, start_date=start_date, kind=kind, status__in=ACTIVE_JOB_STATUSES
+    )
+    job = active_jobs.first()
+    if job is None:
+        try:
+            with transaction.atomic():
+                job = MealPlanJob.objects.create(child=child, start_date=start_date, kind=kind)
+            logger.info(f"📥 Queued {kind} job {job.id} for child {child.id} ({start_date})")
+        except IntegrityError:
+            job = active_jobs.first()
+            if job is None:
+                # The other job finished in the meantime
+                return enqueue_meal_plan(child, start_date, kind)
+
+    if getattr(settings, 'MEAL_PLAN_JOBS_EAGER', False) and claim_job(job):
+        run_job(job)
+    return job
+
+
+def claim_job(job):
+    """Atomically move ``job`` from pending to running. Returns False if another worker got it first."""
+    claimed = MealPlanJob.objects.filter(pk=job.pk, status=MealPlanJob.STATUS_PENDING).update(
+        status=MealPlanJob.STATUS_RUNNING,
+        started_at=now(),
+        attempts=F('attempts') + 1,
+    )
+    if claimed:
+        job.refresh_from_db()
+    return bool(claimed)
+
+
+def claim_next_job():
+    """Claim the oldest pending job, or return None when the queue is empty."""
+    while True:
+        job = MealPlanJob.objects.filter(status=MealPlanJob.STATUS_PENDING).order_by('created_at', 'id').first()
+        if job is None:
+            return None
+        if claim_job(job):
+            return job
+
+
+def run_job(job):
+    """Run a claimed job and record the outcome on it."""
+    try:
+        if job.kind == MealPlanJob.KIND_REGENERATE:
+            meal_plan = MealPlan.objects.filter(child=job.child, start_date=job.start_date).first()
+            if meal_plan:
+                regenerate_meals_for_plan(meal_plan)
+            else:
+                generate_meal_plans_for_dates(job.child_id, [job.start_date])
+        else:
+            generate_meal_plans_for_dates(job.child_id, [job.start_date])
+    except Exception as e:
+        logger.error(f"❌ Meal plan job {job.id} failed: {e}")
+        job.status = MealPlanJob.STATUS_FAILED
+        job.error = str(e)
+    else:
+        job.status = MealPlanJob.STATUS_DONE
+        job.error = ''
+    job.finished_at = now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    return job
+
+
+def requeue_stale_jobs(older_than):
+    """Put running jobs whose worker died (started before ``older_than``) back in the queue."""
+    return MealPlanJob.objects.filter(
+        status=MealPlanJob.STATUS_RUNNING, started_at__lt=older_than
+    ).update(status=MealPlanJob.STATUS_PENDING)
+
+
+def get_meal_plan_status(child, start_date):
+    """Return "ready", "pending", "running", "failed" or "missing" for a child's week."""
+    job = MealPlanJob.objects.filter(child=child, start_date=start_date).order_by('-created_at', '-id').first()
+    if job and job.status in ACTIVE_JOB_STATUSES:
+        return job.status
+    if MealPlan.objects.filter(child=child, start_date=start_date).exists():
+        return 'ready'
+    if job and job.status == MealPlanJob.STATUS_FAILED:
+        return 'failed'
+    return 'missing'
@@ -0,0 +1,187 @@
+"""
+Browsing the recipe library: keyset pagination and facet counts.
+
+Pages are addressed by a cursor holding the sort key of the last (or first)
+recipe shown, rather than a page number. Fetching a page is a single query
+that seeks past the cursor and reads one row more than it shows, so it costs
+the same on page 50 as on page 1 and no COUNT is needed. Recipes are sorted
+by id, or by ``(search_rank, id)`` when a search query ranks them. Recipes
+ranked for a child (see ranking.py) are sorted in Python and paged by
+``scored_page`` with the same kind of cursor.
+
+``recipe_facets`` counts the current results by meal type, age band,
+vegetarian/vegan and allergen in a single aggregate query. Counts are cached
+per catalog version and set of filters, so a catalog change (see signals.py)
+retires them.
+"""
+import base64
+import hashlib
+import json
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, F, OuterRef, Q
+from django.db.models.lookups import GreaterThan
+
+from .catalog import get_catalog_version
+from .dietary import ALLERGEN_BITS
+from .models import Recipe
+from .search import ranked_after
+
+PAGE_SIZE = 12
+
+# Meal type filter values, matched against MealType names like the filter does
+MEAL_TYPE_OPTIONS = [("B", "Breakfast"), ("L", "Lunch"), ("D", "Dinner"), ("S", "Snack"), ("DR", "Drink")]
+
+AGE_BANDS = {
+    "6-9": Q(min_age_months__gte=6, max_age_months__lte=9),
+    "9-12": Q(min_age_months__gte=9, max_age_months__lte=12),
+    "12+": Q(min_age_months__gte=12),
+}
+AGE_BAND_OPTIONS = [("6-9", "6–9 months"), ("9-12", "9–12 months"), ("12+", "12+ months")]
+
+
+def meal_type_filter(meal_type):
+    """Recipes with a meal type whose name contains ``meal_type``, without joining (so no duplicates)."""
+    meal_types = Recipe.meal_types.through.objects.filter(mealtype__name__icontains=meal_type)
+    return Q(Exists(meal_types.filter(recipe_id=OuterRef("pk"))))
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor, ranked):
+    """The sort key stored in ``cursor``, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError):
+        return None
+    if not isinstance(key, list) or len(key) != (2 if ranked else 1):
+        return None
+    # The recipe id comes last; a tampered key must never reach a comparison
+    if not isinstance(key[-1], str) or ranked and not isinstance(key[0], (int, float)):
+        return None
+    return key
+
+
+class RecipePage:
+    """One page of recipes plus the cursors of its neighbours; ``sort_key`` gives a recipe's cursor."""
+
+    def __init__(self, object_list, sort_key, has_previous, has_next):
+        self.object_list = object_list
+        self.has_previous = has_previous and bool(object_list)
+        self.has_next = has_next and bool(object_list)
+        self.previous_cursor = encode_cursor(sort_key(object_list[0])) if self.has_previous else None
+        self.next_cursor = encode_cursor(sort_key(object_list[-1])) if self.has_next else None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def recipe_page(recipes, after=None, before=None, ranked=False, page_size=PAGE_SIZE):
+    """
+    The page of ``recipes`` following cursor ``after`` (or preceding ``before``).
+
+    ``ranked`` means ``recipes`` came from ``search_recipes`` with FTS and
+    carry a ``search_rank``. Bad cursors fall back to the first page.
+    """
+    ordering = ["search_rank", "id"] if ranked else ["id"]
+    key = decode_cursor(before, ranked)
+    reverse = key is not None
+    if not reverse:
+        key = decode_cursor(after, ranked)
+
+    if key is not None:
+        if ranked:
+            recipes = ranked_after(recipes, key[0], key[1], reverse=reverse)
+        else:
+            recipes = recipes.filter(id__lt=key[0]) if reverse else recipes.filter(id__gt=key[0])
+    if reverse:
+        ordering = [f"-{field}" for field in ordering]
+
+    rows = list(recipes.order_by(*ordering)[:page_size + 1])
+    more = len(rows) > page_size
+    rows = rows[:page_size]
+    sort_key = (lambda recipe: [recipe.search_rank, recipe.id]) if ranked else (lambda recipe: [recipe.id])
+    if reverse:
+        rows.reverse()
+        return RecipePage(rows, sort_key, has_previous=more, has_next=True)
+    return RecipePage(rows, sort_key, has_previous=key is not None, has_next=more)
+
+
+def scored_page(ranked_keys, after=None, before=None, page_size=PAGE_SIZE):
+    """
+    Like ``recipe_page`` for recipes ordered in Python: ``ranked_keys`` are
+    sorted ``(-score, recipe_id)`` pairs (see ranking.py). The page's recipes
+    are fetched in one query and carry their ``score``.
+    """
+    key = decode_cursor(before, ranked=True)
+    if key is not None:
+        end = bisect_left(ranked_keys, (-key[0], key[1]))
+        start = max(end - page_size, 0)
+    else:
+        key = decode_cursor(after, ranked=True)
+        start = bisect_right(ranked_keys, (-key[0], key[1])) if key is not None else 0
+        end = start + page_size
+    page_keys = ranked_keys[start:end]
+
+    recipes = Recipe.objects.in_bulk([recipe_id for _, recipe_id in page_keys])
+    rows = []
+    for negated_score, recipe_id in page_keys:
+        recipe = recipes[recipe_id]
+        recipe.score = -negated_score
+        rows.append(recipe)
+    return RecipePage(
+        rows, lambda recipe: [recipe.score, recipe.id],
+        has_previous=start > 0, has_next=start + page_size < len(ranked_keys),
+    )
+
+
+def recipe_facets(recipes, filters):
+    """
+    Counts of ``recipes`` per facet value::
+
+        {"total": n, "meal_types": {"B": n, ...}, "age_bands": {"6-9": n, ...},
+         "vegetarian": n, "vegan": n, "allergens": {"Dairy": n, ...}}
+
+    ``filters`` must identify ``recipes`` (it is the cache key along with
+    the catalog version).
+    """
+    signature = json.dumps(filters, sort_keys=True)
+    digest = hashlib.blake2b(signature.encode("utf-8"), digest_size=16).hexdigest()
+    key = f"library:facets:{get_catalog_version()}:{digest}"
+    facets = cache.get(key)
+    if facets is not None:
+        return facets
+
+    aggregates = {
+        "total": Count("id"),
+        "vegetarian": Count("id", filter=Q(is_vegetarian=True)),
+        "vegan": Count("id", filter=Q(is_vegan=True)),
+    }
+    # Aliases must be plain SQL identifiers, hence the numbered keys
+    for i, (value, _) in enumerate(MEAL_TYPE_OPTIONS):
+        aggregates[f"meal_type_{i}"] = Count("id", filter=meal_type_filter(value))
+    for i, condition in enumerate(AGE_BANDS.values()):
+        aggregates[f"age_band_{i}"] = Count("id", filter=condition)
+    for i, bit in enumerate(ALLERGEN_BITS.values()):
+        aggregates[f"allergen_{i}"] = Count("id", filter=GreaterThan(F("allergen_mask").bitand(bit), 0))
+    counts = recipes.order_by().aggregate(**aggregates)
+
+    facets = {
+        "total": counts["total"],
+        "meal_types": {value: counts[f"meal_type_{i}"] for i, (value, _) in enumerate(MEAL_TYPE_OPTIONS)},
+        "age_bands": {band: counts[f"age_band_{i}"] for i, band in enumerate(AGE_BANDS)},
+        "vegetarian": counts["vegetarian"],
+        "vegan": counts["vegan"],
+        "allergens": {name: counts[f"allergen_{i}"] for i, name in enumerate(ALLERGEN_BITS)},
+    }
+    cache.set(key, facets, getattr(settings, "LIBRARY_FACET_CACHE_TIMEOUT", 60 * 60))
+    return facets
@@ -0,0 +1,238 @@
+import json
+import logging
+import platform
+import random
+import resource
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from base.catalog import EligibilityIndex, bit_positions, bump_catalog_version, get_eligibility_index, parse_allergies
+from base.dietary import refresh_recipe_summaries
+from base.models import Child, Ingredient, MealPlan, MealType, Recipe, RecipeIngredient
+from base.planner import MEAL_TYPES, generate_meal_plan, regenerate_meals_for_plan
+
+# Rough shape of the real catalog in data/*.csv
+ALLERGENS = ["Dairy", "Eggs", "Gluten", "Nuts", "Tree Nuts", "Soy", "Fish", "Sesame"]
+ALLERGEN_SHARE = 0.3
+MEAL_TYPE_WEIGHTS = {"Breakfast": 0.2, "Lunch": 0.45, "Dinner": 0.45, "Snack": 0.25, "Side": 0.05, "Dessert": 0.05}
+MIN_AGES = [6, 6, 6, 7, 8, 9, 9, 10, 12, 12, 18]
+MAX_AGES = [12, 24, 24, 24, 36]
+INGREDIENTS_PER_RECIPE = (3, 8)
+VARIETY_LEVELS = ["no", "low", "medium", "high"]
+
+
+def _percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def _latency_summary(seconds, queries):
+    return {
+        "runs": len(seconds),
+        "p50_ms": round(_percentile(seconds, 50) * 1000, 3),
+        "p95_ms": round(_percentile(seconds, 95) * 1000, 3),
+        "mean_ms": round(sum(seconds) / len(seconds) * 1000, 3),
+        "queries_per_plan": round(sum(queries) / len(queries), 2),
+    }
+
+
+class Command(BaseCommand):
+    help = "Benchmark the meal planner against synthetic recipe catalogs and write the results to JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1000,10000,100000",
+                            help="Comma-separated synthetic catalog sizes (number of recipes).")
+        parser.add_argument("--plans", type=int, default=50,
+                            help="Plans to generate (and regenerate) per catalog size.")
+        parser.add_argument("--children", type=int, default=20,
+                            help="Synthetic children to spread the plans over.")
+        parser.add_argument("--orm-samples", type=int, default=5,
+                            help="Runs of the legacy ORM filter query per catalog size (0 to skip).")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", default="planner_benchmark.json",
+                            help="Where to write the JSON results.")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options["sizes"].split(",") if size.strip()]
+        rng = random.Random(options["seed"])
+
+        results = []
+        previous_level = logging.root.manager.disable
+        logging.disable(logging.INFO)  # generate_meal_plan logs every call
+        try:
+            for size in sizes:
+                self.stdout.write(f"Benchmarking a synthetic catalog of {size} recipes...")
+                with transaction.atomic():
+                    results.append(self._run_size(size, options, rng))
+                    # Leave the real database exactly as we found it
+                    transaction.set_rollback(True)
+                bump_catalog_version()
+        finally:
+            logging.disable(previous_level)
+
+        report = {
+            "generated_at": now().isoformat(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "options": {key: options[key] for key in ("plans", "children", "orm_samples", "seed")},
+            "results": results,
+        }
+        with open(options["output"], "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def _run_size(self, size, options, rng):
+        started = time.perf_counter()
+        self._create_catalog(size, rng)
+        children = self._create_children(options["children"], rng)
+        setup_seconds = time.perf_counter() - started
+
+        # Index build: timed on its own, then rebuilt once under tracemalloc for peak memory
+        bump_catalog_version()
+        started = time.perf_counter()
+        index = get_eligibility_index()
+        index_build_seconds = time.perf_counter() - started
+        tracemalloc.start()
+        EligibilityIndex.build(index.version)
+        _, index_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        constraints = [
+            (meal_type, child.age_in_months(), parse_allergies(child.allergies),
+             list(child.dislikes_ingredients.values_list("id", flat=True)))
+            for child in children for meal_type in MEAL_TYPES
+        ]
+
+        # Filtering step: raw bitset filtering vs the legacy multi-join query
+        filter_seconds = []
+        pool_sizes = []
+        for meal_type, age, allergies, dislikes in constraints:
+            started = time.perf_counter()
+            pool = [index.recipe_ids[pos] for pos in bit_positions(
+                index.candidate_mask(meal_type, age, allergies, dislikes)
+            )]
+            filter_seconds.append(time.perf_counter() - started)
+            pool_sizes.append(len(pool))
+
+        orm_seconds = []
+        for meal_type, age, allergies, dislikes in constraints[:options["orm_samples"]]:
+            started = time.perf_counter()
+            list(Recipe.objects.filter(
+                meal_types__name=meal_type, min_age_months__lte=age, max_age_months__gte=age
+            ).exclude(ingredients__in=dislikes).exclude(ingredients__allergen_type__in=allergies))
+            orm_seconds.append(time.perf_counter() - started)
+
+        # generate_meal_plan / regenerate_meals_for_plan latency and query counts
+        generate_seconds, generate_queries, plans = [], [], []
+        for i in range(options["plans"]):
+            child = children[i % len(children)]
+            week_offset = -1 - i // len(children)
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                plans.append(generate_meal_plan(child.id, week_offset))
+                generate_seconds.append(time.perf_counter() - started)
+            generate_queries.append(len(queries))
+
+        regenerate_seconds, regenerate_queries = [], []
+        for meal_plan in plans:
+            meal_plan = MealPlan.objects.select_related("child").get(pk=meal_plan.pk)
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                regenerate_meals_for_plan(meal_plan)
+                regenerate_seconds.append(time.perf_counter() - started)
+            regenerate_queries.append(len(queries))
+
+        result = {
+            "catalog_size": size,
+            "setup_s": round(setup_seconds, 3),
+            "index_build_s": round(index_build_seconds, 3),
+            "index_peak_memory_mb": round(index_peak / 1024 / 1024, 2),
+            "process_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+            "filter": {
+                "p50_ms": round(_percentile(filter_seconds, 50) * 1000, 4),
+                "p95_ms": round(_percentile(filter_seconds, 95) * 1000, 4),
+                "mean_pool_size": round(sum(pool_sizes) / len(pool_sizes), 1),
+            },
+            "generate": _latency_summary(generate_seconds, generate_queries),
+            "regenerate": _latency_summary(regenerate_seconds, regenerate_queries),
+            "pool_cache": {"hits": index.pool_cache.hits, "misses": index.pool_cache.misses},
+        }
+        if orm_seconds:
+            result["orm_filter"] = {
+                "p50_ms": round(_percentile(orm_seconds, 50) * 1000, 3),
+                "p95_ms": round(_percentile(orm_seconds, 95) * 1000, 3),
+            }
+        self.stdout.write(
+            f"  index {result['index_build_s']}s, filter p50 {result['filter']['p50_ms']}ms, "
+            f"generate p50 {result['generate']['p50_ms']}ms / p95 {result['generate']['p95_ms']}ms, "
+            f"{result['generate']['queries_per_plan']} queries/plan"
+        )
+        return result
+
+    def _create_catalog(self, size, rng):
+        meal_types = {name: MealType.objects.get_or_create(name=name)[0] for name in MEAL_TYPE_WEIGHTS}
+
+        ingredients = []
+        for i in range(max(200, size // 5)):
+            allergen = rng.choice(ALLERGENS) if rng.random() < ALLERGEN_SHARE else "None"
+            ingredients.append(Ingredient(
+                id=f"BEN-I{i:07d}", name=f"Synthetic ingredient {i}", food_category="Synthetic",
+                allergen_type=allergen, is_vegetarian=allergen != "Fish", is_vegan=allergen not in ("Fish", "Dairy", "Eggs"),
+            ))
+        Ingredient.objects.bulk_create(ingredients, batch_size=2000)
+
+        # Popular ingredients show up far more often than rare ones
+        popularity = [1 / (rank + 1) for rank in range(len(ingredients))]
+
+        recipes, meal_type_links, recipe_ingredients = [], [], []
+        through = Recipe.meal_types.through
+        for i in range(size):
+            min_age = rng.choice(MIN_AGES)
+            recipe = Recipe(
+                id=f"BEN-R{i:07d}", title=f"Synthetic recipe {i}", description="", instructions="Step one; Step two",
+                preparation_time=rng.randint(2, 20), cooking_time=rng.randint(0, 40),
+                min_age_months=min_age, max_age_months=max(min_age, rng.choice(MAX_AGES)),
+                is_puree=min_age < 9 and rng.random() < 0.5,
+            )
+            recipes.append(recipe)
+            chosen = [name for name, weight in MEAL_TYPE_WEIGHTS.items() if rng.random() < weight] or ["Lunch"]
+            meal_type_links.extend(through(recipe_id=recipe.id, mealtype_id=meal_types[name].id) for name in chosen)
+            picked = set(rng.choices(ingredients, weights=popularity, k=rng.randint(*INGREDIENTS_PER_RECIPE)))
+            recipe_ingredients.extend(
+                RecipeIngredient(recipe_id=recipe.id, ingredient_id=ingredient.id, quantity="1/2", unit="cup")
+                for ingredient in picked
+            )
+        Recipe.objects.bulk_create(recipes, batch_size=2000)
+        through.objects.bulk_create(meal_type_links, batch_size=2000)
+        RecipeIngredient.objects.bulk_create(recipe_ingredients, batch_size=2000)
+        # bulk_create sends no signals, so fill in the allergen masks the index filters on
+        refresh_recipe_summaries()
+
+    def _create_children(self, count, rng):
+        allergens = ALLERGENS + [""] * len(ALLERGENS) * 2
+        disliked_pool = list(Ingredient.objects.filter(id__startswith="BEN-I").values_list("id", flat=True)[:500])
+        children = []
+        for i in range(count):
+            user = User.objects.create(username=f"benchmark-{i}@example.com", email=f"benchmark-{i}@example.com")
+            profile = user.profile
+            profile.within_week_preferences = {m.lower(): rng.choice(VARIETY_LEVELS) for m in MEAL_TYPES}
+            profile.across_week_preferences = {m.lower(): rng.choice(VARIETY_LEVELS) for m in MEAL_TYPES}
+            profile.exclude_purees = rng.random() < 0.2
+            profile.save()
+            child = Child.objects.create(
+                parent=user, name=f"Benchmark {i}",
+                dob=date.today() - timedelta(days=rng.randint(180, 900)),
+                allergies=", ".join(sorted({a for a in rng.sample(allergens, 2) if a})),
+            )
+            child.dislikes_ingredients.set(rng.sample(disliked_pool, rng.randint(0, 3)))
+            children.append(child)
+        return children
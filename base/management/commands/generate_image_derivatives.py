@@ -0,0 +1,73 @@
+import multiprocessing
+import os
+import time
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+# Files in media/ that templates show directly, without a model behind them
+MEDIA_IMAGES = ["Tottable_Hero.jpg", "dashboard.png", "recipe_library.png", "recipe_detail.png", "shopping_list.png"]
+
+
+def _init_worker():
+    # Spawned workers start with a fresh interpreter
+    if not apps.ready:
+        django.setup()
+
+
+def _make_derivatives(args):
+    """Resize one image; errors are reported rather than stopping the run."""
+    from base.images import make_derivatives
+
+    name, force = args
+    try:
+        return name, make_derivatives(name, force=force), None
+    except Exception as exc:  # a broken upload shouldn't stop the rest
+        return name, 0, str(exc)
+
+
+class Command(BaseCommand):
+    help = "Create the resized WebP/JPEG copies of every recipe, blog and landing page image"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="Number of worker processes (1 runs inline).")
+        parser.add_argument("--force", action="store_true",
+                            help="Recreate derivatives that already exist.")
+
+    def handle(self, *args, **options):
+        from django.core.files.storage import default_storage
+
+        from base.models import Recipe
+        from blog.models import Post
+
+        names = set(Recipe.objects.exclude(image="").exclude(image__isnull=True).values_list("image", flat=True))
+        names |= set(Post.objects.exclude(image="").exclude(image__isnull=True).values_list("image", flat=True))
+        names |= {name for name in MEDIA_IMAGES if default_storage.exists(name)}
+        tasks = [(name, options["force"]) for name in sorted(names)]
+        workers = max(1, min(options["workers"], len(tasks)))
+        self.stdout.write(f"Creating derivatives of {len(tasks)} images across {workers} worker(s)...")
+
+        started = time.perf_counter()
+        written = failed = 0
+        if workers == 1:
+            results = map(_make_derivatives, tasks)
+        else:
+            pool = multiprocessing.Pool(processes=workers, initializer=_init_worker)
+            results = pool.imap_unordered(_make_derivatives, tasks)
+        try:
+            for name, count, error in results:
+                if error:
+                    failed += 1
+                    self.stderr.write(f"Could not resize {name}: {error}")
+                written += count
+        finally:
+            if workers > 1:
+                pool.close()
+                pool.join()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} derivatives in {elapsed:.2f}s ({failed} image(s) failed)."
+        ))
@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import time
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+ACTIVE_STATUSES = ["active", "trialing"]
+
+
+def _init_worker():
+    # Spawned workers start with a fresh interpreter; forked ones must not
+    # share the parent's database connection.
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
+
+
+def _generate_chunk(args):
+    """
+    Generate the missing plans for one chunk of children.
+
+    Each child is planned outside any transaction, and their weeks are then
+    written in a short transaction of their own (see generate_meal_plans), so
+    the other workers never wait for the database while a chunk is planned.
+    """
+    from base.models import MealPlan
+    from base.planner import generate_meal_plans, week_start_for_offset
+
+    child_ids, week_offsets = args
+    week_starts = {offset: week_start_for_offset(offset) for offset in week_offsets}
+
+    existing = set(
+        MealPlan.objects.filter(
+            child_id__in=child_ids, start_date__in=week_starts.values()
+        ).values_list("child_id", "start_date")
+    )
+
+    created = 0
+    for child_id in child_ids:
+        # All missing weeks of a child are planned and written in one go
+        missing = [offset for offset, start_date in week_starts.items() if (child_id, start_date) not in existing]
+        if missing:
+            generate_meal_plans(child_id, missing)
+            created += len(missing)
+    return created
+
+
+class Command(BaseCommand):
+    help = "Pre-generate current and next week meal plans for every child of an active or trialing subscriber"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="Number of worker processes (1 runs inline).")
+        parser.add_argument("--chunk-size", type=int, default=50,
+                            help="Children per worker task.")
+        parser.add_argument("--weeks", type=int, default=2,
+                            help="Number of weeks to fill, starting with the current week.")
+
+    def handle(self, *args, **options):
+        from base.models import Child
+
+        workers = max(1, options["workers"])
+        chunk_size = max(1, options["chunk_size"])
+        week_offsets = list(range(max(1, options["weeks"])))
+
+        child_ids = list(
+            Child.objects.filter(
+                parent__profile__subscription_status__in=ACTIVE_STATUSES
+            ).order_by("id").values_list("id", flat=True)
+        )
+        chunks = [
+            (child_ids[i:i + chunk_size], week_offsets)
+            for i in range(0, len(child_ids), chunk_size)
+        ]
+        self.stdout.write(
+            f"Pre-generating {len(week_offsets)} week(s) for {len(child_ids)} children "
+            f"in {len(chunks)} chunks across {workers} worker(s)..."
+        )
+
+        started = time.perf_counter()
+        created = 0
+        if workers == 1 or len(chunks) <= 1:
+            for chunk in chunks:
+                created += _generate_chunk(chunk)
+        else:
+            # Never hand an open connection to forked workers
+            connections.close_all()
+            with multiprocessing.Pool(processes=workers, initializer=_init_worker) as pool:
+                for count in pool.imap_unordered(_generate_chunk, chunks):
+                    created += count
+        elapsed = time.perf_counter() - started
+
+        rate = created / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {created} meal plans in {elapsed:.2f}s ({rate:.1f} plans/sec)."
+        ))
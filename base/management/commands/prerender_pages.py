@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from base.prerender import prerender
+
+
+class Command(BaseCommand):
+    help = "Update the static HTML copies of the public pages that nginx serves to anonymous visitors"
+
+    def add_arguments(self, parser):
+        parser.add_argument("output_dir", nargs="?",
+                            help="Where to write the pages (defaults to settings.DISTILL_DIR).")
+        parser.add_argument("--force", action="store_true",
+                            help="Render every page, changed or not.")
+        parser.add_argument("--watch", type=float, metavar="SECONDS",
+                            help="Keep running, checking for changed content every SECONDS.")
+
+    def handle(self, *args, **options):
+        force = options["force"]
+        while True:
+            rendered, deleted, unchanged = prerender(options["output_dir"], force=force)
+            if rendered or deleted or not options["watch"]:
+                self.stdout.write(f"Rendered {rendered} page(s), removed {deleted}, {unchanged} unchanged.")
+            if not options["watch"]:
+                break
+            force = False
+            time.sleep(options["watch"])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from base.search import fts_available, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text recipe search index from the recipe catalog"
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            self.stdout.write("No full-text search table on this database; the library uses plain filters.")
+            return
+        count = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} recipes."))
@@ -0,0 +1,40 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from base.jobs import claim_next_job, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Process queued meal plan generation jobs (not needed with MEAL_PLAN_JOBS_EAGER=True)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true",
+                            help="Drain the queue and exit instead of polling forever.")
+        parser.add_argument("--interval", type=float, default=1.0,
+                            help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--stale-after", type=int, default=10,
+                            help="Minutes after which a running job is assumed lost and requeued.")
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs(now() - timedelta(minutes=options["stale_after"]))
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s).")
+
+        self.stdout.write("Waiting for meal plan jobs...")
+        processed = 0
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+                continue
+
+            run_job(job)
+            processed += 1
+            self.stdout.write(f"Job {job.id} ({job.kind} for child {job.child_id}, {job.start_date}): {job.status}")
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)."))
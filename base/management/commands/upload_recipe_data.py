@@ -3,6 +3,7 @@ import os
 from django.conf import settings
 from django.core.management.base import BaseCommand
 from base.models import Ingredient, Recipe, RecipeIngredient, MealType
+from base.dietary import refresh_recipe_summaries
 from fractions import Fraction
 
 class Command(BaseCommand):
@@ -96,15 +97,9 @@ class Command(BaseCommand):
                 except Ingredient.DoesNotExist:
                     self.stderr.write(f"Ingredient with ID {row['Ingredient ID']} not found.")
 
-        # Update `is_vegetarian` and `is_vegan` for Recipes
+        # Update the allergen mask, `is_vegetarian` and `is_vegan` for Recipes
         self.stdout.write("Updating recipe dietary information...")
-        recipes = Recipe.objects.all()
-        for recipe in recipes:
-            ingredients = recipe.ingredients.all()
-            is_vegetarian = all(ingredient.is_vegetarian for ingredient in ingredients)
-            is_vegan = all(ingredient.is_vegan for ingredient in ingredients)
-            recipe.is_vegetarian = is_vegetarian
-            recipe.is_vegan = is_vegan
-            recipe.save()
+        updated = refresh_recipe_summaries()
+        self.stdout.write(f"Updated dietary information for {updated} recipes.")
 
         self.stdout.write("Data upload completed.")
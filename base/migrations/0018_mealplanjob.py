@@ -0,0 +1,32 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0017_presignupsocial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MealPlanJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('generate', 'Generate'), ('regenerate', 'Regenerate')], default='generate', max_length=20)),
+                ('start_date', models.DateField(help_text='Start date of the meal plan week')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('child', models.ForeignKey(help_text='The child the meal plan is generated for', on_delete=django.db.models.deletion.CASCADE, related_name='meal_plan_jobs', to='base.child')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='base_mealpl_status_0080e6_idx'), models.Index(fields=['child', 'start_date'], name='base_mealpl_child_i_2d79fa_idx')],
+            },
+        ),
+    ]
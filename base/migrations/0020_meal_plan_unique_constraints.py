@@ -0,0 +1,69 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:51
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+
+
+def remove_duplicates(apps, schema_editor):
+    """Drop duplicate rows left behind by concurrent generations before adding the constraints."""
+    MealPlan = apps.get_model('base', 'MealPlan')
+    Meal = apps.get_model('base', 'Meal')
+    MealPlanJob = apps.get_model('base', 'MealPlanJob')
+
+    # Keep the newest plan of each child and week, which is the one the dashboard showed
+    duplicated_weeks = (
+        MealPlan.objects.values('child_id', 'start_date')
+        .annotate(plans=Count('id'), keep=Max('id'))
+        .filter(plans__gt=1)
+    )
+    for week in duplicated_weeks:
+        MealPlan.objects.filter(
+            child_id=week['child_id'], start_date=week['start_date']
+        ).exclude(id=week['keep']).delete()
+
+    duplicated_days = (
+        Meal.objects.filter(meal_plan__isnull=False)
+        .values('meal_plan_id', 'day')
+        .annotate(meals=Count('id'), keep=Max('id'))
+        .filter(meals__gt=1)
+    )
+    for slot in duplicated_days:
+        Meal.objects.filter(
+            meal_plan_id=slot['meal_plan_id'], day=slot['day']
+        ).exclude(id=slot['keep']).delete()
+
+    # Keep the oldest active job; the others would only redo its work
+    duplicated_jobs = (
+        MealPlanJob.objects.filter(status__in=['pending', 'running'])
+        .values('child_id', 'start_date', 'kind')
+        .annotate(jobs=Count('id'), keep=Min('id'))
+        .filter(jobs__gt=1)
+    )
+    for job in duplicated_jobs:
+        MealPlanJob.objects.filter(
+            child_id=job['child_id'], start_date=job['start_date'], kind=job['kind'],
+            status__in=['pending', 'running'],
+        ).exclude(id=job['keep']).update(status='failed', error='Duplicate of job %d' % job['keep'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0018_mealplanjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='meal',
+            constraint=models.UniqueConstraint(fields=('meal_plan', 'day'), name='unique_meal_per_plan_day'),
+        ),
+        migrations.AddConstraint(
+            model_name='mealplan',
+            constraint=models.UniqueConstraint(fields=('child', 'start_date'), name='unique_meal_plan_per_child_week'),
+        ),
+        migrations.AddConstraint(
+            model_name='mealplanjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('child', 'start_date', 'kind'), name='unique_active_meal_plan_job'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+def create_search_table(apps, schema_editor):
+    """Create and fill the FTS5 recipe search table (SQLite only; see base/search.py)."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS base_recipe_search USING fts5("
+            "recipe_id UNINDEXED, title, description, tags, ingredients, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+    except OperationalError:
+        # SQLite built without FTS5: search falls back to icontains filters
+        return
+    schema_editor.execute(
+        "INSERT INTO base_recipe_search "
+        "SELECT r.id, r.title, COALESCE(r.description, ''), COALESCE(r.tags, ''), "
+        "COALESCE((SELECT group_concat(i.name, ' ') FROM base_recipeingredient ri "
+        "JOIN base_ingredient i ON i.id = ri.ingredient_id WHERE ri.recipe_id = r.id), '') "
+        "FROM base_recipe r"
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS base_recipe_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0020_meal_plan_unique_constraints'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
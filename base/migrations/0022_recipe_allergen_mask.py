@@ -0,0 +1,63 @@
+# Generated by Django 5.1.2 on 2026-10-18 16:02
+
+from django.db import migrations, models
+
+# Frozen copy of base.dietary as of this migration. Bit positions are stored,
+# so they must not follow later edits of the live module.
+ALLERGENS = [
+    "Dairy", "Eggs", "Fish", "Shellfish", "Molluscs", "Nuts", "Tree Nuts", "Peanuts", "Gluten",
+    "Soy", "Sesame", "Mustard", "Celery", "Lupin", "Sulphites", "Poultry", "Other",
+]
+ALLERGEN_BITS = {name: 1 << position for position, name in enumerate(ALLERGENS)}
+NOT_ALLERGENS = {"", "None", "Gluten-Free"}
+
+
+def allergen_bit(allergen_type):
+    allergen_type = (allergen_type or "").strip()
+    if allergen_type in NOT_ALLERGENS:
+        return 0
+    return ALLERGEN_BITS.get(allergen_type, ALLERGEN_BITS["Other"])
+
+
+def summarize_ingredients(ingredients):
+    mask, vegetarian, vegan = 0, True, True
+    for allergen_type, is_vegetarian, is_vegan in ingredients:
+        mask |= allergen_bit(allergen_type)
+        vegetarian = vegetarian and is_vegetarian
+        vegan = vegan and is_vegan
+    return mask, vegetarian, vegan
+
+
+def populate_summaries(apps, schema_editor):
+    """Fill in allergen_mask, and recompute the vegetarian/vegan flags the same way."""
+    Recipe = apps.get_model('base', 'Recipe')
+    RecipeIngredient = apps.get_model('base', 'RecipeIngredient')
+
+    ingredients_by_recipe = {}
+    for recipe_id, *ingredient in RecipeIngredient.objects.values_list(
+        'recipe_id', 'ingredient__allergen_type', 'ingredient__is_vegetarian', 'ingredient__is_vegan'
+    ):
+        ingredients_by_recipe.setdefault(recipe_id, []).append(ingredient)
+
+    recipes = list(Recipe.objects.only('id', 'allergen_mask', 'is_vegetarian', 'is_vegan'))
+    for recipe in recipes:
+        recipe.allergen_mask, recipe.is_vegetarian, recipe.is_vegan = summarize_ingredients(
+            ingredients_by_recipe.get(recipe.id, [])
+        )
+    Recipe.objects.bulk_update(recipes, ['allergen_mask', 'is_vegetarian', 'is_vegan'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0021_recipe_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='allergen_mask',
+            field=models.BigIntegerField(default=0, help_text="Allergens in this recipe's ingredients, one bit per entry of dietary.ALLERGENS (kept up to date automatically)"),
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
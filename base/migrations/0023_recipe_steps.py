@@ -0,0 +1,49 @@
+# Generated by Django 5.1.2 on 2026-10-18 16:09
+
+from django.db import migrations, models
+
+# Frozen copy of base.steps.parse_steps as of this migration
+
+
+def parse_steps(text):
+    steps = []
+    for item in (text or "").split(";"):
+        item = item.strip()
+        if not item:
+            continue
+        if ":" in item:
+            heading, body = item.split(":", 1)
+            steps.append([heading.strip(), body.strip()])
+        else:
+            steps.append([None, item])
+    return steps
+
+
+def parse_existing_steps(apps, schema_editor):
+    Recipe = apps.get_model('base', 'Recipe')
+    recipes = list(Recipe.objects.only('id', 'instructions', 'tips'))
+    for recipe in recipes:
+        recipe.instruction_steps = parse_steps(recipe.instructions)
+        recipe.tip_steps = parse_steps(recipe.tips)
+    Recipe.objects.bulk_update(recipes, ['instruction_steps', 'tip_steps'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0022_recipe_allergen_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='instruction_steps',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='instructions parsed into [heading, body] steps (filled in on save)'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tip_steps',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='tips parsed into [heading, body] steps (filled in on save)'),
+        ),
+        migrations.RunPython(parse_existing_steps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:02
+
+import re
+from fractions import Fraction
+
+from django.db import migrations, models
+
+# Frozen copy of base.quantities.parse_quantity as of this migration
+UNIT_ALIASES = {
+    "teaspoon": "tsp", "teaspoons": "tsp", "tsp": "tsp",
+    "tablespoon": "tbsp", "tablespoons": "tbsp", "tbsp": "tbsp",
+    "fl oz": "fl oz", "fluid ounce": "fl oz", "fluid ounces": "fl oz",
+    "cup": "cup", "cups": "cup", "pint": "pint", "pints": "pint", "quart": "quart", "quarts": "quart",
+    "ml": "ml", "millilitre": "ml", "millilitres": "ml", "milliliter": "ml", "milliliters": "ml",
+    "l": "l", "litre": "l", "litres": "l", "liter": "l", "liters": "l",
+    "g": "g", "gram": "g", "grams": "g", "kg": "kg", "kilogram": "kg", "kilograms": "kg",
+    "oz": "oz", "ounce": "oz", "ounces": "oz", "lb": "lb", "lbs": "lb", "pound": "lb", "pounds": "lb",
+    "clove": "clove", "cloves": "clove", "slice": "slice", "slices": "slice", "leaf": "leaf",
+    "leaves": "leaf", "stalk": "stalk", "stalks": "stalk", "piece": "piece", "pieces": "piece",
+    "scoop": "scoop", "scoops": "scoop", "pinch": "pinch", "pinches": "pinch", "can": "can",
+    "cans": "can", "head": "head", "heads": "head",
+    "small": "", "medium": "", "large": "", "whole": "", "unit": "", "units": "",
+}
+
+VULGAR_FRACTIONS = {
+    "½": "1/2", "⅓": "1/3", "⅔": "2/3", "¼": "1/4", "¾": "3/4", "⅕": "1/5",
+    "⅛": "1/8", "⅜": "3/8", "⅝": "5/8", "⅞": "7/8",
+}
+NUMBER = r"(?:\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)"
+LEADING_QUANTITY = re.compile(rf"\s*({NUMBER})(?:\s*[-–]\s*({NUMBER}))?\s*")
+WORD = re.compile(r"[a-z]+")
+
+
+def expand_fractions(text):
+    for symbol, fraction in VULGAR_FRACTIONS.items():
+        text = text.replace(symbol, f" {fraction}")
+    return text
+
+
+def number(text):
+    whole, _, fraction = text.strip().rpartition(" ")
+    return Fraction(fraction) + (Fraction(whole) if whole else 0)
+
+
+def canonical_unit(text):
+    words = WORD.findall((text or "").lower())
+    if len(words) >= 2 and f"{words[0]} {words[1]}" in UNIT_ALIASES:
+        return UNIT_ALIASES[f"{words[0]} {words[1]}"]
+    if words and words[0] in UNIT_ALIASES:
+        return UNIT_ALIASES[words[0]]
+    return None
+
+
+def parse_quantity(quantity, unit=""):
+    text = expand_fractions(quantity or "")
+    match = LEADING_QUANTITY.match(text)
+    if match is None:
+        named_unit = canonical_unit(text)
+        amount = Fraction(1) if text.strip() and named_unit else None
+        return amount, canonical_unit(unit) or named_unit or ""
+    try:
+        amount = number(match.group(2) or match.group(1))
+    except (ValueError, ZeroDivisionError):
+        return None, canonical_unit(unit) or ""
+    unit_name = canonical_unit(unit)
+    if unit_name is None:
+        unit_name = canonical_unit(text[match.end():]) or ""
+    return amount, unit_name
+
+
+def parse_existing_quantities(apps, schema_editor):
+    RecipeIngredient = apps.get_model('base', 'RecipeIngredient')
+    rows = list(RecipeIngredient.objects.only('id', 'quantity', 'unit'))
+    for row in rows:
+        amount, row.canonical_unit = parse_quantity(row.quantity, row.unit)
+        if amount is not None:
+            row.amount_numerator, row.amount_denominator = amount.numerator, amount.denominator
+    RecipeIngredient.objects.bulk_update(
+        rows, ['amount_numerator', 'amount_denominator', 'canonical_unit'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0023_recipe_steps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipeingredient',
+            name='amount_denominator',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipeingredient',
+            name='amount_numerator',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipeingredient',
+            name='canonical_unit',
+            field=models.CharField(blank=True, default='', editable=False, max_length=10),
+        ),
+        migrations.RunPython(parse_existing_quantities, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.2 on 2026-10-18 16:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0024_recipeingredient_amount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mealplan',
+            name='shopping_list_version',
+            field=models.BigIntegerField(blank=True, editable=False, help_text="Catalog version the plan's ShoppingListItems were built with (None: not built yet)", null=True),
+        ),
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unit', models.CharField(blank=True, default='', help_text='Canonical unit, see quantities.UNITS', max_length=10)),
+                ('amount_numerator', models.BigIntegerField(default=0)),
+                ('amount_denominator', models.BigIntegerField(default=1)),
+                ('uses', models.PositiveIntegerField(default=0, help_text='How many recipe slots add this ingredient; the item is deleted when it drops to 0')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='base.ingredient')),
+                ('meal_plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_items', to='base.mealplan')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('meal_plan', 'ingredient', 'unit'), name='unique_shopping_item_per_plan')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.2 on 2026-10-18 16:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0026_catalog_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchRow',
+            fields=[
+                ('recipe', models.OneToOneField(db_column='recipe_id', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_row', serialize=False, to='base.recipe')),
+            ],
+            options={
+                'db_table': 'base_recipe_search',
+                'managed': False,
+            },
+        ),
+    ]
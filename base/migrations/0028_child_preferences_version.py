@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 17:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0027_recipe_search_row'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='child',
+            name='preferences_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False, help_text='Bumped whenever the child or their likes/dislikes change (keys the cached library ranking)'),
+        ),
+    ]
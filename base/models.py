@@ -4,6 +4,8 @@ from fractions import Fraction
 from dateutil.relativedelta import relativedelta
 from django.utils.timezone import now
 from allauth.socialaccount.models import SocialApp
+from .dietary import allergen_names
+from .quantities import format_amount, is_plain_number, parse_quantity
 
 def default_meal_variety():
     return {
@@ -106,10 +108,31 @@ class Recipe(models.Model):
     min_age_months = models.IntegerField(help_text="Minimum age in months for this recipe", default=6)
     max_age_months = models.IntegerField(help_text="Maximum age in months for this recipe", default=24)
     tips = models.TextField(blank=True, null=True, help_text="Tottable tips for this recipe")
+    instruction_steps = models.JSONField(
+        default=list, blank=True, editable=False,
+        help_text="instructions parsed into [heading, body] steps (filled in on save)"
+    )
+    tip_steps = models.JSONField(
+        default=list, blank=True, editable=False,
+        help_text="tips parsed into [heading, body] steps (filled in on save)"
+    )
+    allergen_mask = models.BigIntegerField(
+        default=0,
+        help_text="Allergens in this recipe's ingredients, one bit per entry of dietary.ALLERGENS (kept up to date automatically)"
+    )
 
     def __str__(self):
         return self.title
 
+    @property
+    def allergen_names(self):
+        """Allergens in this recipe, read from ``allergen_mask`` without touching the ingredients."""
+        return allergen_names(self.allergen_mask)
+
+    @property
+    def has_potential_allergens(self):
+        return self.allergen_mask != 0
+
 class MealType(models.Model):
     name = models.CharField(max_length=50, unique=True)
 
@@ -122,37 +145,62 @@ class RecipeIngredient(models.Model):
     ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE)
     quantity = models.CharField(max_length=100)  # Keep this as a string to handle various formats
     unit = models.CharField(max_length=50, blank=True, null=True)  # Unit for the quantity
+    # quantity and unit parsed on save (see quantities.py); no amount for "as needed"
+    amount_numerator = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    amount_denominator = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    canonical_unit = models.CharField(max_length=10, blank=True, default="", editable=False)
+
+    @property
+    def amount(self):
+        """The parsed quantity as an exact ``Fraction`` of ``canonical_unit``, or None."""
+        if self.amount_numerator is None:
+            return None
+        return Fraction(self.amount_numerator, self.amount_denominator)
+
+    def set_amount(self):
+        """Parse ``quantity`` and ``unit`` into the amount fields."""
+        amount, self.canonical_unit = parse_quantity(self.quantity, self.unit)
+        if amount is None:
+            self.amount_numerator = self.amount_denominator = None
+        else:
+            self.amount_numerator, self.amount_denominator = amount.numerator, amount.denominator
 
     def quantity_as_fraction(self):
-        try:
-            # Handle strings like "1 1/2"
-            if " " in self.quantity:
-                whole, frac = self.quantity.split()
-                value = float(whole) + float(Fraction(frac))
-            else:
-                value = float(Fraction(self.quantity))  # Handles "1.5", "3/2", etc.
-
-            frac = Fraction(value).limit_denominator(8)
-
-            # 🔍 If it's a whole number, just show it as an integer
-            if frac.denominator == 1:
-                return str(frac.numerator)
-
-            # 🧮 Mixed number if improper fraction
-            if frac.numerator > frac.denominator:
-                whole = frac.numerator // frac.denominator
-                remainder = frac.numerator % frac.denominator
-                return f"{whole} {remainder}/{frac.denominator}"
-
-            # Proper fraction
-            return f"{frac.numerator}/{frac.denominator}"
-        except (ValueError, ZeroDivisionError, TypeError):
+        """The quantity as a whole or mixed number, from the amount parsed on save; worded quantities are shown as written."""
+        if self.amount is None or not is_plain_number(self.quantity):
             return self.quantity
+        return format_amount(self.amount)
 
     def __str__(self):
         unit_display = f" {self.unit}" if self.unit else ""
         return f"{self.quantity_as_fraction()}{unit_display} {self.ingredient.name} for {self.recipe.title}"
 
+### RecipeSearchRow Model ###
+class RecipeSearchRow(models.Model):
+    """
+    A recipe's row in the FTS5 search table (see search.py). The table is
+    created by migration 0021 on SQLite only; the model just lets queries join it.
+    """
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.DO_NOTHING, primary_key=True, db_column='recipe_id',
+        db_constraint=False, related_name='search_row'
+    )
+
+    class Meta:
+        managed = False
+        db_table = 'base_recipe_search'
+
+### CatalogVersion Model ###
+class CatalogVersion(models.Model):
+    """
+    Single-row counter bumped on every recipe catalog change (see catalog.py),
+    so all web workers and commands agree on when catalog-derived data is stale.
+    """
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"Catalog version {self.version}"
+
 ### Child Model (Now Uses User) ###
 class Child(models.Model):
     parent = models.ForeignKey(User, on_delete=models.CASCADE, related_name='children')  # Still points to User as parent
@@ -163,6 +211,10 @@ class Child(models.Model):
     likes_recipes = models.ManyToManyField(Recipe, related_name='liked_by_children', blank=True)
     dislikes_recipes = models.ManyToManyField(Recipe, related_name='disliked_by_children', blank=True)
     allergies = models.CharField(max_length=255, blank=True, help_text="List known allergens for the child (e.g., Nuts, Dairy)")
+    preferences_version = models.PositiveBigIntegerField(
+        default=0, editable=False,
+        help_text="Bumped whenever the child or their likes/dislikes change (keys the cached library ranking)"
+    )
 
     def __str__(self):
         return f"{self.name} ({self.parent.username})"
@@ -195,6 +247,17 @@ class MealPlan(models.Model):
     end_date = models.DateField(help_text="End date of the meal plan week")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    shopping_list_version = models.BigIntegerField(
+        null=True, blank=True, editable=False,
+        help_text="Catalog version the plan's ShoppingListItems were built with (None: not built yet)"
+    )
+
+    class Meta:
+        constraints = [
+            # One plan per child and week; the constraint's index also serves
+            # plan lookups and the across-week history scan.
+            models.UniqueConstraint(fields=['child', 'start_date'], name='unique_meal_plan_per_child_week'),
+        ]
 
     def __str__(self):
         return f"Meal Plan for {self.child.name} ({self.start_date} - {self.end_date})"
@@ -245,9 +308,90 @@ class Meal(models.Model):
         related_name='meal_snack'
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['meal_plan', 'day'], name='unique_meal_per_plan_day'),
+        ]
+
     def __str__(self):
         return f"{self.day.capitalize()} Meal for {self.meal_plan.child.name if self.meal_plan else 'No Plan'}"
+
+
+class ShoppingListItem(models.Model):
+    """Running total of one ingredient, in one unit, across a meal plan's recipes (see shopping.py)."""
+    meal_plan = models.ForeignKey(MealPlan, on_delete=models.CASCADE, related_name='shopping_items')
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE)
+    unit = models.CharField(max_length=10, blank=True, default="", help_text="Canonical unit, see quantities.UNITS")
+    amount_numerator = models.BigIntegerField(default=0)
+    amount_denominator = models.BigIntegerField(default=1)
+    uses = models.PositiveIntegerField(
+        default=0, help_text="How many recipe slots add this ingredient; the item is deleted when it drops to 0"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['meal_plan', 'ingredient', 'unit'], name='unique_shopping_item_per_plan'),
+        ]
+
+    @property
+    def amount(self):
+        return Fraction(self.amount_numerator, self.amount_denominator)
+
+    def __str__(self):
+        return f"{self.ingredient_id} ({self.unit or 'count'}) for meal plan {self.meal_plan_id}"
     
+class MealPlanJob(models.Model):
+    """A queued meal plan generation, processed by the run_meal_plan_jobs worker."""
+    KIND_GENERATE = 'generate'
+    KIND_REGENERATE = 'regenerate'
+    KIND_CHOICES = [
+        (KIND_GENERATE, 'Generate'),
+        (KIND_REGENERATE, 'Regenerate'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    child = models.ForeignKey(
+        'Child',
+        on_delete=models.CASCADE,
+        related_name='meal_plan_jobs',
+        help_text="The child the meal plan is generated for"
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default=KIND_GENERATE)
+    start_date = models.DateField(help_text="Start date of the meal plan week")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['child', 'start_date']),
+        ]
+        constraints = [
+            # At most one queued or running job per child, week and kind
+            models.UniqueConstraint(
+                fields=['child', 'start_date', 'kind'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='unique_active_meal_plan_job',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} job for {self.child.name} ({self.start_date}) - {self.status}"
+
 class PreSignupSocial(models.Model):
     email = models.EmailField()
     first_name = models.CharField(max_length=150)
@@ -0,0 +1,425 @@
+"""
+Meal plan generation engine shared by the views, job queue and management commands.
+
+Planning is split into a pure step and a persistence step:
+
+* ``plan_week`` takes a child's constraints, the parent's variety
+  preferences, a catalog snapshot (``EligibilityIndex``) and the recent plan
+  history, and returns a 7x4 slot grid ``{day: {"breakfast_id": ..., ...}}``.
+  It touches no database, so it can be cached and benchmarked on its own.
+* ``write_meal_plan`` stores a grid on a ``MealPlan`` with one bulk write.
+
+``generate_meal_plans`` fills several consecutive weeks in one pass: inputs
+and candidate pools are loaded once, every new week counts towards the
+across-week variety of the next, and all plans and meals are written with two
+bulk inserts.
+
+How the picked recipes are spread over the week is decided by a pluggable
+day-assignment strategy (see ``register_day_strategy``).
+"""
+import logging
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.utils.timezone import now
+
+from .catalog import get_eligibility_index, parse_allergies
+from .dashboard import invalidate_week_fragment
+from .models import Child, Meal, MealPlan
+from .shopping import meals_recipe_counts, write_shopping_lists
+
+logger = logging.getLogger(__name__)
+
+DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MEAL_TYPES = ["Breakfast", "Lunch", "Dinner", "Snack"]
+
+# Within-week variety: (min, max) unique recipes per meal type, and the
+# day-assignment strategy used to spread them over the week.
+VARIETY_LEVELS = {
+    "high": ((6, 7), "rotate"),  # Almost no repetition
+    "medium": ((4, 5), "pairs"),  # Meals repeat in pairs
+    "low": ((2, 3), "pairs"),  # More repetition, every 2 days
+    "no": ((1, 1), "single"),  # Same meal every day
+}
+
+# Across-week variety: how many previous weeks to look back, and whether
+# recipes seen in that window are excluded outright or only deprioritised.
+ACROSS_WEEK_RULES = {
+    "high": (4, "exclude"),
+    "medium": (2, "penalise"),
+    "low": (1, "penalise"),
+    "no": (0, None),
+}
+HISTORY_WEEKS = max(weeks for weeks, _ in ACROSS_WEEK_RULES.values())
+
+
+### Day-assignment strategies ###
+
+DAY_STRATEGIES = {}
+
+
+def register_day_strategy(name):
+    """
+    Register a day-assignment strategy under ``name``.
+
+    A strategy takes the selected recipe ids and the list of days and returns
+    one recipe id per day.
+    """
+    def decorator(func):
+        DAY_STRATEGIES[name] = func
+        return func
+    return decorator
+
+
+@register_day_strategy("single")
+def assign_single(selected_recipes, days):
+    return [selected_recipes[0]] * len(days)
+
+
+@register_day_strategy("rotate")
+def assign_rotate(selected_recipes, days):
+    return [selected_recipes[day_index % len(selected_recipes)] for day_index in range(len(days))]
+
+
+@register_day_strategy("pairs")
+def assign_pairs(selected_recipes, days):
+    return [selected_recipes[(day_index // 2) % len(selected_recipes)] for day_index in range(len(days))]
+
+
+### Planning inputs ###
+
+class ChildConstraints:
+    """What a child can eat: age in months, allergens, disliked ingredients and puree preference."""
+
+    def __init__(self, age_months, allergies=(), dislikes=(), exclude_purees=False):
+        self.age_months = age_months
+        self.allergies = tuple(allergies)
+        self.dislikes = tuple(dislikes)
+        self.exclude_purees = exclude_purees
+
+    @classmethod
+    def for_child(cls, child, profile):
+        return cls(
+            age_months=child.age_in_months(),
+            allergies=parse_allergies(child.allergies),
+            dislikes=child.dislikes_ingredients.values_list('id', flat=True),
+            exclude_purees=profile.exclude_purees,
+        )
+
+
+class PlanPreferences:
+    """Within-week and across-week variety levels per meal type (lower-case keys)."""
+
+    def __init__(self, within_week=None, across_week=None):
+        self.within_week = within_week or {}
+        self.across_week = across_week or {}
+
+    @classmethod
+    def for_profile(cls, profile):
+        return cls(profile.within_week_preferences, profile.across_week_preferences)
+
+    def within_week_level(self, meal_type):
+        return (self.within_week.get(meal_type.lower()) or "medium").lower()
+
+    def across_week_level(self, meal_type):
+        return (self.across_week.get(meal_type.lower()) or "medium").lower()
+
+
+### Planning ###
+
+def load_history_rows(child, since, until):
+    """
+    ``(start_date, breakfast_id, lunch_id, dinner_id, snack_id)`` for every meal
+    in ``child``'s plans starting in ``[since, until)``, in one query on the
+    (child, start_date) index.
+    """
+    return list(Meal.objects.filter(
+        meal_plan__child=child,
+        meal_plan__start_date__gte=since,
+        meal_plan__start_date__lt=until,
+    ).values_list("meal_plan__start_date", "breakfast_id", "lunch_id", "dinner_id", "snack_id"))
+
+
+def build_plan_history(rows, start_date, weeks=HISTORY_WEEKS):
+    """
+    Fold history rows into ``{meal_type: {recipe_id: weeks_ago}}`` for the week starting ``start_date``.
+
+    Meal types are lower-case and ``weeks_ago`` counts from 1 for the
+    previous week; rows outside the ``weeks`` window before ``start_date``
+    are ignored.
+    """
+    history = {meal_type.lower(): {} for meal_type in MEAL_TYPES}
+    for plan_start, *recipe_ids in rows:
+        weeks_ago = (start_date - plan_start).days // 7
+        if not 1 <= weeks_ago <= weeks:
+            continue
+        for meal_type, recipe_id in zip(history, recipe_ids):
+            if recipe_id and weeks_ago < history[meal_type].get(recipe_id, weeks + 1):
+                history[meal_type][recipe_id] = weeks_ago
+    return history
+
+
+def grid_history_rows(start_date, grid):
+    """History rows for a freshly planned (not yet saved) week."""
+    return [
+        (start_date, *(grid[day].get(f"{meal_type.lower()}_id") for meal_type in MEAL_TYPES))
+        for day in DAYS
+    ]
+
+
+def load_plan_history(child, start_date, weeks=HISTORY_WEEKS):
+    """Recipes used in ``child``'s plans for the ``weeks`` weeks before ``start_date`` (one query)."""
+    if weeks <= 0:
+        return build_plan_history([], start_date, weeks)
+    rows = load_history_rows(child, start_date - timedelta(weeks=weeks), start_date)
+    return build_plan_history(rows, start_date, weeks)
+
+
+def select_recipes(possible_recipes, count, level="medium", recent=None, rng=random):
+    """
+    Randomly pick ``count`` recipes, honouring the across-week variety ``level``.
+
+    ``recent`` maps recipe ids to how many weeks ago they were last planned
+    (one entry of ``load_plan_history``). Recipes inside the level's lookback
+    window are either excluded or only used once the fresh ones run out.
+    """
+    count = min(count, len(possible_recipes))
+    lookback, mode = ACROSS_WEEK_RULES.get(level, ACROSS_WEEK_RULES["medium"])
+    recently_used = {recipe_id for recipe_id, weeks_ago in (recent or {}).items() if weeks_ago <= lookback}
+    if not mode or not recently_used:
+        return rng.sample(possible_recipes, count)
+
+    fresh = [recipe_id for recipe_id in possible_recipes if recipe_id not in recently_used]
+    if mode == "exclude" and fresh:
+        return rng.sample(fresh, min(count, len(fresh)))
+
+    selected = rng.sample(fresh, min(count, len(fresh)))
+    if len(selected) < count:
+        stale = [recipe_id for recipe_id in possible_recipes if recipe_id in recently_used]
+        selected += rng.sample(stale, count - len(selected))
+    return selected
+
+
+def plan_week(constraints, preferences, index, history=None, rng=random):
+    """
+    Plan one week for a child without touching the database.
+
+    Returns a 7x4 slot grid ``{day: {"breakfast_id": ..., "lunch_id": ..., ...}}``.
+    Meal types without any eligible recipe are left out of the grid.
+    """
+    history = history or {}
+    grid = {day: {} for day in DAYS}
+
+    for meal_type in MEAL_TYPES:
+        slot = meal_type.lower()
+        (min_variety, max_variety), strategy = VARIETY_LEVELS.get(
+            preferences.within_week_level(meal_type), VARIETY_LEVELS["medium"]
+        )
+
+        possible_recipes = index.candidates(
+            meal_type, constraints.age_months,
+            allergies=constraints.allergies,
+            dislikes=constraints.dislikes,
+            exclude_purees=constraints.exclude_purees,
+        )
+        if not possible_recipes:
+            logger.warning(f"⚠️ No valid recipes found for {meal_type}.")
+            continue
+
+        # Avoid recipes from recent weeks according to the across-week preference
+        selected_recipes = select_recipes(
+            possible_recipes, rng.randint(min_variety, max_variety),
+            preferences.across_week_level(meal_type), history.get(slot), rng=rng,
+        )
+
+        for day, recipe_id in zip(DAYS, DAY_STRATEGIES[strategy](selected_recipes, DAYS)):
+            grid[day][f"{slot}_id"] = recipe_id
+
+    return grid
+
+
+def plan_week_for_child(child, start_date, rng=random):
+    """Load a child's planning inputs and plan the week starting ``start_date``."""
+    profile = child.parent.profile
+    return plan_week(
+        ChildConstraints.for_child(child, profile),
+        PlanPreferences.for_profile(profile),
+        get_eligibility_index(),
+        history=load_plan_history(child, start_date),
+        rng=rng,
+    )
+
+
+def plan_horizon(child, start_dates, existing_rows=None, rng=random):
+    """
+    Plan several weeks for ``child`` in one pass.
+
+    Constraints, preferences and candidate pools are loaded once, and each
+    planned week feeds the across-week history of the following ones.
+    Returns ``{start_date: grid}`` in ``start_dates`` order.
+    """
+    start_dates = sorted(start_dates)
+    if not start_dates:
+        return {}
+    profile = child.parent.profile
+    constraints = ChildConstraints.for_child(child, profile)
+    preferences = PlanPreferences.for_profile(profile)
+    index = get_eligibility_index()
+
+    if existing_rows is None:
+        existing_rows = load_history_rows(
+            child, start_dates[0] - timedelta(weeks=HISTORY_WEEKS), start_dates[-1]
+        )
+    rows = list(existing_rows)
+
+    grids = {}
+    for start_date in start_dates:
+        grid = plan_week(constraints, preferences, index, history=build_plan_history(rows, start_date), rng=rng)
+        grids[start_date] = grid
+        rows.extend(grid_history_rows(start_date, grid))
+    return grids
+
+
+### Persistence ###
+
+def write_meal_plan(meal_plan, assignments):
+    """
+    Replace the meals of ``meal_plan`` with ``assignments`` in one transaction.
+
+    ``assignments`` maps each day to Meal field values, e.g.
+    ``{"monday": {"breakfast_id": "REC-0000001", ...}, ...}``. All seven Meal
+    rows are built in memory and saved with a single bulk_create. Touching the
+    plan first locks its row, so two writers can't interleave their DELETE and
+    INSERT, and retires its cached dashboard grid. The plan's shopping list
+    is rewritten from the new meals in the same transaction.
+    """
+    meals = [Meal(meal_plan=meal_plan, day=day, **assignments.get(day, {})) for day in DAYS]
+    with transaction.atomic():
+        invalidate_week_fragment(meal_plan.pk)
+        Meal.objects.filter(meal_plan=meal_plan).delete()
+        Meal.objects.bulk_create(meals)
+        write_shopping_lists({meal_plan.pk: meals_recipe_counts(meals)})
+    return meals
+
+
+def week_start_for_offset(week_offset=0):
+    """Monday of the week ``week_offset`` weeks away from the current one."""
+    today = now().date()
+    return today - timedelta(days=today.weekday()) + timedelta(weeks=week_offset)
+
+
+def _existing_plans(child_id, start_dates):
+    return {
+        plan.start_date: plan
+        for plan in MealPlan.objects.filter(child_id=child_id, start_date__in=start_dates)
+    }
+
+
+@contextmanager
+def write_transaction():
+    """
+    ``transaction.atomic()`` for blocks that read before they write.
+
+    On SQLite it starts with ``BEGIN IMMEDIATE``, taking the write lock up
+    front: a deferred transaction that reads first and then finds another
+    writer fails with "database is locked" straight away, instead of waiting
+    out the connection timeout. Other databases get a plain atomic block.
+    """
+    connection = transaction.get_connection()
+    if connection.vendor != "sqlite" or connection.in_atomic_block:
+        with transaction.atomic():
+            yield
+        return
+    # Connecting resets transaction_mode from the settings, so connect first
+    connection.ensure_connection()
+    previous_mode = connection.transaction_mode
+    connection.transaction_mode = "IMMEDIATE"
+    try:
+        with transaction.atomic():
+            connection.transaction_mode = previous_mode
+            yield
+    finally:
+        connection.transaction_mode = previous_mode
+
+
+def generate_meal_plans(child_id, week_offsets):
+    """
+    Make sure ``child_id`` has a meal plan for each of ``week_offsets``
+    (weeks from the current one); see ``generate_meal_plans_for_dates``.
+    """
+    return generate_meal_plans_for_dates(child_id, [week_start_for_offset(offset) for offset in week_offsets])
+
+
+def generate_meal_plans_for_dates(child_id, start_dates):
+    """
+    Make sure ``child_id`` has a meal plan for each week starting on one of ``start_dates``.
+
+    Missing weeks are planned together (see ``plan_horizon``) before any lock
+    is taken, then saved with one bulk insert of plans and one of meals, in a
+    short transaction. Returns the plans, existing and new, in
+    ``start_dates`` order.
+
+    The write transaction locks the child's row and checks again which weeks
+    are missing, so when two callers plan the same weeks at once only the
+    first one's plans are written and the other returns them. The unique
+    constraint on (child, start_date) backs this up.
+    """
+    if not start_dates:
+        return []
+
+    plans = _existing_plans(child_id, start_dates)
+    missing = sorted(set(start_dates) - set(plans))
+    if missing:
+        child = get_object_or_404(Child.objects.select_related('parent__profile'), id=child_id)
+        grids = plan_horizon(child, missing)
+        with write_transaction():
+            list(Child.objects.select_for_update().filter(id=child_id).only('id'))
+            # Someone else may have written some weeks while we were planning
+            plans = _existing_plans(child_id, start_dates)
+            missing = [start_date for start_date in missing if start_date not in plans]
+            if missing:
+                plans.update(
+                    (plan.start_date, plan)
+                    for plan in _create_plans(child, {start_date: grids[start_date] for start_date in missing})
+                )
+                logger.info(f"MealPlans created for child {child_id}: {', '.join(str(d) for d in missing)}")
+    else:
+        logger.info(f"MealPlan already exists for child {child_id} for the requested weeks")
+
+    return [plans[start_date] for start_date in start_dates]
+
+
+def _create_plans(child, grids):
+    """Save planned weeks (``{start_date: grid}``, none existing yet) as new plans."""
+    start_dates = sorted(grids)
+    new_plans = [
+        MealPlan(child=child, start_date=start_date, end_date=start_date + timedelta(days=6))
+        for start_date in start_dates
+    ]
+    MealPlan.objects.bulk_create(new_plans)
+    if any(plan.pk is None for plan in new_plans):
+        # Backends that can't return ids from a bulk insert
+        new_plans = list(MealPlan.objects.filter(child=child, start_date__in=start_dates))
+    meals = {
+        plan.pk: [Meal(meal_plan=plan, day=day, **grids[plan.start_date].get(day, {})) for day in DAYS]
+        for plan in new_plans
+    }
+    Meal.objects.bulk_create([meal for plan_meals in meals.values() for meal in plan_meals])
+    write_shopping_lists({meal_plan_id: meals_recipe_counts(plan_meals) for meal_plan_id, plan_meals in meals.items()})
+    return new_plans
+
+
+def generate_meal_plan(child_id, week_offset=0):
+    """Create the meal plan for ``child_id`` and the given week, unless one already exists."""
+    logger.info(f"⚙️ generate_meal_plan called for child_id={child_id}, week_offset={week_offset}")
+    return generate_meal_plans(child_id, [week_offset])[0]
+
+
+def regenerate_meals_for_plan(meal_plan):
+    """Updates meals inside an existing meal plan without creating a new plan."""
+    grid = plan_week_for_child(meal_plan.child, meal_plan.start_date)
+    write_meal_plan(meal_plan, grid)
+    return meal_plan
@@ -0,0 +1,235 @@
+"""
+Static HTML copies of the public pages, for nginx to serve without Django.
+
+The landing page, terms, privacy, the blog and the public recipe pages
+(``public_recipe``) look the same to every anonymous visitor, so they are
+registered with django_distill (``distill_path`` in base/urls.py and
+blog/urls.py) and written to ``settings.DISTILL_DIR`` as
+``<path>/index.html``. ``manage.py distill-local`` still exports everything
+from scratch; ``manage.py prerender_pages`` updates the export incrementally.
+
+Each page gets a fingerprint of what it is rendered from: the rows it shows
+plus the template files. Fingerprints of the last run are kept in a manifest
+in the output directory, so only pages whose content changed are rendered
+again, and pages whose recipe or post is gone are deleted. Files are swapped
+in atomically, so nginx never serves a half-written page.
+
+nginx serves the copies to visitors without a session cookie and passes
+everyone else (and anything not pre-rendered) to Django::
+
+    map $cookie_sessionid $prerendered_page {
+        ""       $uri/index.html;
+        default  /-;
+    }
+    location / {
+        root /srv/tottable/prerendered;
+        try_files $prerendered_page @django;
+    }
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".prerender-manifest.json"
+
+# Pages that only depend on their templates
+STATIC_PAGES = ["landing_page", "terms", "privacy"]
+
+
+def _fingerprint(*parts):
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _template_fingerprint():
+    """Hash of every project template, so a deploy that changes one re-renders all pages."""
+    digest = hashlib.blake2b(digest_size=16)
+    for directory in settings.TEMPLATES[0]["DIRS"]:
+        for path in sorted(Path(directory).rglob("*.html")):
+            digest.update(str(path.relative_to(directory)).encode("utf-8"))
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def page_path(view_name, args=()):
+    """File a page is written to, relative to the output directory (as distill names it)."""
+    return reverse(view_name, args=args).lstrip("/") + "index.html"
+
+
+def public_pages():
+    """
+    ``{path: (view_name, args, fingerprint)}`` for every pre-rendered page.
+
+    Five queries in all, however many posts and recipes there are.
+    """
+    from blog.models import Post
+
+    from .models import Recipe, RecipeIngredient
+
+    templates = _template_fingerprint()
+    pages = {page_path(name): (name, (), _fingerprint(templates)) for name in STATIC_PAGES}
+
+    posts = Post.objects.filter(is_published=True)
+    tags = {}
+    for post_id, tag in posts.values_list("id", "tags__name"):
+        if tag:
+            tags.setdefault(post_id, []).append(tag)
+    post_rows = list(posts.order_by("id").values_list(
+        "id", "slug", "title", "content", "image", "published_date", "author__username"
+    ))
+    for row in post_rows:
+        slug = row[1]
+        pages[page_path("blog_post", (slug,))] = (
+            "blog_post", (slug,), _fingerprint(templates, row, sorted(tags.get(row[0], [])))
+        )
+    pages[page_path("post_list")] = ("post_list", (), _fingerprint(templates, post_rows))
+
+    recipes = Recipe.objects.order_by("id")
+    meal_types = {}
+    for recipe_id, meal_type in recipes.values_list("id", "meal_types__name"):
+        if meal_type:
+            meal_types.setdefault(recipe_id, []).append(meal_type)
+    ingredients = {}
+    for recipe_id, *ingredient in RecipeIngredient.objects.order_by("id").values_list(
+        "recipe_id", "ingredient__name", "quantity", "unit"
+    ):
+        ingredients.setdefault(recipe_id, []).append(ingredient)
+    recipe_rows = list(recipes.values_list(
+        "id", "title", "description", "preparation_time", "cooking_time", "image", "tags",
+        "min_age_months", "max_age_months", "instruction_steps", "tip_steps",
+        "allergen_mask", "is_vegetarian", "is_vegan",
+    ))
+    for row in recipe_rows:
+        recipe_id = row[0]
+        pages[page_path("public_recipe", (recipe_id,))] = (
+            "public_recipe", (recipe_id,),
+            _fingerprint(templates, row, sorted(meal_types.get(recipe_id, [])), ingredients.get(recipe_id, [])),
+        )
+    pages[page_path("public_recipe_index")] = (
+        "public_recipe_index", (),
+        _fingerprint(templates, [row[:2] + row[5:6] + row[7:9] for row in recipe_rows]),
+    )
+    return pages
+
+
+def _write_atomic(full_path, content):
+    directory = os.path.dirname(full_path)
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=".prerender-")
+    try:
+        with os.fdopen(descriptor, "wb") as temp_file:
+            temp_file.write(content)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, full_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _remove_page(output_dir, path):
+    full_path = os.path.join(output_dir, path)
+    if os.path.exists(full_path):
+        os.unlink(full_path)
+    # Drop directories the page leaves empty, but never the output directory
+    directory = os.path.dirname(full_path)
+    while os.path.abspath(directory) != os.path.abspath(output_dir):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            break
+        directory = os.path.dirname(directory)
+
+
+def prerender(output_dir=None, force=False):
+    """
+    Bring the static copies in ``output_dir`` (``DISTILL_DIR`` by default) up to date.
+
+    Renders new and changed pages (every page if ``force``) and deletes pages
+    that are no longer public. Returns ``(rendered, deleted, unchanged)`` counts.
+    """
+    from django_distill import urls_to_distill
+    from django_distill.renderer import get_renderer, load_urls
+
+    output_dir = str(output_dir or settings.DISTILL_DIR)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        manifest = {}
+
+    started = time.perf_counter()
+    pages = public_pages()
+    stale = {
+        path: page for path, page in pages.items()
+        if force or manifest.get(path) != page[2] or not os.path.exists(os.path.join(output_dir, path))
+    }
+    gone = [path for path in manifest if path not in pages]
+
+    if stale:
+        load_urls()
+        renderer = get_renderer(urls_to_distill)
+        for path, (view_name, args, fingerprint) in sorted(stale.items()):
+            _, _, response = renderer.render(view_name, (200,), args, {})
+            _write_atomic(os.path.join(output_dir, path), response.content)
+            manifest[path] = fingerprint
+    for path in gone:
+        _remove_page(output_dir, path)
+        del manifest[path]
+
+    if stale or gone:
+        _write_atomic(manifest_path, json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"))
+        logger.info(
+            f"📄 Pre-rendered {len(stale)} pages and removed {len(gone)} in {time.perf_counter() - started:.2f}s"
+        )
+    return len(stale), len(gone), len(pages) - len(stale)
+
+
+def _json_ld(data):
+    """``data`` as JSON that is safe inside a <script> element."""
+    return (
+        json.dumps(data, ensure_ascii=False)
+        .replace("<", "\\u003C").replace(">", "\\u003E").replace("&", "\\u0026")
+    )
+
+
+def recipe_json_ld(recipe, ingredients, meal_types):
+    """schema.org ``Recipe`` structured data for the public recipe page."""
+    site = settings.PUBLIC_SITE_URL.rstrip("/")
+    data = {
+        "@context": "https://schema.org",
+        "@type": "Recipe",
+        "name": recipe.title,
+        "url": site + reverse("public_recipe", args=[recipe.id]),
+        "description": recipe.description or "",
+        "prepTime": f"PT{recipe.preparation_time}M",
+        "cookTime": f"PT{recipe.cooking_time}M",
+        "totalTime": f"PT{recipe.preparation_time + recipe.cooking_time}M",
+        "recipeCategory": [meal_type.name for meal_type in meal_types],
+        "recipeIngredient": [
+            " ".join(filter(None, [str(item.quantity_as_fraction()), item.unit, item.ingredient.name]))
+            for item in ingredients
+        ],
+        "recipeInstructions": [
+            {"@type": "HowToStep", "name": heading, "text": body} if heading else {"@type": "HowToStep", "text": body}
+            for heading, body in recipe.instruction_steps
+        ],
+    }
+    if recipe.image:
+        data["image"] = site + recipe.image.url
+    if recipe.tags:
+        data["keywords"] = recipe.tags
+    if recipe.is_vegan:
+        data["suitableForDiet"] = "https://schema.org/VeganDiet"
+    elif recipe.is_vegetarian:
+        data["suitableForDiet"] = "https://schema.org/VegetarianDiet"
+    return _json_ld(data)
@@ -0,0 +1,191 @@
+"""
+Numeric, unit-aware ingredient quantities.
+
+RecipeIngredient.quantity and .unit are free text from the recipe CSVs
+("1/2", "1½ pounds (about 5 medium)", "as needed"; "cups", "tablespoon
+(unsalted)", "medium"). ``parse_quantity`` turns them into an exact
+``Fraction`` amount and a canonical unit once, when the row is saved (see
+signals.py), and RecipeIngredient stores both. Rows without a number, like
+"as needed", have no amount.
+
+Units of the same kind convert through ``UNITS``: volumes to millilitres and
+weights to grams, using the exact US customary definitions, so sums stay
+exact rationals. Counted units (cloves, slices, or plain "2") only add up
+with themselves. ``QuantitySum`` adds amounts across a week's recipes and
+shows each kind in the largest unit that went into it, e.g. 1 cup plus
+2 tablespoons is "1 1/8 cups".
+"""
+import re
+from fractions import Fraction
+
+VOLUME = "volume"
+MASS = "mass"
+
+TEASPOON_ML = Fraction("4.92892159375")
+OUNCE_G = Fraction("28.349523125")
+
+# Canonical unit -> (kind, size in the kind's base unit). Counted units are
+# their own kind with size 1; "" is a plain count ("2" carrots).
+UNITS = {
+    "ml": (VOLUME, Fraction(1)),
+    "tsp": (VOLUME, TEASPOON_ML),
+    "tbsp": (VOLUME, 3 * TEASPOON_ML),
+    "fl oz": (VOLUME, 6 * TEASPOON_ML),
+    "cup": (VOLUME, 48 * TEASPOON_ML),
+    "pint": (VOLUME, 96 * TEASPOON_ML),
+    "quart": (VOLUME, 192 * TEASPOON_ML),
+    "l": (VOLUME, Fraction(1000)),
+    "g": (MASS, Fraction(1)),
+    "oz": (MASS, OUNCE_G),
+    "lb": (MASS, 16 * OUNCE_G),
+    "kg": (MASS, Fraction(1000)),
+}
+COUNTED_UNITS = ["", "clove", "slice", "leaf", "stalk", "piece", "scoop", "pinch", "can", "head"]
+UNITS.update({unit: (unit, Fraction(1)) for unit in COUNTED_UNITS})
+
+# Canonical unit -> (singular, plural) for display
+UNIT_NAMES = {
+    "ml": ("ml", "ml"), "tsp": ("teaspoon", "teaspoons"), "tbsp": ("tablespoon", "tablespoons"),
+    "fl oz": ("fl oz", "fl oz"), "cup": ("cup", "cups"), "pint": ("pint", "pints"),
+    "quart": ("quart", "quarts"), "l": ("litre", "litres"), "g": ("g", "g"), "oz": ("ounce", "ounces"),
+    "lb": ("pound", "pounds"), "kg": ("kg", "kg"), "": ("", ""), "clove": ("clove", "cloves"),
+    "slice": ("slice", "slices"), "leaf": ("leaf", "leaves"), "stalk": ("stalk", "stalks"),
+    "piece": ("piece", "pieces"), "scoop": ("scoop", "scoops"), "pinch": ("pinch", "pinches"),
+    "can": ("can", "cans"), "head": ("head", "heads"),
+}
+
+# Unit words as written in the CSVs -> canonical unit. Sizes ("medium") are plain counts.
+UNIT_ALIASES = {
+    "teaspoon": "tsp", "teaspoons": "tsp", "tsp": "tsp",
+    "tablespoon": "tbsp", "tablespoons": "tbsp", "tbsp": "tbsp",
+    "fl oz": "fl oz", "fluid ounce": "fl oz", "fluid ounces": "fl oz",
+    "cup": "cup", "cups": "cup", "pint": "pint", "pints": "pint", "quart": "quart", "quarts": "quart",
+    "ml": "ml", "millilitre": "ml", "millilitres": "ml", "milliliter": "ml", "milliliters": "ml",
+    "l": "l", "litre": "l", "litres": "l", "liter": "l", "liters": "l",
+    "g": "g", "gram": "g", "grams": "g", "kg": "kg", "kilogram": "kg", "kilograms": "kg",
+    "oz": "oz", "ounce": "oz", "ounces": "oz", "lb": "lb", "lbs": "lb", "pound": "lb", "pounds": "lb",
+    "clove": "clove", "cloves": "clove", "slice": "slice", "slices": "slice", "leaf": "leaf",
+    "leaves": "leaf", "stalk": "stalk", "stalks": "stalk", "piece": "piece", "pieces": "piece",
+    "scoop": "scoop", "scoops": "scoop", "pinch": "pinch", "pinches": "pinch", "can": "can",
+    "cans": "can", "head": "head", "heads": "head",
+    "small": "", "medium": "", "large": "", "whole": "", "unit": "", "units": "",
+}
+
+VULGAR_FRACTIONS = {
+    "½": "1/2", "⅓": "1/3", "⅔": "2/3", "¼": "1/4", "¾": "3/4", "⅕": "1/5",
+    "⅛": "1/8", "⅜": "3/8", "⅝": "5/8", "⅞": "7/8",
+}
+_NUMBER = r"(?:\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)"
+_LEADING_QUANTITY = re.compile(rf"\s*({_NUMBER})(?:\s*[-–]\s*({_NUMBER}))?\s*")
+_PLAIN_NUMBER = re.compile(rf"\s*{_NUMBER}\s*")
+_WORD = re.compile(r"[a-z]+")
+
+# Denominators a rounded amount may be shown with
+DISPLAY_DENOMINATORS = (1, 2, 3, 4, 8)
+
+
+def _expand_fractions(text):
+    for symbol, fraction in VULGAR_FRACTIONS.items():
+        text = text.replace(symbol, f" {fraction}")
+    return text
+
+
+def _number(text):
+    whole, _, fraction = text.strip().rpartition(" ")
+    return Fraction(fraction) + (Fraction(whole) if whole else 0)
+
+
+def canonical_unit(text):
+    """The canonical unit ``text`` starts with, or None if it doesn't start with one."""
+    words = _WORD.findall((text or "").lower())
+    if len(words) >= 2 and f"{words[0]} {words[1]}" in UNIT_ALIASES:
+        return UNIT_ALIASES[f"{words[0]} {words[1]}"]
+    if words and words[0] in UNIT_ALIASES:
+        return UNIT_ALIASES[words[0]]
+    return None
+
+
+def parse_quantity(quantity, unit=""):
+    """
+    ``(amount, canonical unit)`` for a RecipeIngredient's quantity and unit text.
+
+    The amount is a ``Fraction`` (the larger end of a range like "2-3"), or
+    None when there is no number. The unit comes from the unit text, else
+    from the words after the number ("1½ pounds"), else it is a plain count.
+    """
+    text = _expand_fractions(quantity or "")
+    match = _LEADING_QUANTITY.match(text)
+    if match is None:
+        # "Pinch" on its own means one pinch; "as needed" has no amount
+        named_unit = canonical_unit(text)
+        amount = Fraction(1) if text.strip() and named_unit else None
+        return amount, canonical_unit(unit) or named_unit or ""
+    try:
+        amount = _number(match.group(2) or match.group(1))
+    except (ValueError, ZeroDivisionError):
+        return None, canonical_unit(unit) or ""
+    unit_name = canonical_unit(unit)
+    if unit_name is None:
+        unit_name = canonical_unit(text[match.end():]) or ""
+    return amount, unit_name
+
+
+def is_plain_number(quantity):
+    """Whether ``quantity`` is only a number ("1.5", "3/4", "1 1/2", "1½"), with no words."""
+    return bool(_PLAIN_NUMBER.fullmatch(_expand_fractions(quantity or "")))
+
+
+def format_amount(amount):
+    """
+    ``amount`` as a whole or mixed number ("1 1/2"). Fractions with a
+    denominator over 8 are rounded to the nearest half, third, quarter or eighth.
+    """
+    if amount.denominator > 8:
+        amount = min(
+            (Fraction(round(amount * denominator), denominator) for denominator in DISPLAY_DENOMINATORS),
+            key=lambda candidate: abs(candidate - amount),
+        ) or Fraction(1, 8)
+    whole, remainder = divmod(amount, 1)
+    if not remainder:
+        return str(whole)
+    fraction = f"{remainder.numerator}/{remainder.denominator}"
+    return f"{whole} {fraction}" if whole else fraction
+
+
+def format_quantity(amount, unit):
+    """``amount`` of ``unit`` for display, e.g. "1 1/2 cups" or "2"."""
+    singular, plural = UNIT_NAMES[unit]
+    name = singular if amount <= 1 else plural
+    return f"{format_amount(amount)} {name}".rstrip()
+
+
+class QuantitySum:
+    """Exact running total of one ingredient's amounts, kept per kind of unit."""
+
+    def __init__(self):
+        self.totals = {}  # kind -> amount in the kind's base unit
+        self.display_units = {}  # kind -> largest unit added
+        self.unmeasured = False  # some "as needed" row was added
+
+    def add(self, amount, unit, times=1):
+        if amount is None:
+            self.unmeasured = True
+            return
+        kind, size = UNITS[unit]
+        self.totals[kind] = self.totals.get(kind, 0) + amount * size * times
+        shown = self.display_units.get(kind)
+        if shown is None or size > UNITS[shown][1]:
+            self.display_units[kind] = unit
+
+    def amounts(self):
+        """``[(amount, unit), ...]``, one per kind, each in its display unit."""
+        return [
+            (total / UNITS[self.display_units[kind]][1], self.display_units[kind])
+            for kind, total in self.totals.items()
+        ]
+
+    def __str__(self):
+        parts = [format_quantity(amount, unit) for amount, unit in self.amounts()]
+        if not parts and self.unmeasured:
+            return "as needed"
+        return " + ".join(parts)
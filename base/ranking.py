@@ -0,0 +1,99 @@
+"""
+Ranking recipes for one child in the recipe library.
+
+``child_recipe_scores`` scores the whole catalog for a child in one pass over
+the planner's ``EligibilityIndex`` bitsets (see catalog.py): each liked or
+disliked ingredient, liked or disliked recipe, allergen and the child's age
+band adds its weight to every recipe in the matching bitset. No per-recipe
+query is needed, and only the child's preferences are read from the database.
+
+Scores are cached per child, keyed on the catalog version, the child's age in
+months and ``Child.preferences_version``, a counter in the database that
+signals.py bumps whenever the child or their likes/dislikes change, so every
+process stops using the old scores at once. Recipes already in this week's plan are
+pushed down separately (``rank_recipe_ids``), as they change with every swap.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from .catalog import bit_positions, get_eligibility_index, parse_allergies
+from .dietary import allergy_bit
+from .models import Child, Meal
+
+LIKED_INGREDIENT_WEIGHT = 2.0
+DISLIKED_INGREDIENT_WEIGHT = -3.0
+LIKED_RECIPE_WEIGHT = 5.0
+DISLIKED_RECIPE_WEIGHT = -5.0
+AGE_FIT_WEIGHT = 1.0
+ALLERGEN_WEIGHT = -100.0  # still listed, but after everything safe
+IN_PLAN_WEIGHT = -2.0  # already on this week's menu
+
+
+def bump_child_preferences_version(child_ids):
+    """Retire the cached scores of children whose preferences changed, in every process."""
+    Child.objects.filter(pk__in=list(child_ids)).update(preferences_version=F("preferences_version") + 1)
+
+
+def child_recipe_scores(child):
+    """``{recipe_id: score}`` for every recipe with a non-zero score for ``child``."""
+    index = get_eligibility_index()
+    age_months = child.age_in_months()
+    key = f"ranking:child:{child.id}:{child.preferences_version}:{index.version}:{age_months}"
+    scores = cache.get(key)
+    if scores is not None:
+        return scores
+
+    position = {recipe_id: pos for pos, recipe_id in enumerate(index.recipe_ids)}
+    weighted_bitsets = [
+        (index.ingredient_bits.get(ingredient_id, 0), LIKED_INGREDIENT_WEIGHT)
+        for ingredient_id in child.likes_ingredients.values_list("id", flat=True)
+    ]
+    weighted_bitsets += [
+        (index.ingredient_bits.get(ingredient_id, 0), DISLIKED_INGREDIENT_WEIGHT)
+        for ingredient_id in child.dislikes_ingredients.values_list("id", flat=True)
+    ]
+    allergens = 0
+    for allergen in parse_allergies(child.allergies):
+        allergens |= index.allergen_bits.get(allergy_bit(allergen), 0)
+    weighted_bitsets.append((allergens, ALLERGEN_WEIGHT))
+    if 0 <= age_months < len(index.age_bits):
+        weighted_bitsets.append((index.age_bits[age_months], AGE_FIT_WEIGHT))
+
+    totals = [0.0] * len(index.recipe_ids)
+    for bits, weight in weighted_bitsets:
+        for pos in bit_positions(bits):
+            totals[pos] += weight
+    for recipe_ids, weight in (
+        (child.likes_recipes.values_list("id", flat=True), LIKED_RECIPE_WEIGHT),
+        (child.dislikes_recipes.values_list("id", flat=True), DISLIKED_RECIPE_WEIGHT),
+    ):
+        for recipe_id in recipe_ids:
+            if recipe_id in position:
+                totals[position[recipe_id]] += weight
+
+    scores = {recipe_id: total for recipe_id, total in zip(index.recipe_ids, totals) if total}
+    cache.set(key, scores, getattr(settings, "CHILD_RANKING_CACHE_TIMEOUT", 60 * 60 * 24))
+    return scores
+
+
+def rank_recipe_ids(recipe_ids, scores, planned=()):
+    """
+    Sort keys ``(-score, recipe_id)`` of ``recipe_ids``, best first.
+
+    ``planned`` recipes (this week's plan) get ``IN_PLAN_WEIGHT`` on top of
+    their cached score.
+    """
+    planned = set(planned)
+    return sorted(
+        (-(scores.get(recipe_id, 0.0) + (IN_PLAN_WEIGHT if recipe_id in planned else 0.0)), recipe_id)
+        for recipe_id in recipe_ids
+    )
+
+
+def planned_recipe_ids(child, week_start):
+    """Recipes in any slot of ``child``'s plan for the week starting ``week_start``."""
+    slots = Meal.objects.filter(meal_plan__child=child, meal_plan__start_date=week_start).values_list(
+        "breakfast_id", "lunch_id", "dinner_id", "snack_id"
+    )
+    return {recipe_id for meal in slots for recipe_id in meal if recipe_id}
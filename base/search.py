@@ -0,0 +1,150 @@
+"""
+Full-text recipe search.
+
+On SQLite the recipe library searches an FTS5 table, ``base_recipe_search``,
+with one row per recipe covering its title, description, tags and ingredient
+names. Matches are ranked with bm25, weighting the title highest. The table
+is created by migration 0021 and kept in sync by the signals in signals.py;
+``rebuild_search_index`` refills it from scratch. Queries join it through the
+unmanaged ``RecipeSearchRow`` model, with the MATCH filter and the bm25 rank
+as ``RawSQL`` expressions on the joined table.
+
+Other databases (or SQLite builds without FTS5) fall back to the original
+``icontains`` filters.
+"""
+import logging
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Recipe, RecipeIngredient
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = "base_recipe_search"
+
+# bm25 column weights, in table column order: recipe_id (unindexed), title,
+# description, tags, ingredients
+COLUMN_WEIGHTS = (0.0, 10.0, 2.0, 4.0, 5.0)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_available = {}
+
+
+def fts_available():
+    """Whether the FTS5 search table exists on the default database."""
+    if connection.vendor != "sqlite":
+        return False
+    name = str(connection.settings_dict["NAME"])
+    if name not in _available:
+        with connection.cursor() as cursor:
+            _available[name] = SEARCH_TABLE in connection.introspection.table_names(cursor)
+    return _available[name]
+
+
+def match_expression(query):
+    """
+    Turn free text into an FTS5 query: every word must match, as a prefix.
+
+    Words are quoted, so FTS5 operators and punctuation in user input are
+    treated as plain text. Returns None if the query has no words.
+    """
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def search_recipes(queryset, query):
+    """
+    Narrow a Recipe queryset to recipes matching ``query``.
+
+    With FTS5 the result is ordered by relevance (best first) and carries a
+    ``search_rank`` column; otherwise it is the plain ``icontains`` filter.
+    """
+    if fts_available():
+        expression = match_expression(query)
+        if expression is None:
+            return queryset.none()
+        return (
+            queryset.filter(search_row__isnull=False)  # inner join on the search table
+            .filter(RawSQL(f"{SEARCH_TABLE} MATCH %s", [expression], output_field=BooleanField()))
+            .annotate(search_rank=RawSQL(_rank_sql(), [], output_field=FloatField()))
+            .order_by("search_rank")
+        )
+
+    # Ingredients in a subquery rather than a join, so each recipe appears once
+    return queryset.filter(
+        Q(title__icontains=query) |
+        Q(description__icontains=query) |
+        Q(id__in=RecipeIngredient.objects.filter(ingredient__name__icontains=query).values("recipe_id"))
+    )
+
+
+def _rank_sql():
+    weights = ", ".join(str(weight) for weight in COLUMN_WEIGHTS)
+    return f"bm25({SEARCH_TABLE}, {weights})"
+
+
+def ranked_after(queryset, search_rank, recipe_id, reverse=False):
+    """
+    Keyset filter for ``search_recipes`` results ordered by ``(search_rank, id)``:
+    keep the ones after that position, or before it if ``reverse``.
+    """
+    lookup = "lt" if reverse else "gt"
+    return queryset.filter(
+        Q(**{f"search_rank__{lookup}": search_rank}) | Q(search_rank=search_rank, **{f"id__{lookup}": recipe_id})
+    )
+
+
+def _search_rows(recipe_ids=None):
+    recipes = Recipe.objects.all()
+    links = RecipeIngredient.objects.all()
+    if recipe_ids is not None:
+        recipes = recipes.filter(id__in=recipe_ids)
+        links = links.filter(recipe_id__in=recipe_ids)
+
+    ingredient_names = {}
+    for recipe_id, name in links.values_list("recipe_id", "ingredient__name"):
+        ingredient_names.setdefault(recipe_id, []).append(name)
+
+    return [
+        (recipe_id, title, description or "", tags or "", " ".join(ingredient_names.get(recipe_id, [])))
+        for recipe_id, title, description, tags in recipes.values_list("id", "title", "description", "tags")
+    ]
+
+
+def index_recipes(recipe_ids):
+    """Refresh the search rows of ``recipe_ids``; recipes that no longer exist are dropped."""
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids or not fts_available():
+        return
+    rows = _search_rows(recipe_ids)
+    placeholders = ", ".join(["%s"] * len(recipe_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE recipe_id IN ({placeholders})", recipe_ids)
+        cursor.executemany(f"INSERT INTO {SEARCH_TABLE} VALUES (%s, %s, %s, %s, %s)", rows)
+
+
+def index_ingredient(ingredient_id):
+    """Refresh every recipe that uses ``ingredient_id`` (e.g. after a rename)."""
+    if fts_available():
+        index_recipes(
+            RecipeIngredient.objects.filter(ingredient_id=ingredient_id)
+            .values_list("recipe_id", flat=True).distinct()
+        )
+
+
+def rebuild_search_index():
+    """Refill the search table from the catalog. Returns the number of recipes indexed."""
+    if not fts_available():
+        return 0
+    rows = _search_rows()
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.executemany(f"INSERT INTO {SEARCH_TABLE} VALUES (%s, %s, %s, %s, %s)", rows)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+    logger.info(f"🔎 Rebuilt recipe search index: {len(rows)} recipes")
+    return len(rows)
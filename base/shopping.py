@@ -0,0 +1,165 @@
+"""
+The shopping list for a family's week.
+
+Each MealPlan keeps its shopping list materialized as ShoppingListItem rows:
+the exact total of every ingredient, per canonical unit (see quantities.py),
+over all of the plan's recipe slots. The rows only change when the plan's
+meals do, so the write paths keep them up to date:
+
+* planning or regenerating a week writes the plan's rows from the meals it
+  just built (``write_shopping_lists``),
+* a swap or removal applies a delta: the old recipe's ingredients are
+  subtracted and the new one's added (``apply_shopping_list_delta``).
+
+Reading the list (``shopping_list_items``) is then one indexed read of the
+rows of the week's plans. Rows are tagged with the catalog version they were
+built with (``MealPlan.shopping_list_version``), which is compared with the
+version in the database (see catalog.py): after a catalog change, or
+for plans written some other way, the first read rebuilds them from the
+plan's meals, with the same number of queries however many plans need it.
+"""
+from collections import Counter
+from fractions import Fraction
+
+from django.db import transaction
+
+from .catalog import catalog_version_subquery, get_catalog_version
+from .dashboard import RECIPE_SLOTS
+from .models import Meal, MealPlan, RecipeIngredient, ShoppingListItem
+from .quantities import QuantitySum
+
+
+def meals_recipe_counts(meals):
+    """``Counter`` of recipe id -> number of slots it fills in ``meals`` (Meal instances)."""
+    counts = Counter()
+    for meal in meals:
+        counts.update(
+            recipe_id for recipe_id in (getattr(meal, f"{slot}_id") for slot in RECIPE_SLOTS) if recipe_id
+        )
+    return counts
+
+
+def plan_recipe_counts(meal_plan_ids):
+    """``{meal_plan_id: Counter}`` of the recipe slots of each plan, in one query."""
+    counts = {meal_plan_id: Counter() for meal_plan_id in meal_plan_ids}
+    for meal_plan_id, *recipe_ids in Meal.objects.filter(meal_plan_id__in=meal_plan_ids).values_list(
+        "meal_plan_id", *(f"{slot}_id" for slot in RECIPE_SLOTS)
+    ):
+        counts[meal_plan_id].update(recipe_id for recipe_id in recipe_ids if recipe_id)
+    return counts
+
+
+def _ingredient_rows(recipe_ids):
+    """``{recipe_id: [(ingredient_id, unit, amount), ...]}`` for ``recipe_ids``, in one query."""
+    rows = {}
+    for recipe_id, ingredient_id, unit, numerator, denominator in RecipeIngredient.objects.filter(
+        recipe_id__in=list(recipe_ids)
+    ).values_list("recipe_id", "ingredient_id", "canonical_unit", "amount_numerator", "amount_denominator"):
+        # "as needed" rows count as a use with nothing to add
+        amount = Fraction(numerator, denominator) if numerator is not None else Fraction(0)
+        rows.setdefault(recipe_id, []).append((ingredient_id, unit, amount))
+    return rows
+
+
+def _totals(recipe_counts, rows):
+    """``{(ingredient_id, unit): [amount, uses]}`` for ``recipe_counts`` (counts may be negative)."""
+    totals = {}
+    for recipe_id, count in recipe_counts.items():
+        for ingredient_id, unit, amount in rows.get(recipe_id, []):
+            total = totals.setdefault((ingredient_id, unit), [Fraction(0), 0])
+            total[0] += amount * count
+            total[1] += count
+    return totals
+
+
+def write_shopping_lists(recipe_counts_by_plan, version=None):
+    """
+    Replace the shopping list rows of each plan in ``recipe_counts_by_plan``
+    (``{meal_plan_id: Counter of recipe ids}``) and tag them with ``version``
+    (the current catalog version by default).
+
+    Four queries for any number of plans.
+    """
+    if version is None:
+        version = get_catalog_version()
+    rows = _ingredient_rows(set().union(*recipe_counts_by_plan.values()))
+    items = [
+        ShoppingListItem(
+            meal_plan_id=meal_plan_id, ingredient_id=ingredient_id, unit=unit,
+            amount_numerator=amount.numerator, amount_denominator=amount.denominator, uses=uses,
+        )
+        for meal_plan_id, recipe_counts in recipe_counts_by_plan.items()
+        for (ingredient_id, unit), (amount, uses) in _totals(recipe_counts, rows).items()
+    ]
+    with transaction.atomic():
+        ShoppingListItem.objects.filter(meal_plan_id__in=list(recipe_counts_by_plan)).delete()
+        ShoppingListItem.objects.bulk_create(items, batch_size=500)
+        MealPlan.objects.filter(id__in=list(recipe_counts_by_plan)).update(shopping_list_version=version)
+
+
+def apply_shopping_list_delta(meal_plan_id, recipe_counts):
+    """
+    Adjust a plan's shopping list rows by ``recipe_counts`` (``{recipe_id: +n or -n}``).
+
+    Call it in the transaction that changes the meals. Plans whose rows are
+    missing or stale are left alone; their next read rebuilds them.
+    """
+    recipe_counts = {recipe_id: count for recipe_id, count in recipe_counts.items() if recipe_id and count}
+    if not recipe_counts:
+        return
+    if not MealPlan.objects.filter(id=meal_plan_id, shopping_list_version=catalog_version_subquery()).exists():
+        return
+
+    deltas = _totals(recipe_counts, _ingredient_rows(recipe_counts))
+    items = {
+        (item.ingredient_id, item.unit): item
+        for item in ShoppingListItem.objects.filter(
+            meal_plan_id=meal_plan_id, ingredient_id__in={ingredient_id for ingredient_id, _ in deltas}
+        )
+    }
+    created, changed, emptied = [], [], []
+    for (ingredient_id, unit), (amount, uses) in deltas.items():
+        if not uses and not amount:
+            continue  # e.g. the same recipe left and came back
+        item = items.get((ingredient_id, unit))
+        if item is None:
+            item = ShoppingListItem(meal_plan_id=meal_plan_id, ingredient_id=ingredient_id, unit=unit)
+        total = item.amount + amount
+        item.amount_numerator, item.amount_denominator = total.numerator, total.denominator
+        item.uses += uses
+        if item.uses <= 0:
+            emptied.append(item)
+        elif item.pk is None:
+            created.append(item)
+        else:
+            changed.append(item)
+    ShoppingListItem.objects.bulk_create(created)
+    ShoppingListItem.objects.bulk_update(changed, ["amount_numerator", "amount_denominator", "uses"])
+    ShoppingListItem.objects.filter(id__in=[item.pk for item in emptied if item.pk]).delete()
+
+
+def shopping_list_items(meal_plans):
+    """
+    ``{ingredient name: {"quantity": "1 1/8 cups + 2 cloves"}}`` for
+    ``meal_plans`` (a queryset), in alphabetical order.
+
+    The plans of several children are added together; amounts are exact
+    (see quantities.py) and shown in the largest unit that went into them.
+    """
+    plans = list(meal_plans.annotate(catalog_version=catalog_version_subquery()).values_list(
+        "id", "shopping_list_version", "catalog_version"
+    ))
+    stale = [meal_plan_id for meal_plan_id, built_with, version in plans if version is None or built_with != version]
+    if stale:
+        # Tag them with the version read above, so a concurrent catalog change still retires them
+        write_shopping_lists(plan_recipe_counts(stale), plans[0][2])
+
+    totals = {}
+    for name, unit, numerator, denominator in ShoppingListItem.objects.filter(
+        meal_plan_id__in=[meal_plan_id for meal_plan_id, _, _ in plans]
+    ).order_by("ingredient__name", "unit").values_list(
+        "ingredient__name", "unit", "amount_numerator", "amount_denominator"
+    ):
+        amount = Fraction(numerator, denominator)
+        totals.setdefault(name, QuantitySum()).add(amount or None, unit)
+    return {name: {"quantity": str(total)} for name, total in totals.items()}
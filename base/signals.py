@@ -1,7 +1,14 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile
+from .models import UserProfile, Recipe, Ingredient, RecipeIngredient, MealType, Child, Meal, MealPlan
+from .catalog import bump_catalog_version
+from .autocomplete import expire_prefix_index
+from .search import index_ingredient, index_recipes
+from .dietary import refresh_recipe_summaries
+from .ranking import bump_child_preferences_version
+from .steps import parse_steps
+from .images import ensure_derivatives
 from allauth.account.signals import user_signed_up
 from django.dispatch import receiver
 from django.shortcuts import reverse
@@ -60,4 +67,134 @@ def handle_google_presignup(sender, request, user, **kwargs):
     # Store checkout session ID in session to check it later
     request.session['oauth_checkout_session_id'] = checkout_session.id
 
-    # Redirect response doesn't work here — we'll instead catch it in the view
\ No newline at end of file
+    # Redirect response doesn't work here — we'll instead catch it in the view
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+@receiver(post_save, sender=MealType)
+@receiver(post_delete, sender=MealType)
+@receiver(m2m_changed, sender=Recipe.meal_types.through)
+def invalidate_catalog(sender, **kwargs):
+    """
+    Signal to mark the in-memory recipe catalog as stale whenever it changes.
+    """
+    bump_catalog_version()
+    expire_prefix_index()
+
+
+@receiver(pre_save, sender=Recipe)
+def parse_recipe_steps(sender, instance, **kwargs):
+    """
+    Signal to parse the recipe's instructions and tips into steps once, on save,
+    instead of on every page view.
+    """
+    if not kwargs.get('raw'):
+        instance.instruction_steps = parse_steps(instance.instructions)
+        instance.tip_steps = parse_steps(instance.tips)
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def parse_recipe_ingredient_quantity(sender, instance, **kwargs):
+    """
+    Signal to parse the quantity and unit text into an exact amount and
+    canonical unit once, on save, for the shopping list to add up.
+    """
+    if not kwargs.get('raw'):
+        instance.set_amount()
+
+
+@receiver(post_save, sender=Meal)
+@receiver(post_delete, sender=Meal)
+def invalidate_shopping_list(sender, instance, **kwargs):
+    """
+    Signal to rebuild a plan's shopping list on its next read after one of its
+    meals is saved or deleted directly (e.g. in the admin). The planner and
+    the dashboard keep it up to date themselves and don't send these signals.
+    """
+    if instance.meal_plan_id and not kwargs.get('raw'):
+        MealPlan.objects.filter(pk=instance.meal_plan_id).update(shopping_list_version=None)
+
+
+@receiver(post_save, sender=Recipe)
+def resize_recipe_image(sender, instance, **kwargs):
+    """Signal to create the resized copies of a newly uploaded or imported recipe image."""
+    if not kwargs.get('raw'):
+        ensure_derivatives(instance.image)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def sync_recipe_search(sender, instance, **kwargs):
+    """Keep the recipe's full-text search row in step with it."""
+    if not kwargs.get('raw'):
+        index_recipes([instance.pk])
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def sync_recipe_ingredient_search(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        index_recipes([instance.recipe_id])
+
+
+@receiver(post_save, sender=Ingredient)
+def sync_ingredient_search(sender, instance, created, **kwargs):
+    # A new ingredient isn't in any recipe yet; a renamed one changes their text
+    if not created and not kwargs.get('raw'):
+        index_ingredient(instance.pk)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def refresh_recipe_summary(sender, instance, **kwargs):
+    """Keep the recipe's allergen mask and vegetarian/vegan flags in step with its ingredients."""
+    if not kwargs.get('raw'):
+        refresh_recipe_summaries([instance.recipe_id])
+
+
+@receiver(post_save, sender=Ingredient)
+def refresh_ingredient_recipe_summaries(sender, instance, created, **kwargs):
+    if not created and not kwargs.get('raw'):
+        refresh_recipe_summaries(
+            RecipeIngredient.objects.filter(ingredient=instance).values_list('recipe_id', flat=True).distinct()
+        )
+
+
+@receiver(post_save, sender=Child)
+def invalidate_child_ranking(sender, instance, created, **kwargs):
+    """Signal to retire a child's cached library ranking when their details change."""
+    if not created and not kwargs.get('raw'):
+        bump_child_preferences_version([instance.pk])
+        instance.refresh_from_db(fields=['preferences_version'])
+
+
+CHILD_PREFERENCE_FIELDS = {
+    Child.likes_ingredients.through: 'likes_ingredients',
+    Child.dislikes_ingredients.through: 'dislikes_ingredients',
+    Child.likes_recipes.through: 'likes_recipes',
+    Child.dislikes_recipes.through: 'dislikes_recipes',
+}
+
+
+@receiver(m2m_changed, sender=Child.likes_ingredients.through)
+@receiver(m2m_changed, sender=Child.dislikes_ingredients.through)
+@receiver(m2m_changed, sender=Child.likes_recipes.through)
+@receiver(m2m_changed, sender=Child.dislikes_recipes.through)
+def invalidate_child_ranking_preferences(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            bump_child_preferences_version([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        # Changed from the ingredient/recipe side: pk_set holds the children
+        bump_child_preferences_version(pk_set)
+    elif action == 'pre_clear':
+        # A reverse clear() doesn't say which children it affects, so bump
+        # them while the links are still there (same transaction as the clear)
+        bump_child_preferences_version(
+            Child.objects.filter(**{CHILD_PREFERENCE_FIELDS[sender]: instance}).values_list('pk', flat=True)
+        )
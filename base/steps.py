@@ -0,0 +1,25 @@
+"""
+Recipe instructions and tips, parsed into steps.
+
+Both are stored as text with steps separated by ";", where a step may start
+with a short heading ending in ":" ("Prep: Peel the carrots"). They are
+parsed once when a recipe is saved (see signals.py) into
+``Recipe.instruction_steps`` and ``Recipe.tip_steps``: lists of
+``[heading, body]`` pairs, heading None when a step has none. Templates
+render those lists directly.
+"""
+
+
+def parse_steps(text):
+    """``[[heading, body], ...]`` for ";"-separated ``text``; blank steps are dropped."""
+    steps = []
+    for item in (text or "").split(";"):
+        item = item.strip()
+        if not item:
+            continue
+        if ":" in item:
+            heading, body = item.split(":", 1)
+            steps.append([heading.strip(), body.strip()])
+        else:
+            steps.append([None, item])
+    return steps
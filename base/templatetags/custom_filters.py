@@ -1,28 +1,23 @@
 from django import template
 
+from base.steps import parse_steps
+
 register = template.Library()
 
 @register.filter
 def split_and_format(value):
     """
     Split a string by semicolons and format text before colons as bold.
+
+    Recipes keep their parsed steps in ``instruction_steps``/``tip_steps``;
+    this is for other ";"-separated text.
     """
     if not value:
         return []
-    
-    # Handle both strings and lists
-    if isinstance(value, list):
-        items = value
-    else:
-        items = value.split(";")
 
-    formatted_items = []
-    
-    for item in items:
-        if ":" in item:
-            bold_part, normal_part = item.split(":", 1)
-            formatted_items.append((bold_part.strip() + ":", normal_part.strip()))
-        else:
-            formatted_items.append((None, item.strip()))
-    
-    return formatted_items
+    # Handle both strings and lists
+    text = ";".join(value) if isinstance(value, list) else value
+    return [
+        (heading + ":" if heading is not None else None, body)
+        for heading, body in parse_steps(text)
+    ]
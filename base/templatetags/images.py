@@ -0,0 +1,63 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from base.images import DERIVATIVE_WIDTHS, derivative_name, derivatives_exist, srcset as derivative_srcset
+
+register = template.Library()
+
+# Default ``sizes`` attribute for each derivative the page asks for
+SIZES = {
+    "thumb": "160px",
+    "card": "(max-width: 600px) 100vw, 480px",
+    "hero": "100vw",
+}
+
+# Images whose derivatives are known to exist; missing ones are checked
+# again on the next render, so a backfill takes effect without a restart
+_resized = set()
+
+
+def _image_name(image):
+    return getattr(image, "name", image) or ""
+
+
+def _has_derivatives(name):
+    if name not in _resized and derivatives_exist(name):
+        _resized.add(name)
+    return name in _resized
+
+
+@register.filter
+def srcset(image, image_format="webp"):
+    """``srcset`` value for an image field or media name, e.g. ``{{ recipe.image|srcset:"jpeg" }}``."""
+    name = _image_name(image)
+    return derivative_srcset(name, image_format) if name else ""
+
+
+@register.simple_tag
+def responsive_image(image, size="card", alt="", css_class="", sizes=None, loading="lazy"):
+    """
+    A ``<picture>`` with WebP and JPEG ``srcset``s for an image field or media name.
+
+    ``size`` picks the fallback ``src`` and default ``sizes``. Images without
+    derivatives (not resized yet, or not in this media storage at all) get a
+    plain ``<img>`` of the original, as before resizing existed.
+    """
+    name = _image_name(image)
+    if not name:
+        return ""
+    if not _has_derivatives(name):
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}">', default_storage.url(name), alt, css_class, loading
+        )
+    size = size if size in DERIVATIVE_WIDTHS else "card"
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="{}">'
+        '</picture>',
+        derivative_srcset(name, "webp"), sizes or SIZES[size],
+        default_storage.url(derivative_name(name, size, "jpeg")), derivative_srcset(name, "jpeg"),
+        sizes or SIZES[size], alt, css_class, loading,
+    )
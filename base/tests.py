@@ -1,3 +1,717 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from fractions import Fraction
+from io import BytesIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import now
+from PIL import Image
+
+from . import planner
+from .catalog import get_eligibility_index
+from .dashboard import load_dashboard_week
+from .dietary import allergen_mask
+from .images import DERIVATIVE_FORMATS, DERIVATIVE_WIDTHS, derivative_name
+from .jobs import claim_next_job, enqueue_meal_plan, get_meal_plan_status, run_job
+from .library import encode_cursor
+from .models import (
+    CatalogVersion, Child, Ingredient, Meal, MealPlan, MealPlanJob, MealType, Recipe, RecipeIngredient,
+    ShoppingListItem,
+)
+from .planner import (
+    DAY_STRATEGIES, DAYS, MEAL_TYPES, ChildConstraints, PlanPreferences, build_plan_history, generate_meal_plan,
+    generate_meal_plans, plan_week, week_start_for_offset, write_meal_plan,
+)
+from .prerender import prerender
+from .quantities import QuantitySum, parse_quantity
+from .search import fts_available, search_recipes
+from .shopping import shopping_list_items
+
+# Queries for one dashboard page view (session, user, profile, children,
+# plans, meals). It must not grow with the number of children or meals.
+DASHBOARD_QUERY_BUDGET = 6
+
+
+class DashboardTestCase(TestCase):
+    """A signed-in parent in their trial, with a few recipes to plan with."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="parent@example.com", email="parent@example.com", password="pw")
+        profile = self.user.profile
+        profile.trial_end_date = now() + timedelta(days=7)
+        profile.save()
+        self.week_start = week_start_for_offset(0)
+        self.recipes = [
+            Recipe.objects.create(
+                id=f"REC-{i:07d}", title=f"Recipe {i}", preparation_time=5, cooking_time=10, instructions="Mix"
+            )
+            for i in range(4)
+        ]
+        self.client.force_login(self.user)
+
+    def add_child_with_plan(self, name):
+        child = Child.objects.create(parent=self.user, name=name, dob=date.today() - timedelta(days=365))
+        meal_plan = MealPlan.objects.create(
+            child=child, start_date=self.week_start, end_date=self.week_start + timedelta(days=6)
+        )
+        breakfast, lunch, dinner, snack = self.recipes
+        Meal.objects.bulk_create(
+            Meal(meal_plan=meal_plan, day=day, breakfast=breakfast, lunch=lunch, dinner=dinner, snack=snack)
+            for day in DAYS
+        )
+        return child
+
+
+class DashboardQueryBudgetTests(DashboardTestCase):
+    def dashboard_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.response = self.client.get(reverse("dashboard"))
+        self.assertEqual(self.response.status_code, 200)
+        return len(queries)
+
+    def test_loader_uses_three_queries(self):
+        self.add_child_with_plan("Ada")
+        self.add_child_with_plan("Ben")
+
+        with self.assertNumQueries(3):
+            children, meal_plans = load_dashboard_week(self.user, self.week_start)
+            titles = [
+                getattr(meal, slot).title
+                for _, meal_plan in meal_plans
+                for meal in meal_plan.meals.all()
+                for slot in ("breakfast", "lunch", "dinner", "snack")
+            ]
+        self.assertEqual(len(children), 2)
+        self.assertEqual(len(titles), 2 * 7 * 4)
+
+    def test_dashboard_queries_do_not_grow_with_children(self):
+        self.add_child_with_plan("Ada")
+        one_child = self.dashboard_queries()
+
+        self.add_child_with_plan("Ben")
+        self.add_child_with_plan("Cleo")
+        three_children = self.dashboard_queries()
+
+        self.assertEqual(one_child, three_children)
+        self.assertLessEqual(three_children, DASHBOARD_QUERY_BUDGET)
+
+    def test_repeat_views_reuse_the_cached_week_until_a_meal_changes(self):
+        child = self.add_child_with_plan("Ada")
+        first_view = self.dashboard_queries()
+        self.assertEqual(self.dashboard_queries(), first_view - 1)  # no meal query
+
+        meal = Meal.objects.get(meal_plan__child=child, day="monday")
+        response = self.client.post(reverse("remove_meal"), {"meal_id": meal.id, "meal_type": "breakfast"})
+        self.assertTrue(response.json()["success"])
+
+        self.assertEqual(self.dashboard_queries(), first_view)
+        self.assertContains(self.response, "Select Meal")
+
+
+class MealPlanWeekApiTests(DashboardTestCase):
+    def test_week_json_and_conditional_get(self):
+        child = self.add_child_with_plan("Ada")
+        url = reverse("meal_plan_week", args=[child.id])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertFalse(etag.startswith("W/"))
+        days = response.json()["days"]
+        self.assertEqual([day["day"] for day in days], DAYS)
+        self.assertEqual(days[0]["slots"]["breakfast"], {"id": "REC-0000000", "title": "Recipe 0"})
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        meal = Meal.objects.get(meal_plan__child=child, day="monday")
+        self.client.post(reverse("remove_meal"), {"meal_id": meal.id, "meal_type": "breakfast"})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertIsNone(response.json()["days"][0]["slots"]["breakfast"])
+
+    def test_etag_follows_the_catalog_version_in_the_database(self):
+        child = self.add_child_with_plan("Ada")
+        url = reverse("meal_plan_week", args=[child.id])
+        etag = self.client.get(url)["ETag"]
+
+        # A recipe renamed by another process changes the titles in the week
+        Recipe.objects.filter(id=self.recipes[0].id).update(title="Porridge")
+        CatalogVersion.objects.update(version=F("version") + 1)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["days"][0]["slots"]["breakfast"]["title"], "Porridge")
+
+    def test_week_without_plan_reports_status(self):
+        child = Child.objects.create(parent=self.user, name="Ada", dob=date.today() - timedelta(days=365))
+        response = self.client.get(reverse("meal_plan_week", args=[child.id]))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()["status"], "missing")
+
+    def test_bad_week_is_rejected(self):
+        child = self.add_child_with_plan("Ada")
+        response = self.client.get(reverse("meal_plan_week", args=[child.id]), {"week": "x"})
+        self.assertEqual(response.status_code, 400)
+
+
+class MealSlotTests(DashboardTestCase):
+    def test_swap_updates_one_slot_and_returns_it(self):
+        child = self.add_child_with_plan("Ada")
+        meal = Meal.objects.get(meal_plan__child=child, day="tuesday")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("swap_meal"), {
+                "meal_id": meal.id, "meal_type": "lunch", "recipe_id": "REC-0000003", "day": "tuesday", "week": 0,
+            })
+        # The slot is written with one UPDATE
+        self.assertEqual(len([query for query in queries if query["sql"].startswith('UPDATE "base_meal"')]), 1)
+        slot = response.json()["slot"]
+        self.assertEqual(slot["recipe"]["title"], "Recipe 3")
+        self.assertEqual((slot["meal_id"], slot["meal_type"]), (meal.id, "lunch"))
+        meal.refresh_from_db()
+        self.assertEqual(meal.lunch_id, "REC-0000003")
+
+    def test_bad_meal_ids_and_weeks_are_rejected_before_any_write(self):
+        child = self.add_child_with_plan("Ada")
+        meal = Meal.objects.get(meal_plan__child=child, day="tuesday")
+
+        response = self.client.post(reverse("swap_meal"), {
+            "meal_id": "abc", "meal_type": "lunch", "recipe_id": "REC-0000003",
+        })
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(reverse("remove_meal"), {"meal_id": meal.id, "meal_type": "lunch", "week": "x"})
+        self.assertEqual(response.status_code, 400)
+        meal.refresh_from_db()
+        self.assertEqual(meal.lunch_id, self.recipes[1].id)
+
+    def test_other_families_meals_are_off_limits(self):
+        other = User.objects.create_user(username="other@example.com", password="pw")
+        child = Child.objects.create(parent=other, name="Zed", dob=date.today() - timedelta(days=365))
+        meal_plan = MealPlan.objects.create(
+            child=child, start_date=self.week_start, end_date=self.week_start + timedelta(days=6)
+        )
+        meal = Meal.objects.create(meal_plan=meal_plan, day="monday", breakfast=self.recipes[0])
+
+        response = self.client.post(reverse("remove_meal"), {"meal_id": meal.id, "meal_type": "breakfast"})
+        self.assertEqual(response.status_code, 404)
+        meal.refresh_from_db()
+        self.assertEqual(meal.breakfast_id, self.recipes[0].id)
+
+
+class PlannerTestCase(DashboardTestCase):
+    """Six recipes per meal type, some with dairy and some with carrots."""
+
+    def setUp(self):
+        super().setUp()
+        self.milk = Ingredient.objects.create(id="ING-001", name="Milk", food_category="Dairy", allergen_type="Dairy")
+        self.carrot = Ingredient.objects.create(id="ING-002", name="Carrot", food_category="Vegetables")
+        self.by_meal_type = {}
+        for meal_type in MEAL_TYPES:
+            recipes = [
+                Recipe.objects.create(
+                    id=f"{meal_type[:3].upper()}-{i:07d}", title=f"{meal_type} {i}",
+                    preparation_time=5, cooking_time=10, instructions="Mix", max_age_months=9 if i == 5 else 24,
+                )
+                for i in range(6)
+            ]
+            MealType.objects.get_or_create(name=meal_type)[0].recipe_set.add(*recipes)
+            RecipeIngredient.objects.create(recipe=recipes[0], ingredient=self.milk, quantity="1", unit="cup")
+            RecipeIngredient.objects.create(recipe=recipes[1], ingredient=self.carrot, quantity="1", unit="")
+            self.by_meal_type[meal_type] = [recipe.id for recipe in recipes]
+        self.child = Child.objects.create(parent=self.user, name="Ada", dob=date.today() - timedelta(days=365))
+
+    def set_preferences(self, within_week, across_week):
+        profile = self.user.profile
+        profile.within_week_preferences = {meal_type.lower(): within_week for meal_type in MEAL_TYPES}
+        profile.across_week_preferences = {meal_type.lower(): across_week for meal_type in MEAL_TYPES}
+        profile.save()
+
+
+class EligibilityIndexTests(PlannerTestCase):
+    def test_candidates_match_the_orm(self):
+        index = get_eligibility_index()
+        for allergies, dislikes in [((), ()), (("Dairy",), ()), ((), ("ING-002",)), (("Dairy",), ("ING-002",))]:
+            for meal_type in MEAL_TYPES:
+                expected = Recipe.objects.filter(
+                    meal_types__name=meal_type, min_age_months__lte=12, max_age_months__gte=12
+                ).exclude(ingredients__in=dislikes).exclude(ingredients__allergen_type__in=allergies)
+                self.assertEqual(
+                    sorted(index.candidates(meal_type, 12, allergies, dislikes)),
+                    sorted(expected.values_list("id", flat=True)),
+                )
+
+    def test_pools_are_dropped_when_the_catalog_changes(self):
+        index = get_eligibility_index()
+        pool = index.candidates("Lunch", 12, ("Dairy",))
+        self.assertIs(index.candidates("Lunch", 12, ("Dairy",)), pool)
+        self.assertEqual(index.pool_cache.hits, 1)
+
+        Recipe.objects.create(
+            id="LUN-0000009", title="Lunch 9", preparation_time=5, cooking_time=10, instructions="Mix"
+        ).meal_types.add(MealType.objects.get(name="Lunch"))
+        fresh = get_eligibility_index()
+        self.assertIsNot(fresh, index)
+        self.assertIn("LUN-0000009", fresh.candidates("Lunch", 12, ("Dairy",)))
+
+
+class MealPlannerTests(PlannerTestCase):
+    def test_day_strategies(self):
+        self.assertEqual(DAY_STRATEGIES["single"](["a", "b"], DAYS), ["a"] * 7)
+        self.assertEqual(DAY_STRATEGIES["rotate"](["a", "b", "c"], DAYS), ["a", "b", "c", "a", "b", "c", "a"])
+        self.assertEqual(DAY_STRATEGIES["pairs"](["a", "b"], DAYS), ["a", "a", "b", "b", "a", "a", "b"])
+
+    def test_week_follows_constraints_and_within_week_variety(self):
+        self.set_preferences("no", "no")
+        constraints = ChildConstraints(12, allergies=["Dairy"], dislikes=["ING-002"])
+        grid = plan_week(constraints, PlanPreferences.for_profile(self.user.profile), get_eligibility_index())
+        for meal_type, recipe_ids in self.by_meal_type.items():
+            planned = {grid[day][f"{meal_type.lower()}_id"] for day in DAYS}
+            self.assertEqual(len(planned), 1)  # the same meal every day
+            self.assertTrue(planned <= set(recipe_ids[2:5]))  # no milk, no carrot, not too young
+
+    def test_across_week_history_excludes_last_weeks_recipes(self):
+        self.set_preferences("low", "high")
+        previous_week = self.week_start - timedelta(weeks=1)
+        rows = [(previous_week, "BRE-0000002", "LUN-0000002", "DIN-0000002", "SNA-0000002")]
+        grid = plan_week(
+            ChildConstraints(12, allergies=["Dairy"]), PlanPreferences.for_profile(self.user.profile),
+            get_eligibility_index(), history=build_plan_history(rows, self.week_start),
+        )
+        self.assertFalse({recipe_id for day in DAYS for recipe_id in grid[day].values()} & set(rows[0][1:]))
+
+    def test_horizon_is_planned_in_one_pass_and_written_once(self):
+        self.set_preferences("low", "high")
+        plans = generate_meal_plans(self.child.id, [0, 1])
+        self.assertEqual([plan.start_date for plan in plans], [self.week_start, self.week_start + timedelta(weeks=1)])
+        self.assertEqual(Meal.objects.filter(meal_plan__in=plans).count(), 14)
+        # High across-week variety: the second week avoids the first one's lunches
+        weeks = [set(plan.meals.values_list("lunch_id", flat=True)) for plan in plans]
+        self.assertTrue(weeks[0] and weeks[1] and not weeks[0] & weeks[1])
+
+        again = generate_meal_plans(self.child.id, [1, 2])
+        self.assertEqual(again[0].pk, plans[1].pk)
+        self.assertEqual(MealPlan.objects.filter(child=self.child).count(), 3)
+
+    def test_concurrent_generations_do_not_duplicate_weeks(self):
+        plan_horizon = planner.plan_horizon
+        calls, winner = [], []
+
+        def plan_while_another_request_writes(child, start_dates, **kwargs):
+            calls.append(start_dates)
+            grids = plan_horizon(child, start_dates, **kwargs)
+            if len(calls) == 1:
+                winner.extend(generate_meal_plans(child.id, [0]))
+            return grids
+
+        with mock.patch("base.planner.plan_horizon", side_effect=plan_while_another_request_writes):
+            plans = generate_meal_plans(self.child.id, [0, 1])
+        self.assertEqual(plans[0].pk, winner[0].pk)
+        self.assertEqual(MealPlan.objects.filter(child=self.child).count(), 2)
+        self.assertEqual(Meal.objects.filter(meal_plan__child=self.child).count(), 14)
+
+    def test_rewriting_a_week_replaces_its_meals_in_bulk(self):
+        meal_plan = generate_meal_plan(self.child.id)
+        grid = {day: {"breakfast_id": "BRE-0000001"} for day in DAYS}
+        with CaptureQueriesContext(connection) as queries:
+            write_meal_plan(meal_plan, grid)
+        self.assertEqual(sum("INSERT" in query["sql"] for query in queries), 2)  # meals, shopping list
+        self.assertEqual(
+            list(meal_plan.meals.values_list("breakfast_id", "lunch_id")), [("BRE-0000001", None)] * 7
+        )
+
+
+class MealPlanJobTests(PlannerTestCase):
+    @override_settings(MEAL_PLAN_JOBS_EAGER=False)
+    def test_jobs_go_from_pending_to_done(self):
+        job = enqueue_meal_plan(self.child, self.week_start)
+        self.assertEqual(job.status, MealPlanJob.STATUS_PENDING)
+        self.assertEqual(enqueue_meal_plan(self.child, self.week_start).pk, job.pk)
+        self.assertEqual(get_meal_plan_status(self.child, self.week_start), "pending")
+
+        claimed = claim_next_job()
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts), (job.pk, MealPlanJob.STATUS_RUNNING, 1))
+        self.assertIsNone(claim_next_job())
+
+        run_job(claimed)
+        job.refresh_from_db()
+        self.assertEqual(job.status, MealPlanJob.STATUS_DONE)
+        self.assertEqual(get_meal_plan_status(self.child, self.week_start), "ready")
+
+    @override_settings(MEAL_PLAN_JOBS_EAGER=False)
+    def test_failed_jobs_are_marked_failed(self):
+        enqueue_meal_plan(self.child, self.week_start)
+        with mock.patch("base.jobs.generate_meal_plans_for_dates", side_effect=RuntimeError("catalog unavailable")):
+            job = run_job(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (MealPlanJob.STATUS_FAILED, "catalog unavailable"))
+        self.assertEqual(get_meal_plan_status(self.child, self.week_start), "failed")
+
+    @override_settings(MEAL_PLAN_JOBS_EAGER=False)
+    def test_jobs_plan_the_week_they_were_queued_for(self):
+        job = enqueue_meal_plan(self.child, self.week_start)
+        # Monday midnight passes while the worker runs the job
+        clock = iter([now()])
+        with mock.patch("base.planner.now", side_effect=lambda: next(clock, now() + timedelta(weeks=1))):
+            run_job(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, MealPlanJob.STATUS_DONE)
+        self.assertEqual(list(MealPlan.objects.values_list("start_date", flat=True)), [self.week_start])
+
+    @override_settings(MEAL_PLAN_JOBS_EAGER=True)
+    def test_jobs_run_inline_in_eager_mode(self):
+        job = enqueue_meal_plan(self.child, self.week_start)
+        self.assertEqual(job.status, MealPlanJob.STATUS_DONE)
+        self.assertTrue(MealPlan.objects.filter(child=self.child, start_date=self.week_start).exists())
+
+    @override_settings(MEAL_PLAN_JOBS_EAGER=True)
+    def test_first_dashboard_visit_renders_the_new_plan(self):
+        response = self.client.get(reverse("dashboard"))
+        self.assertEqual(response.status_code, 200)
+        meal_plan = MealPlan.objects.get(child=self.child, start_date=self.week_start)
+        self.assertContains(response, f'data-slot="{meal_plan.meals.first().id}-breakfast"')
+
+
+class RecipeSearchTests(TestCase):
+    def create_recipe(self, recipe_id, title, description=""):
+        return Recipe.objects.create(
+            id=recipe_id, title=title, description=description,
+            preparation_time=5, cooking_time=10, instructions="Mix",
+        )
+
+    def test_ranks_title_matches_first_and_follows_edits(self):
+        if not fts_available():
+            self.skipTest("No FTS5 search table on this database")
+        self.create_recipe("REC-0000001", "Fruit Salad", "With a little banana on top")
+        self.create_recipe("REC-0000002", "Banana Bread")
+        self.create_recipe("REC-0000003", "Oat Porridge")
+
+        results = [recipe.id for recipe in search_recipes(Recipe.objects.all(), "banana")]
+        self.assertEqual(results, ["REC-0000002", "REC-0000001"])
+
+        porridge = Recipe.objects.get(id="REC-0000003")
+        porridge.title = "Banana Oat Porridge"
+        porridge.save()
+        self.assertIn("REC-0000003", search_recipes(Recipe.objects.all(), "bana").values_list("id", flat=True))
+
+
+class RecipeDietarySummaryTests(DashboardTestCase):
+    def test_summary_follows_ingredients(self):
+        recipe = self.recipes[0]
+        milk = Ingredient.objects.create(id="ING-001", name="Milk", food_category="Dairy", allergen_type="Dairy")
+        oats = Ingredient.objects.create(id="ING-002", name="Oats", food_category="Grains", allergen_type="None")
+        RecipeIngredient.objects.create(recipe=recipe, ingredient=oats, quantity="1", unit="cup")
+        link = RecipeIngredient.objects.create(recipe=recipe, ingredient=milk, quantity="1", unit="cup")
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.allergen_mask, allergen_mask(["Dairy"]))
+        self.assertEqual(recipe.allergen_names, ["Dairy"])
+
+        response = self.client.get(reverse("recipe_library"), {"exclude_allergens": "Dairy"})
+        self.assertNotIn(recipe, response.context["page_obj"].object_list)
+
+        milk.is_vegan = False
+        milk.save()
+        recipe.refresh_from_db()
+        self.assertEqual((recipe.is_vegetarian, recipe.is_vegan), (True, False))
+
+        link.delete()
+        recipe.refresh_from_db()
+        self.assertEqual((recipe.allergen_mask, recipe.is_vegan), (0, True))
+
+    def test_child_allergies_skip_unknown_names(self):
+        milk = Ingredient.objects.create(id="ING-001", name="Milk", food_category="Dairy", allergen_type="Dairy")
+        kiwi = Ingredient.objects.create(id="ING-002", name="Kiwi", food_category="Fruit", allergen_type="Kiwi")
+        RecipeIngredient.objects.create(recipe=self.recipes[0], ingredient=milk, quantity="1", unit="cup")
+        RecipeIngredient.objects.create(recipe=self.recipes[1], ingredient=kiwi, quantity="1", unit="")
+        lunch, _ = MealType.objects.get_or_create(name="Lunch")
+        for recipe in self.recipes:
+            recipe.meal_types.add(lunch)
+
+        candidates = get_eligibility_index().candidates("Lunch", 12, allergies=["dairy", "Strawberries"])
+        self.assertEqual(list(candidates), [recipe.id for recipe in self.recipes[1:]])
+
+
+class RecipeLibraryTests(DashboardTestCase):
+    def test_cursor_pages_cover_the_library_once(self):
+        for i in range(4, 26):
+            Recipe.objects.create(
+                id=f"REC-{i:07d}", title=f"Recipe {i}", preparation_time=5, cooking_time=10, instructions="Mix"
+            )
+        seen, response = [], self.client.get(reverse("recipe_library"))
+        while True:
+            page = response.context["page_obj"]
+            seen += [recipe.id for recipe in page]
+            if not page.has_next:
+                break
+            response = self.client.get(reverse("recipe_library"), {"after": page.next_cursor})
+
+        self.assertEqual(seen, sorted(Recipe.objects.values_list("id", flat=True)))
+        previous = self.client.get(reverse("recipe_library"), {"before": page.previous_cursor})
+        self.assertEqual([recipe.id for recipe in previous.context["page_obj"]], seen[12:24])
+
+    def test_facet_counts_are_cached_per_catalog_version(self):
+        self.client.get(reverse("recipe_library"))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("recipe_library"))
+        self.assertEqual(response.context["facets"]["total"], 4)
+        self.assertFalse(any("COUNT" in query["sql"] for query in queries))
+
+        self.recipes[0].is_vegetarian = False
+        self.recipes[0].save()
+        response = self.client.get(reverse("recipe_library"))
+        self.assertEqual(response.context["facets"]["vegetarian"], 3)
+
+
+class AutocompleteTests(DashboardTestCase):
+    def test_suggestions_come_from_memory(self):
+        Recipe.objects.create(
+            id="REC-0000010", title="Sweet Potato Mash", preparation_time=5, cooking_time=10, instructions="Mix"
+        )
+        Ingredient.objects.create(id="ING-001", name="Potato", food_category="Vegetables")
+        url = reverse("autocomplete")
+        self.client.get(url, {"q": "x"})  # builds the index
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {"q": "POT"})
+        self.assertEqual([result["label"] for result in response.json()["results"]], ["Potato", "Sweet Potato Mash"])
+
+        response = self.client.get(url, {"q": "pot", "type": "recipe"})
+        self.assertEqual([result["id"] for result in response.json()["results"]], ["REC-0000010"])
+
+    def test_catalog_changes_reach_a_warm_index(self):
+        url = reverse("autocomplete")
+        self.client.get(url, {"q": "x"})  # builds the index
+
+        # Made in this process: the next lookup rebuilds the index
+        Ingredient.objects.create(id="ING-001", name="Parsnip", food_category="Vegetables")
+        self.assertEqual(len(self.client.get(url, {"q": "pars"}).json()["results"]), 1)
+
+        # Made by another process: picked up at the next version check
+        Ingredient.objects.filter(id="ING-001").update(name="Pumpkin")
+        CatalogVersion.objects.update(version=F("version") + 1)
+        self.assertEqual(len(self.client.get(url, {"q": "pump"}).json()["results"]), 0)
+        with override_settings(AUTOCOMPLETE_VERSION_CHECK_INTERVAL=0):
+            self.assertEqual(len(self.client.get(url, {"q": "pump"}).json()["results"]), 1)
+
+
+class ChildRankingTests(DashboardTestCase):
+    def library_ids(self, **params):
+        response = self.client.get(reverse("recipe_library"), {"sort": "child", **params})
+        return [recipe.id for recipe in response.context["page_obj"]]
+
+    def test_best_for_child_follows_preferences(self):
+        child = Child.objects.create(parent=self.user, name="Ada", dob=date.today() - timedelta(days=365))
+        banana = Ingredient.objects.create(id="ING-001", name="Banana", food_category="Fruit")
+        RecipeIngredient.objects.create(recipe=self.recipes[2], ingredient=banana, quantity="1")
+        self.assertEqual(self.library_ids()[0], "REC-0000000")
+
+        child.likes_ingredients.add(banana)
+        self.assertEqual(self.library_ids()[0], "REC-0000002")
+
+        child.likes_recipes.add(self.recipes[3])
+        self.assertEqual(self.library_ids()[:2], ["REC-0000003", "REC-0000002"])
+
+    def test_preferences_version_is_kept_in_the_database(self):
+        child = Child.objects.create(parent=self.user, name="Ada", dob=date.today() - timedelta(days=365))
+        banana = Ingredient.objects.create(id="ING-001", name="Banana", food_category="Fruit")
+        RecipeIngredient.objects.create(recipe=self.recipes[2], ingredient=banana, quantity="1")
+        child.likes_ingredients.add(banana)
+        self.assertEqual(self.library_ids()[0], "REC-0000002")
+
+        # Cleared from the ingredient side, where the signal gets no child ids
+        versions = Child.objects.filter(id=child.id).values_list("preferences_version", flat=True)
+        version = versions.get()
+        banana.liked_by_children.clear()
+        self.assertEqual(versions.get(), version + 1)
+        self.assertEqual(self.library_ids()[0], "REC-0000000")
+
+    def test_tampered_cursors_fall_back_to_the_first_page(self):
+        Child.objects.create(parent=self.user, name="Ada", dob=date.today() - timedelta(days=365))
+        first_page = self.library_ids()
+        for key in ([0, 7], [0, None], [0, ["REC-0000001"]], ["x", "REC-0000001"]):
+            self.assertEqual(self.library_ids(after=encode_cursor(key)), first_page)
+
+
+class RecipeStepsTests(DashboardTestCase):
+    def test_steps_are_parsed_on_save_and_rendered(self):
+        recipe = self.recipes[0]
+        recipe.instructions = "Prep: Peel the carrots; Steam until soft;"
+        recipe.tips = "Storage: Freeze in portions"
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.instruction_steps, [["Prep", "Peel the carrots"], [None, "Steam until soft"]])
+
+        response = self.client.get(reverse("recipe_detail", args=[recipe.id]))
+        self.assertContains(response, "<strong>Prep:</strong> Peel the carrots", html=False)
+        self.assertContains(response, "<strong>Storage:</strong> Freeze in portions", html=False)
+
+
+class ImageDerivativeTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_upload_creates_derivatives_used_by_the_library(self):
+        upload = BytesIO()
+        Image.new("RGBA", (2000, 1500), (200, 120, 40, 255)).save(upload, format="PNG")
+        recipe = self.recipes[0]
+        recipe.image = SimpleUploadedFile("pancakes.png", upload.getvalue(), content_type="image/png")
+        recipe.save()
+
+        for size, width in DERIVATIVE_WIDTHS.items():
+            for image_format in DERIVATIVE_FORMATS:
+                with default_storage.open(derivative_name(recipe.image.name, size, image_format)) as file:
+                    self.assertEqual(Image.open(file).width, width)
+
+        response = self.client.get(reverse("recipe_library"))
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, "pancakes-png-card.webp 480w")
+
+    def test_sources_differing_only_in_extension_get_their_own_derivatives(self):
+        self.assertNotEqual(
+            derivative_name("recipes/pancakes.png", "card", "webp"),
+            derivative_name("recipes/pancakes.jpg", "card", "webp"),
+        )
+
+    def test_images_without_derivatives_keep_their_plain_img(self):
+        response = self.client.get(reverse("landing_page"))
+        self.assertContains(response, '<img src="/media/dashboard.png" alt="Meal Plan Dashboard" class="img-fluid"')
+
+
+class ShoppingListTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        carrot = Ingredient.objects.create(id="ING-001", name="Carrot", food_category="Vegetables")
+        oats = Ingredient.objects.create(id="ING-002", name="Oats", food_category="Grains")
+        for recipe in self.recipes:
+            RecipeIngredient.objects.create(recipe=recipe, ingredient=carrot, quantity="1", unit="cup")
+        RecipeIngredient.objects.create(recipe=self.recipes[0], ingredient=oats, quantity="2", unit="tbsp")
+
+    def test_query_count_does_not_grow_with_children_or_meals(self):
+        self.add_child_with_plan("Ada")
+        with CaptureQueriesContext(connection) as one_child:
+            response = self.client.get(reverse("shopping_list"))
+        self.assertEqual(response.context["ingredients"], {
+            "Carrot": {"quantity": "28 cups"},  # 4 recipes a day for 7 days
+            "Oats": {"quantity": "14 tablespoons"},
+        })
+
+        self.add_child_with_plan("Ben")
+        with CaptureQueriesContext(connection) as two_children:
+            response = self.client.get(reverse("shopping_list"))
+        self.assertEqual(len(two_children), len(one_child))
+        self.assertEqual(list(response.context["ingredients"]), ["Carrot", "Oats"])
+
+    def test_swaps_update_the_stored_list_by_delta(self):
+        child = self.add_child_with_plan("Ada")
+        meal_plans = MealPlan.objects.filter(child=child)
+        shopping_list_items(meal_plans)
+        meal = Meal.objects.filter(meal_plan__child=child).first()
+        self.client.post(reverse("swap_meal"), {
+            "meal_id": meal.id, "meal_type": "breakfast", "recipe_id": self.recipes[1].id,
+        })
+
+        with self.assertNumQueries(2):
+            items = shopping_list_items(meal_plans)
+        self.assertEqual(items["Oats"], {"quantity": "12 tablespoons"})
+        self.assertEqual(items["Carrot"], {"quantity": "28 cups"})
+
+        # Rebuilding from the meals gives the same list
+        meal_plans.update(shopping_list_version=None)
+        self.assertEqual(shopping_list_items(meal_plans), items)
+
+    def test_removals_delete_items_no_slot_uses(self):
+        child = self.add_child_with_plan("Ada")
+        meal_plans = MealPlan.objects.filter(child=child)
+        shopping_list_items(meal_plans)
+        for meal in Meal.objects.filter(meal_plan__child=child):
+            self.client.post(reverse("remove_meal"), {"meal_id": meal.id, "meal_type": "breakfast"})
+
+        with self.assertNumQueries(2):
+            items = shopping_list_items(meal_plans)
+        self.assertEqual(items, {"Carrot": {"quantity": "21 cups"}})
+        self.assertFalse(ShoppingListItem.objects.filter(ingredient_id="ING-002").exists())
+
+    def test_catalog_changes_from_other_processes_rebuild_the_list(self):
+        child = self.add_child_with_plan("Ada")
+        meal_plans = MealPlan.objects.filter(child=child)
+        shopping_list_items(meal_plans)
+
+        # No signals here, as if another process changed the catalog
+        RecipeIngredient.objects.filter(ingredient_id="ING-002").update(amount_numerator=1)
+        CatalogVersion.objects.update(version=F("version") + 1)
+        self.assertEqual(shopping_list_items(meal_plans)["Oats"], {"quantity": "7 tablespoons"})
+
+
+class QuantityTests(TestCase):
+    def test_quantities_are_parsed_and_summed_exactly(self):
+        self.assertEqual(parse_quantity("1½ pounds (about 5 medium)", "peeled, diced"), (Fraction(3, 2), "lb"))
+        self.assertEqual(parse_quantity("2-3", "medium"), (Fraction(3), ""))
+        self.assertEqual(parse_quantity("as needed", "cup"), (None, "cup"))
+
+        total = QuantitySum()
+        total.add(Fraction(1, 4), "cup")
+        total.add(Fraction(1, 4), "cup")
+        self.assertEqual(str(total), "1/2 cup")
+        total.add(Fraction(2), "tbsp")
+        total.add(Fraction(1), "clove", times=3)
+        self.assertEqual(str(total), "5/8 cup + 3 cloves")
+
+
+# distill's renderer sets ALLOWED_HOSTS = ['*']; keep that out of other tests
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class PrerenderTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+
+    def page(self, path):
+        with open(os.path.join(self.output_dir, path), encoding="utf-8") as file:
+            return file.read()
+
+    def test_only_changed_pages_are_rendered_again(self):
+        rendered, deleted, unchanged = prerender(self.output_dir)
+        self.assertEqual((rendered, deleted, unchanged), (len(self.recipes) + 5, 0, 0))
+        recipe_page = self.page("baby-recipes/REC-0000001/index.html")
+        self.assertIn('"@type": "Recipe"', recipe_page)
+        self.assertNotIn("parent@example.com", recipe_page)
+        self.assertIn("Recipe 1", self.page("baby-recipes/index.html"))
+
+        self.assertEqual(prerender(self.output_dir), (0, 0, len(self.recipes) + 5))
+
+        recipe = self.recipes[1]
+        recipe.title = "Banana Pancakes"
+        recipe.save()
+        self.recipes[2].delete()
+        # The recipe and the index change; the other pages are left alone
+        self.assertEqual(prerender(self.output_dir), (2, 1, (len(self.recipes) - 1) + 5 - 2))
+        self.assertIn("Banana Pancakes", self.page("baby-recipes/REC-0000001/index.html"))
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, "baby-recipes/REC-0000002")))
+
+    def test_forms_on_pre_rendered_pages_can_get_a_fresh_csrf_token(self):
+        self.client.logout()
+        client = self.client_class(enforce_csrf_checks=True)
+        self.assertEqual(client.post(reverse("contact")).status_code, 403)
+
+        response = client.get(reverse("csrf_token"))
+        self.assertIn("no-cache", response["Cache-Control"])
+        token = response.json()["csrfToken"]
+        self.assertEqual(client.post(reverse("contact"), HTTP_X_CSRFTOKEN=token).status_code, 200)
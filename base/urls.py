@@ -5,11 +5,18 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth.views import LogoutView, LoginView
 from django.contrib.auth import views as auth_views
+from django_distill import distill_path
+from .models import Recipe
 
 
+def get_public_recipe_ids():
+    # Recipe ids for distill to pre-render public_recipe with (see prerender.py).
+    # A generator, because distill renders an empty list as one argument-less page.
+    yield from Recipe.objects.order_by('id').values_list('id', flat=True)
+
 
 urlpatterns = [
-    path('', views.landing_page, name='landing_page'),
+    distill_path('', views.landing_page, name='landing_page'),
     path('profile/', views.profile, name='profile'),
     path('add-child/', views.add_child, name='add_child'),
     path('dashboard/', views.dashboard, name='dashboard'),  # Dashboard page
@@ -21,8 +28,12 @@ urlpatterns = [
     path('get-child/<int:child_id>/', views.get_child, name='get_child'),  # Fetch child data
     path('delete-child/<int:child_id>/', views.delete_child, name='delete_child'),  # Delete child
     path('dashboard/swap/<str:recipe_id>/', views.dashboard_swap, name='dashboard_swap'),
+    path('swap-meal/', views.swap_meal, name='swap_meal'),
     path('update_within_week_preferences/', views.update_within_week_preferences, name='update_within_week_preferences'),
     path('regenerate-meal-plan/<int:child_id>/', views.regenerate_meal_plan, name='regenerate_meal_plan'),
+    path('meal-plan-status/<int:child_id>/', views.meal_plan_status, name='meal_plan_status'),
+    path('api/children/<int:child_id>/week/', views.meal_plan_week, name='meal_plan_week'),
+    path('api/autocomplete/', views.autocomplete, name='autocomplete'),
     path("test-email/", test_meal_plan_email, name="test_meal_plan_email"),
     path('shopping-list/', views.shopping_list, name='shopping_list'),
     path('remove-meal/', views.remove_meal, name='remove_meal'),
@@ -39,14 +50,17 @@ urlpatterns = [
     path('stripe/webhook/', views.stripe_webhook, name='stripe_webhook'),
     path('cancel-subscription/', views.cancel_subscription, name='cancel_subscription'),
     path('remove-meal/', views.remove_meal, name='remove_meal'),
-    path('terms/', views.terms_view, name='terms'),
-    path('privacy/', views.privacy_view, name='privacy'),
+    distill_path('terms/', views.terms_view, name='terms'),
+    distill_path('privacy/', views.privacy_view, name='privacy'),
+    distill_path('baby-recipes/', views.public_recipe_index, name='public_recipe_index'),
+    distill_path('baby-recipes/<str:id>/', views.public_recipe, name='public_recipe', distill_func=get_public_recipe_ids),
     path('update-exclude-purees/', views.update_exclude_purees, name='update_exclude_purees'),
     path('contact/', views.contact, name='contact'),
     path('accounts/', include('allauth.urls')),
     path("redirect-after-oauth/", redirect_after_oauth_login, name="redirect_after_oauth_login"),
     path("stripe-oauth-success/", stripe_oauth_success, name="stripe_oauth_success"),
     path("set-plan/", set_plan, name="set-plan"),
+    path("csrf-token/", views.csrf_token, name="csrf_token"),
     path("start-checkout/", start_checkout, name="start_checkout"),
     path("upgrade-required/", views.upgrade_required, name="upgrade_required"),
     path("billing-portal/", views.billing_portal, name="billing_portal"),
@@ -4,11 +4,12 @@ from django.contrib.auth.models import User
 from django.contrib.auth import login, get_user_model
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
-from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
-from django.core.paginator import Paginator
-from django.db.models import Sum
-from .models import Ingredient, Child, Recipe, MealPlan, Meal, RecipeIngredient, UserProfile, PreSignupSocial
+from django.middleware.csrf import get_token
+from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
+from django.views.decorators.cache import cache_control, never_cache
+from django.views.decorators.http import condition, require_GET, require_POST
+from django.db.models import F, Prefetch, Sum
+from .models import Ingredient, Child, Recipe, MealPlan, Meal, MealPlanJob, RecipeIngredient, UserProfile, PreSignupSocial
 from .forms import AddChildForm, WithinWeekPreferencesForm, AcrossWeekPreferencesForm, PreSignupForm  # Import the AddChildForm
 from datetime import datetime, timedelta
 from django.db.models import Q
@@ -28,6 +29,20 @@ from allauth.socialaccount.models import SocialAccount
 from allauth.socialaccount.providers.google.provider import GoogleProvider
 from django.contrib.auth import authenticate
 from .decorators import trial_or_subscribed_required
+from .search import fts_available, search_recipes
+from .autocomplete import KINDS as AUTOCOMPLETE_KINDS, get_prefix_index
+from .catalog import catalog_version_subquery
+from .dietary import allergen_mask
+from .library import AGE_BAND_OPTIONS, AGE_BANDS, MEAL_TYPE_OPTIONS, meal_type_filter, recipe_facets, recipe_page, scored_page
+from .ranking import child_recipe_scores, planned_recipe_ids, rank_recipe_ids
+from .prerender import recipe_json_ld
+from .shopping import shopping_list_items
+from .planner import generate_meal_plan, regenerate_meals_for_plan, week_start_for_offset
+from .dashboard import (
+    RECIPE_SLOTS, dashboard_meals, invalidate_week_fragment, load_dashboard_week, render_week_fragments,
+    serialize_week, slot_data, update_meal_slot, week_etag,
+)
+from .jobs import enqueue_meal_plan, get_meal_plan_status
 
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
@@ -91,83 +106,6 @@ def profile(request):
 
     return render(request, "profile.html", context)
 
-def generate_meal_plan(child_id, week_offset=0):
-    logger.info(f"⚙️ generate_meal_plan called for child_id={child_id}, week_offset={week_offset}")
-    from datetime import timedelta
-    from django.utils.timezone import now
-
-    child = get_object_or_404(Child, id=child_id)
-    dislikes = child.dislikes_ingredients.all()
-    allergies = child.allergies.split(',') if child.allergies else []
-
-    # Determine the start and end of the requested week
-    today = now().date()
-    start_date = today - timedelta(days=today.weekday()) + timedelta(weeks=week_offset)
-    end_date = start_date + timedelta(days=6)
-
-    # Check if a meal plan for this specific week already exists
-    meal_plan, created = MealPlan.objects.get_or_create(
-        child=child, start_date=start_date, end_date=end_date
-    )
-
-    logger.info(f"MealPlan {'created' if created else 'already exists'} for child {child_id} from {start_date} to {end_date}")
-
-    if not created:
-        # If a meal plan already exists, return it
-        return meal_plan
-
-    # Meal assignment logic
-    days = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
-    meal_types = ["Breakfast", "Lunch", "Dinner", "Snack"]
-    profile = child.parent.profile
-
-    for meal_type in meal_types:
-        preferred_level = profile.within_week_preferences.get(meal_type.lower(), "medium").lower()
-        variety_mapping = {"high": (6, 7), "medium": (4, 5), "low": (2, 3), "no": (1, 1)}
-        min_variety, max_variety = variety_mapping.get(preferred_level, (4, 5))
-
-        child_age = child.age_in_months()
-
-        recipe_qs = Recipe.objects.filter(
-            meal_types__name=meal_type,
-            min_age_months__lte=child_age,
-            max_age_months__gte=child_age
-        ).exclude(
-            ingredients__in=dislikes
-        ).exclude(
-            ingredients__allergen_type__in=allergies
-        )
-
-        if profile.exclude_purees:
-            recipe_qs = recipe_qs.exclude(is_puree=True)
-
-        possible_recipes = list(recipe_qs)
-
-        num_unique_recipes = min(len(possible_recipes), random.randint(min_variety, max_variety))
-
-        if num_unique_recipes == 0:
-            print(f"⚠️ No valid recipes found for {meal_type}. Skipping meal plan generation.")
-            continue
-
-        selected_recipes = random.sample(possible_recipes, num_unique_recipes)
-
-        for day_index, day in enumerate(days):
-            if preferred_level == "no":
-                selected_recipe = selected_recipes[0]
-            elif preferred_level == "high":
-                selected_recipe = selected_recipes[day_index % len(selected_recipes)]
-            else:
-                selected_recipe = selected_recipes[(day_index // 2) % len(selected_recipes)]
-
-            meal, _ = Meal.objects.get_or_create(meal_plan=meal_plan, day=day)
-            setattr(meal, meal_type.lower(), selected_recipe)
-            meal.save()
-
-    return meal_plan
-
-
-
-
 # Updated Add Child View (if separate endpoint is still required)
 @login_required
 def add_child(request):
@@ -201,20 +139,19 @@ def add_child(request):
             child.dislikes_ingredients.set(dislikes)
             child.save()
 
-            logger.error(f"✅ Child saved: {child.name}, generating meal plan...")
+            logger.info(f"✅ Child saved: {child.name}, queueing meal plan...")
 
             try:
-                meal_plan = generate_meal_plan(child.id)
-                logger.error("✅ Meal plan generation completed successfully.")
-                meal_plan_created = True
+                enqueue_meal_plan(child, week_start_for_offset(0))
+                meal_plan_queued = True
             except Exception as e:
-                logger.error(f"❌ Meal plan generation failed: {e}")
-                meal_plan_created = False
+                logger.error(f"❌ Queueing meal plan failed: {e}")
+                meal_plan_queued = False
 
             # Return JSON response
             return JsonResponse({
                 'success': True,  # Added this key
-                'meal_plan_created': meal_plan_created,
+                'meal_plan_queued': meal_plan_queued,
                 'name': child.name,
                 'dob': child.dob.strftime('%Y-%m-%d'),
                 'likes_ingredients': list(child.likes_ingredients.values_list('name', flat=True)),
@@ -304,7 +241,6 @@ DUMMY_MEAL_PLAN = [
 @trial_or_subscribed_required
 def dashboard(request):
     user = request.user
-    children = Child.objects.filter(parent=user)
 
     # Determine the week to display (default: current week)
     week_offset = int(request.GET.get("week", 0))
@@ -318,18 +254,29 @@ def dashboard(request):
     previous_week_start = displayed_week_start - timedelta(days=7)
     next_week_available_date = current_week_start + timedelta(days=4)
 
-    # Ensure a meal plan is available for the selected week
-    meal_plans = []
-    for child in children:
-        meal_plan = MealPlan.objects.filter(
-            child=child, start_date=displayed_week_start, end_date=displayed_week_end
-        ).order_by("-created_at").first()
-
-        if not meal_plan:
-            print(f"Generating meal plan for {child.name}, Week Offset: {week_offset}")
-            meal_plan = generate_meal_plan(child.id, week_offset)
+    # Children and plans in a fixed number of queries; meals are only loaded
+    # for plans whose rendered week isn't cached yet
+    children, meal_plans = load_dashboard_week(user, displayed_week_start, prefetch_meals=False)
 
-        meal_plans.append((child, meal_plan))
+    # Queue generation for any child without a meal plan for the selected week;
+    # the page shows a "being prepared" state and polls meal_plan_status.
+    for i, (child, meal_plan) in enumerate(meal_plans):
+        if meal_plan:
+            continue
+        logger.info(f"Queueing meal plan for {child.name}, Week Offset: {week_offset}")
+        job = enqueue_meal_plan(child, displayed_week_start)
+        if job.status == MealPlanJob.STATUS_DONE:
+            # Eager mode already produced the plan
+            meal_plan = MealPlan.objects.filter(child=child, start_date=displayed_week_start).annotate(
+                catalog_version=catalog_version_subquery()
+            ).first()
+            meal_plans[i] = (child, meal_plan)
+
+    week_fragments = render_week_fragments([meal_plan for _, meal_plan in meal_plans if meal_plan], week_offset)
+    meal_plans = [
+        (child, meal_plan, week_fragments.get(meal_plan.pk) if meal_plan else None)
+        for child, meal_plan in meal_plans
+    ]
 
     context = {
         "children": children,
@@ -354,6 +301,20 @@ def meal_plan(request):
     context = {}
     return render(request, 'meal_plan.html', context)
 
+def _library_child(request, children, meal_id):
+    children_by_id = {child.id: child for child in children}
+    child_id = request.GET.get('child', '')
+    if child_id.isdigit() and int(child_id) in children_by_id:
+        return children_by_id[int(child_id)]
+    if meal_id.isdigit():
+        child_id = Meal.objects.filter(
+            id=meal_id, meal_plan__child__parent=request.user
+        ).values_list('meal_plan__child_id', flat=True).first()
+        if child_id in children_by_id:
+            return children_by_id[child_id]
+    return children[0] if children else None
+
+
 @login_required
 @trial_or_subscribed_required
 def recipe_library(request):
@@ -364,29 +325,25 @@ def recipe_library(request):
     swap_mode = request.GET.get('swap', '') == '1'
     meal_type = request.GET.get('meal_type', '')
     day = request.GET.get('day', '')
+    meal_id = request.GET.get('meal_id', '')
+    week_offset = request.GET.get('week', '0')
 
     # Apply search filters
     query = request.GET.get('query', '')
+    ranked = False
     if query:
-        recipes = recipes.filter(
-            Q(title__icontains=query) | 
-            Q(description__icontains=query) | 
-            Q(ingredients__name__icontains=query)
-        )
+        # Ranked full-text search where available (see search.py)
+        recipes = search_recipes(recipes, query)
+        ranked = fts_available()
 
     # Meal type filter
     if meal_type:
-        recipes = recipes.filter(meal_types__name__icontains=meal_type)
+        recipes = recipes.filter(meal_type_filter(meal_type))
 
     # Age range filter
     age_range = request.GET.get('age_range', '')
-    if age_range:
-        if age_range == '6-9':
-            recipes = recipes.filter(min_age_months__gte=6, max_age_months__lte=9)
-        elif age_range == '9-12':
-            recipes = recipes.filter(min_age_months__gte=9, max_age_months__lte=12)
-        elif age_range == '12+':
-            recipes = recipes.filter(min_age_months__gte=12)
+    if age_range in AGE_BANDS:
+        recipes = recipes.filter(AGE_BANDS[age_range])
 
     # Vegetarian and vegan filters
     vegetarian = request.GET.get('vegetarian', '')
@@ -400,29 +357,48 @@ def recipe_library(request):
     # Exclude allergens
     exclude_allergens = request.GET.getlist('exclude_allergens')
     if exclude_allergens:
-        recipes = recipes.exclude(ingredients__allergen_type__in=exclude_allergens)
+        recipes = recipes.alias(
+            excluded_allergens=F('allergen_mask').bitand(allergen_mask(exclude_allergens))
+        ).filter(excluded_allergens=0)
 
-    allergens = Ingredient.objects.exclude(
-        allergen_type__in=['', 'None', 'Gluten-Free']
-    ).values_list('allergen_type', flat=True).distinct()
-    
-    # Pagination
-    paginator = Paginator(recipes.distinct(), 12)  # Show 12 recipes per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-
-    for recipe in page_obj:
-        recipe.has_potential_allergens = recipe.ingredients.filter(
-            allergen_type__isnull=False
-        ).exclude(
-            allergen_type__in=['', 'None', 'Gluten-Free']
-        ).exists()
-
-    # 👶 Get the first child and their age in months
-    children = Child.objects.filter(parent=request.user)
-    selected_child = children.first()
+    # Counts for the filter options, cached per catalog version (see library.py)
+    facets = recipe_facets(recipes, {
+        'query': query,
+        'meal_type': meal_type,
+        'age_range': age_range,
+        'vegetarian': vegetarian,
+        'vegan': vegan,
+        'exclude_allergens': sorted(exclude_allergens),
+    })
+    allergens = [
+        (name, count) for name, count in facets['allergens'].items()
+        if count or name in exclude_allergens
+    ]
+
+    # 👶 The child to browse for: the one picked, the one whose meal is being swapped, or the first
+    children = list(Child.objects.filter(parent=request.user).order_by('id'))
+    selected_child = _library_child(request, children, meal_id)
     child_age_months = selected_child.age_in_months() if selected_child else None
 
+    # Keyset pagination: the links carry a cursor instead of a page number.
+    # "Best for <child>" (the default when swapping) orders by the child's
+    # cached recipe scores instead (see ranking.py)
+    sort = request.GET.get('sort') or ('child' if swap_mode else 'default')
+    after, before = request.GET.get('after'), request.GET.get('before')
+    if sort == 'child' and selected_child:
+        try:
+            week_start = week_start_for_offset(int(week_offset))
+        except ValueError:
+            week_start = week_start_for_offset(0)
+        ranked_keys = rank_recipe_ids(
+            recipes.values_list('id', flat=True),
+            child_recipe_scores(selected_child),
+            planned=planned_recipe_ids(selected_child, week_start),
+        )
+        page_obj = scored_page(ranked_keys, after=after, before=before)
+    else:
+        page_obj = recipe_page(recipes, after=after, before=before, ranked=ranked)
+
     return render(request, 'recipe_library.html', {
         'page_obj': page_obj,
         'query': query,
@@ -430,10 +406,21 @@ def recipe_library(request):
         'age_range': age_range,
         'swap_mode': swap_mode,
         'day': day,
+        'meal_id': meal_id,
+        'week_offset': week_offset,
         'allergens': allergens,
+        'children': children,
         'selected_child': selected_child,
+        'sort': sort,
         'child_age_months': child_age_months,
         'exclude_allergens': exclude_allergens,
+        'facets': facets,
+        'meal_type_options': [
+            (value, label, facets['meal_types'][value]) for value, label in MEAL_TYPE_OPTIONS
+        ],
+        'age_band_options': [
+            (value, label, facets['age_bands'][value]) for value, label in AGE_BAND_OPTIONS
+        ],
     })
 
 @login_required
@@ -442,17 +429,19 @@ def recipe_detail(request, id):
     # Fetch the recipe using the string-based ID
     recipe = get_object_or_404(Recipe, id=id)
     
-    # Split instructions by semicolon if available
-    instructions = recipe.instructions.split(';') if recipe.instructions else []
-    
     # Get swap mode parameters
     swap_mode = request.GET.get('swap', '') == '1'
     meal_type = request.GET.get('meal_type', '')
     day = request.GET.get('day', '')
+    meal_id = request.GET.get('meal_id', '')
+    week_offset = request.GET.get('week', '0')
 
     # Back link handling
     back_link = request.GET.get('from', 'recipe_library')  # Default to recipe library if `from` is not provided
-    back_link_url = f"{back_link}?swap=1&meal_type={meal_type}&day={day}" if swap_mode else back_link
+    back_link_url = (
+        f"{back_link}?swap=1&meal_type={meal_type}&day={day}&week={week_offset}&meal_id={meal_id}"
+        if swap_mode else back_link
+    )
 
     # ✅ Add logic to get the current user's first child (or whichever one makes sense)
     child = request.user.children.first()
@@ -461,20 +450,16 @@ def recipe_detail(request, id):
 
     show_age_modal = child_age_months is not None and recipe.min_age_months > child_age_months
 
-    allergen_ingredients = recipe.ingredients.filter(
-        allergen_type__isnull=False
-    ).exclude(
-        allergen_type__in=['', 'None', 'Gluten-Free']
-    )
-
-    allergen_types = allergen_ingredients.values_list('allergen_type', flat=True).distinct()
+    allergen_types = recipe.allergen_names
 
     return render(request, 'recipe_detail.html', {
         'recipe': recipe,
-        'instructions': instructions,
+        'instructions': recipe.instruction_steps,
         'swap_mode': swap_mode,
         'meal_type': meal_type,
         'day': day,
+        'meal_id': meal_id,
+        'week_offset': week_offset,
         'back_link_url': back_link_url,
         'child_name': child_name,
         'child_age_months': child_age_months,
@@ -483,59 +468,43 @@ def recipe_detail(request, id):
     })
 
 
-
+@login_required
 def dashboard_swap(request, recipe_id):
-    print(f"Received swap request for recipe ID: {recipe_id}")
-    recipe = get_object_or_404(Recipe, id=recipe_id)
+    """Non-JS fallback for swapping from the recipe library: swap the slot, then go back to the dashboard."""
+    recipe = get_object_or_404(Recipe.objects.only('id', 'title'), id=recipe_id)
     meal_type = request.GET.get('meal_type')
     day = request.GET.get('day')
     week_offset = int(request.GET.get('week', 0))  # Get week offset from the request
+    meal_id = request.GET.get('meal_id')
+    dashboard_url = f"{reverse('dashboard')}?week={week_offset}"
 
-    print(f"Meal type: {meal_type}, Day: {day}, Week offset: {week_offset}")
-
-    # Calculate the start and end dates for the targeted week
-    today = timezone.now().date()
-    current_week_start = today - timedelta(days=today.weekday())
-    target_week_start = current_week_start + timedelta(weeks=week_offset)
-    target_week_end = target_week_start + timedelta(days=6)
-
-    print(f"Target week: {target_week_start} to {target_week_end}")
-
-    # Find the corresponding MealPlan for the user and the calculated week
-    meal_plan = MealPlan.objects.filter(
-        child__parent=request.user,
-        start_date=target_week_start,
-        end_date=target_week_end
-    ).first()
-
-    if not meal_plan:
-        print("MealPlan not found.")
-        messages.error(request, "Meal plan not found.")
-        return redirect('dashboard')
-
-    print(f"MealPlan found: {meal_plan}")
-    meal = meal_plan.meals.filter(day=day).first()
-    if not meal:
-        print(f"No meal found for day: {day}")
-        messages.error(request, f"Meal for {day.capitalize()} not found.")
-        return redirect('dashboard')
-
-    print(f"Meal found: {meal}")
-    if meal_type and hasattr(meal, meal_type):
-        old_recipe = getattr(meal, meal_type, None)
-        setattr(meal, meal_type, recipe)
-        meal.save()
-        print(f"Updated meal: {meal_type} swapped to {recipe}")
-        messages.success(
-            request,
-            f"{old_recipe.title if old_recipe else 'Meal'} swapped for {recipe.title} successfully!"
-        )
-    else:
-        print(f"Invalid meal type: {meal_type}")
+    if meal_type not in RECIPE_SLOTS:
         messages.error(request, "Invalid meal type.")
-        return redirect('dashboard')
+        return redirect(dashboard_url)
+
+    old_recipe = None
+    if not meal_id:
+        # Older links only name the day: use the first of the user's plans for that week
+        meal = Meal.objects.select_related(meal_type).filter(
+            meal_plan__child__parent=request.user,
+            meal_plan__start_date=week_start_for_offset(week_offset),
+            day=day,
+        ).order_by('meal_plan_id').first()
+        if not meal:
+            messages.error(request, f"Meal for {(day or '').capitalize()} not found.")
+            return redirect(dashboard_url)
+        meal_id = meal.id
+        old_recipe = getattr(meal, meal_type)
+
+    if not update_meal_slot(request.user, meal_id, meal_type, recipe.id):
+        messages.error(request, "Meal plan not found.")
+        return redirect(dashboard_url)
 
-    return redirect('dashboard')
+    messages.success(
+        request,
+        f"{old_recipe.title if old_recipe else 'Meal'} swapped for {recipe.title} successfully!"
+    )
+    return redirect(dashboard_url)
 
 @login_required
 def update_within_week_preferences(request):
@@ -577,97 +546,94 @@ def regenerate_meal_plan(request, child_id):
     # Retrieve the existing meal plan (ensuring we don’t create a new one)
     meal_plan = get_object_or_404(MealPlan, child=child, start_date=start_date, end_date=end_date)
 
-    # Regenerate the meals while keeping the same meal plan
-    updated_meal_plan = regenerate_meals_for_plan(meal_plan)
-
-    # Print out the updated meals for debugging
-    print(f"\nRegenerated Meal Plan ID: {meal_plan.id}")
-    for meal in updated_meal_plan.meals.all():
-        print(f"Day: {meal.day}, Breakfast: {meal.breakfast}, Lunch: {meal.lunch}, Dinner: {meal.dinner}, Snack: {meal.snack}")
-
-    return JsonResponse({"success": True, "message": "Meal plan regenerated successfully."})
-
-def regenerate_meals_for_plan(meal_plan):
-    """Updates meals inside an existing meal plan without creating a new plan."""
-    child = meal_plan.child
-    dislikes = child.dislikes_ingredients.all()
-    allergies = child.allergies.split(',') if child.allergies else []
-    profile = child.parent.profile
-
-    days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-
-    # Variety mapping
-    variety_levels = {
-        "high": (6, 7),  # Almost no repetition
-        "medium": (4, 5),  # Meals repeat in pairs
-        "low": (2, 3),  # More repetition, every 2 days
-        "no": (1, 1),  # Same meal every day
-    }
-
-    # ✅ Step 1: Remove old meals but keep the meal plan
-    meal_plan.meals.all().delete()
-
-    # ✅ Step 2: Prepare meals across all days
-    meal_assignments = {day: {} for day in days}
-
-    for meal_type in ["Breakfast", "Lunch", "Dinner", "Snack"]:
-        preferred_level = profile.within_week_preferences.get(meal_type.lower(), "medium").lower()
-        min_variety, max_variety = variety_levels.get(preferred_level, (4, 5))
-        num_unique_recipes = random.randint(min_variety, max_variety)
-
-        # Fetch recipes
-        child_age = child.age_in_months()
-
-        # ✅ Build recipe queryset
-        recipe_qs = Recipe.objects.filter(
-            meal_types__name=meal_type,
-            min_age_months__lte=child_age,
-            max_age_months__gte=child_age
-        ).exclude(
-            ingredients__in=dislikes
-        ).exclude(
-            ingredients__allergen_type__in=allergies
-        )
-
-        if profile.exclude_purees:
-            recipe_qs = recipe_qs.exclude(is_puree=True)
-
-        possible_recipes = list(recipe_qs)
+    # Regenerate the meals in the background while keeping the same meal plan
+    job = enqueue_meal_plan(child, meal_plan.start_date, kind=MealPlanJob.KIND_REGENERATE)
 
-        if not possible_recipes:
-            continue  # Skip this meal type if no valid recipes
+    return JsonResponse({
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "message": "Meal plan regeneration started. Your new plan will be ready in a moment.",
+    })
 
-        if len(possible_recipes) < num_unique_recipes:
-            selected_recipes = random.sample(possible_recipes, len(possible_recipes))
-        else:
-            selected_recipes = random.sample(possible_recipes, num_unique_recipes)
 
-        # ✅ Step 3: Assign meals properly across the week
-        i = 0
-        for day_index, day in enumerate(days):
-            # If "no variety," use the same recipe every day
-            if preferred_level == "no":
-                selected_recipe = selected_recipes[0]
-            elif preferred_level == "high":
-                selected_recipe = selected_recipes[day_index % len(selected_recipes)]
-            else:
-                if day_index % 2 == 0 and i < len(selected_recipes) - 1:
-                    i += 1
-                selected_recipe = selected_recipes[i % len(selected_recipes)]
+@login_required
+def meal_plan_status(request, child_id):
+    """Report whether a child's meal plan for the requested week is ready yet."""
+    week_offset = _week_offset(request)
+    if week_offset is None:
+        return JsonResponse({"error": "Invalid week"}, status=400)
+    child = get_object_or_404(Child, id=child_id, parent=request.user)
+    start_date = week_start_for_offset(week_offset)
+    return JsonResponse({
+        "child_id": child.id,
+        "start_date": start_date.isoformat(),
+        "status": get_meal_plan_status(child, start_date),
+    })
 
-            meal_assignments[day][meal_type.lower()] = selected_recipe
+def _week_offset(request):
+    """The ``week`` query parameter as an int, or None if it isn't one."""
+    try:
+        return int(request.GET.get('week', 0))
+    except ValueError:
+        return None
 
-    # ✅ Step 4: Save the new meal assignments
-    for day, meals in meal_assignments.items():
-        Meal.objects.create(meal_plan=meal_plan, day=day, **meals)
 
-    # ✅ Step 5: Print out the updated meal plan for debugging
-    print(f"\n✅ Updated Meal Plan ID: {meal_plan.id}")
-    for meal in meal_plan.meals.all():
-        print(f"Day: {meal.day}, Breakfast: {meal.breakfast}, Lunch: {meal.lunch}, Dinner: {meal.dinner}, Snack: {meal.snack}")
+def _meal_plan_week_etag(request, child_id):
+    week_offset = _week_offset(request)
+    if week_offset is None:
+        return None
+    meal_plan = MealPlan.objects.filter(
+        child_id=child_id, child__parent=request.user, start_date=week_start_for_offset(week_offset),
+    ).annotate(catalog_version=catalog_version_subquery()).values_list('id', 'updated_at', 'catalog_version').first()
+    return week_etag(*meal_plan) if meal_plan else None
 
-    return meal_plan
 
+@login_required
+@require_GET
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_meal_plan_week_etag)
+def meal_plan_week(request, child_id):
+    """
+    A child's week as JSON: every day's meal id and its four recipe slots.
+
+    Responses carry a strong ETag taken from the plan version, so clients can
+    send If-None-Match and get a 304 while the week is unchanged. Weeks
+    without a plan return 404 with the generation status.
+    """
+    week_offset = _week_offset(request)
+    if week_offset is None:
+        return JsonResponse({"error": "Invalid week"}, status=400)
+    child = get_object_or_404(Child, id=child_id, parent=request.user)
+    start_date = week_start_for_offset(week_offset)
+    meal_plan = MealPlan.objects.prefetch_related(
+        Prefetch('meals', queryset=dashboard_meals())
+    ).filter(child=child, start_date=start_date).first()
+    if not meal_plan:
+        return JsonResponse({
+            "child_id": child.id,
+            "start_date": start_date.isoformat(),
+            "status": get_meal_plan_status(child, start_date),
+        }, status=404)
+    return JsonResponse({"week_offset": week_offset, **serialize_week(meal_plan)})
+
+@require_GET
+@cache_control(public=True, max_age=300)
+def autocomplete(request):
+    """
+    Typeahead suggestions for recipe titles and ingredient names as JSON.
+
+    Served from the in-memory prefix index (see autocomplete.py) and
+    deliberately public: no session or user lookup, so no database query.
+    ``type`` limits results to recipes or ingredients.
+    """
+    query = request.GET.get('q', '')[:100]
+    kinds = [request.GET['type']] if request.GET.get('type') in AUTOCOMPLETE_KINDS else AUTOCOMPLETE_KINDS
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 25)
+    except ValueError:
+        limit = 10
+    return JsonResponse({"query": query, "results": get_prefix_index().complete(query, kinds, limit)})
 
 def test_meal_plan_email(request):
     meal_plan = {
@@ -692,7 +658,6 @@ def test_meal_plan_email(request):
 @trial_or_subscribed_required
 def shopping_list(request):
     user = request.user
-    ingredients = {}
 
     # Handle week offset for navigation
     week_offset = int(request.GET.get('week', 0))
@@ -707,27 +672,7 @@ def shopping_list(request):
         end_date=displayed_week_end
     )
 
-    for meal_plan in meal_plans:
-        for meal in meal_plan.meals.all():  # Iterate through each meal
-            for meal_type in ['breakfast', 'lunch', 'dinner', 'snack']:
-                recipe = getattr(meal, meal_type, None)
-                if recipe:
-                    recipe_ingredients = RecipeIngredient.objects.filter(recipe=recipe)
-                    for item in recipe_ingredients:
-                        name = item.ingredient.name
-                        quantity = item.quantity
-                        unit = item.unit
-
-                        # Aggregate duplicate ingredients
-                        if name in ingredients:
-                            if ingredients[name]['unit'] == unit:
-                                ingredients[name]['quantity'] += quantity
-                            else:
-                                # Handle unit mismatch gracefully
-                                ingredients[name]['quantity'] += quantity
-                                ingredients[name]['unit'] = f"{ingredients[name]['unit']} / {unit}"
-                        else:
-                            ingredients[name] = {'quantity': quantity, 'unit': unit}
+    ingredients = shopping_list_items(meal_plans)
 
     context = {
         'ingredients': ingredients,
@@ -739,22 +684,52 @@ def shopping_list(request):
     return render(request, 'shopping_list.html', context)
 
 
+def _slot_params(request):
+    """``(meal_id, week_offset)`` from a swap or remove POST, or None if either isn't an integer."""
+    try:
+        return int(request.POST.get('meal_id', '')), int(request.POST.get('week', 0))
+    except ValueError:
+        return None
+
+
 @login_required
 @require_POST
 def remove_meal(request):
-    meal_id = request.POST.get('meal_id')
+    """Clear one recipe slot and return the slot's new render data for the dashboard to patch in place."""
+    params = _slot_params(request)
     meal_type = request.POST.get('meal_type')
 
-    if not meal_id or not meal_type:
-        return JsonResponse({'success': False, 'error': 'Missing parameters.'}, status=400)
+    if not params or meal_type not in RECIPE_SLOTS:
+        return JsonResponse({'success': False, 'error': 'Missing or invalid meal ID, type or week'}, status=400)
+    meal_id, week_offset = params
 
-    try:
-        meal = Meal.objects.get(id=meal_id, meal_plan__child__parent=request.user)
-        setattr(meal, meal_type, None)
-        meal.save()
-        return JsonResponse({'success': True})
-    except Meal.DoesNotExist:
-        return JsonResponse({'success': False, 'error': 'Meal not found.'}, status=404)
+    if not update_meal_slot(request.user, meal_id, meal_type, None):
+        return JsonResponse({'success': False, 'error': 'Meal not found'}, status=404)
+
+    slot = slot_data(meal_id, request.POST.get('day', ''), meal_type, None, week_offset)
+    return JsonResponse({'success': True, 'slot': slot})
+
+
+@login_required
+@require_POST
+def swap_meal(request):
+    """Put a recipe in one meal slot and return the slot's new render data."""
+    params = _slot_params(request)
+    meal_type = request.POST.get('meal_type')
+    recipe_id = request.POST.get('recipe_id')
+
+    if not params or not recipe_id or meal_type not in RECIPE_SLOTS:
+        return JsonResponse({'success': False, 'error': 'Missing or invalid meal ID, type, recipe or week'}, status=400)
+    meal_id, week_offset = params
+
+    recipe = Recipe.objects.only('id', 'title').filter(id=recipe_id).first()
+    if not recipe:
+        return JsonResponse({'success': False, 'error': 'Recipe not found'}, status=404)
+    if not update_meal_slot(request.user, meal_id, meal_type, recipe.id):
+        return JsonResponse({'success': False, 'error': 'Meal not found'}, status=404)
+
+    slot = slot_data(meal_id, request.POST.get('day', ''), meal_type, recipe, week_offset)
+    return JsonResponse({'success': True, 'slot': slot})
 
 class PreSignupView(View):
     def get(self, request):
@@ -988,36 +963,6 @@ def cancel_subscription(request):
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
-@login_required
-@require_POST
-def remove_meal(request):
-    meal_id = request.POST.get('meal_id')
-    meal_type = request.POST.get('meal_type')
-
-    if not meal_id or not meal_type:
-        return JsonResponse({'success': False, 'error': 'Missing meal ID or type'})
-
-    try:
-        meal = Meal.objects.get(id=meal_id)
-        if meal_type == 'breakfast':
-            meal.breakfast = None
-        elif meal_type == 'lunch':
-            meal.lunch = None
-        elif meal_type == 'dinner':
-            meal.dinner = None
-        elif meal_type == 'snack':
-            meal.snack = None
-        else:
-            return JsonResponse({'success': False, 'error': 'Invalid meal type'})
-
-        meal.save()
-
-        # Optional: trigger shopping list update logic here
-
-        return JsonResponse({'success': True})
-    except Meal.DoesNotExist:
-        return JsonResponse({'success': False, 'error': 'Meal not found'})
-
 
 def terms_view(request):
     return render(request, 'terms.html')
@@ -1025,6 +970,25 @@ def terms_view(request):
 def privacy_view(request):
     return render(request, 'privacy.html')
 
+def public_recipe_index(request):
+    recipes = Recipe.objects.only('id', 'title', 'image', 'min_age_months', 'max_age_months').order_by('title')
+    return render(request, 'public_recipe_index.html', {'recipes': recipes})
+
+def public_recipe(request, id):
+    # Public, indexable version of recipe_detail; pre-rendered to static HTML (see prerender.py)
+    recipe = get_object_or_404(Recipe, id=id)
+    meal_types = list(recipe.meal_types.all())
+    ingredients = list(recipe.recipeingredient_set.select_related('ingredient').order_by('id'))
+
+    return render(request, 'public_recipe.html', {
+        'recipe': recipe,
+        'meal_types': meal_types,
+        'ingredients': ingredients,
+        'allergen_types': recipe.allergen_names,
+        'site_url': settings.PUBLIC_SITE_URL.rstrip('/'),
+        'recipe_json_ld': recipe_json_ld(recipe, ingredients, meal_types),
+    })
+
 @login_required
 @require_POST
 def update_exclude_purees(request):
@@ -1096,6 +1060,19 @@ def stripe_oauth_success(request):
 
     return redirect('profile')
 
+@require_GET
+@never_cache
+@ensure_csrf_cookie
+def csrf_token(request):
+    """
+    A fresh CSRF token as JSON, and the matching csrftoken cookie.
+
+    Pre-rendered pages (see prerender.py) carry a token from render time that
+    matches no visitor's cookie, so their forms fetch one from here before
+    posting.
+    """
+    return JsonResponse({"csrfToken": get_token(request)})
+
 @require_POST
 @csrf_exempt  # Optional if CSRF token is properly passed; safer to keep it enabled
 def set_plan(request):
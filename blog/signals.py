@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from base.images import ensure_derivatives
+from .models import Post
+
+
+@receiver(post_save, sender=Post)
+def resize_post_image(sender, instance, **kwargs):
+    """Signal to create the resized copies of a newly uploaded post image."""
+    if not kwargs.get('raw'):
+        ensure_derivatives(instance.image)
@@ -8,9 +8,18 @@ document.addEventListener("DOMContentLoaded", () => {
     }
 });
 
-function showAdditionalFields() {
+function fetchCsrfToken() {
+    // Pre-rendered copies of this page carry a token from render time that
+    // matches no visitor's cookie, so ask for a fresh token (and cookie)
+    return fetch("/csrf-token/", { credentials: "same-origin" })
+        .then((response) => response.json())
+        .then((data) => data.csrfToken)
+        .catch(() => document.querySelector("#csrf-token").value);
+}
+
+async function showAdditionalFields() {
     const signupFormContainer = document.querySelector("#signup-form");
-    const csrfToken = document.querySelector("#csrf-token").value;
+    const csrfToken = await fetchCsrfToken();
 
     if (signupFormContainer) {
         signupFormContainer.innerHTML = `
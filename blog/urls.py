@@ -1,12 +1,21 @@
 from django.conf import settings
 from django.conf.urls.static import static
 from django.urls import path, include
+from django_distill import distill_path
 from . import views
+from .models import Post
+
+
+def get_published_slugs():
+    # Published posts for distill to pre-render blog_post with (see base/prerender.py).
+    # A generator, because distill renders an empty list as one argument-less page.
+    yield from Post.objects.filter(is_published=True).values_list('slug', flat=True)
+
 
 urlpatterns = [
     path('test-blog-post/', views.test_blog_post, name='test_blog_post'),
-    path('', views.post_list, name='post_list'),  # Blog homepage
-    path('<slug:slug>/', views.blog_post, name='blog_post'),  # Individual post page
+    distill_path('', views.post_list, name='post_list'),  # Blog homepage
+    distill_path('<slug:slug>/', views.blog_post, name='blog_post', distill_func=get_published_slugs),  # Individual post page
     path('email_signup/', views.email_signup, name='email_signup'),  # Route for form processing
     path('tinymce/', include('tinymce.urls')),
 ]
@@ -1,54 +1,130 @@
 document.addEventListener('DOMContentLoaded', () => {
     console.log('Dashboard JS loaded.');
 
-    document.querySelectorAll('.remove-meal-link').forEach(link => {
-        link.addEventListener('click', function (e) {
-            e.preventDefault();
+    // Poll plans that are still being prepared and reload once they're ready
+    const POLL_INTERVAL_MS = 2000;
+    const MAX_POLLS = 60;
 
-            if (!confirm("Are you sure you want to remove this meal?")) return;
+    document.querySelectorAll('.meal-plan-preparing').forEach(section => {
+        const statusUrl = section.dataset.statusUrl;
+        let polls = 0;
 
-            const mealId = this.dataset.mealId;
-            const mealType = this.dataset.mealType;
-            const url = this.dataset.url;
+        const poll = () => {
+            polls += 1;
+            fetch(statusUrl, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+                .then(response => {
+                    if (!response.ok) throw new Error('Request failed');
+                    return response.json();
+                })
+                .then(data => {
+                    if (data.status === 'ready') {
+                        location.reload();
+                    } else if (data.status === 'failed') {
+                        section.querySelector('.preparing-message').textContent =
+                            "We couldn't prepare this meal plan. Please refresh the page to try again.";
+                    } else if (polls < MAX_POLLS) {
+                        setTimeout(poll, POLL_INTERVAL_MS);
+                    }
+                })
+                .catch(err => console.error('Error checking meal plan status:', err));
+        };
 
-            console.log('Clicked remove for:', mealId, mealType, url);
+        setTimeout(poll, POLL_INTERVAL_MS);
+    });
 
-            const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]')?.value;
+    // Redraw one recipe slot (table cell and day card) from the JSON the
+    // swap/remove endpoints return, instead of reloading the page.
+    const makeLink = (href, className, html) => {
+        const link = document.createElement('a');
+        link.href = href;
+        link.className = className;
+        link.innerHTML = html;
+        return link;
+    };
 
-            if (!csrfToken) {
-                console.error('CSRF token not found');
-                alert('CSRF token missing');
-                return;
-            }
+    const renderSlot = (container, slot) => {
+        const isCard = container.classList.contains('day-card');
+        const heading = container.querySelector('h4');
+        container.replaceChildren(...(heading ? [heading] : []));
 
-            fetch(url, {
-                method: 'POST',
-                headers: {
-                    'X-CSRFToken': csrfToken,
-                    'Content-Type': 'application/x-www-form-urlencoded'
-                },
-                body: new URLSearchParams({
-                    'meal_id': mealId,
-                    'meal_type': mealType
-                })
-            })
-            .then(response => {
-                if (!response.ok) throw new Error('Request failed');
-                return response.json();
-            })
-            .then(data => {
-                if (data.success) {
-                    console.log('Meal removed successfully.');
-                    location.reload();
-                } else {
-                    console.error('Failed to remove meal:', data.error);
-                    alert('Error removing meal: ' + (data.error || 'Unknown error'));
-                }
+        if (!slot.recipe) {
+            container.append(makeLink(slot.swap_url, 'select-meal-link', '<em>Select Meal</em>'));
+            return;
+        }
+
+        const title = makeLink(slot.recipe.url, 'recipe-title-link', '');
+        if (isCard) {
+            title.textContent = slot.recipe.title;
+        } else {
+            const strong = document.createElement('strong');
+            strong.textContent = slot.recipe.title;
+            title.append(strong);
+        }
+
+        const actions = document.createElement('div');
+        actions.className = 'quick-actions';
+        const remove = makeLink('#', 'remove-meal-link', 'Remove Meal <i class="bi bi-x-circle"></i>');
+        Object.assign(remove.dataset, {
+            mealId: slot.meal_id, mealType: slot.meal_type, day: slot.day, week: slot.week_offset, url: removeUrl
+        });
+        actions.append(
+            makeLink(slot.swap_url, 'swap-meal-link', isCard ? 'Swap Meal' : 'Swap Meal <i class="bi bi-arrow-repeat"></i>'),
+            remove
+        );
+        container.append(title, ...(isCard ? [] : [document.createElement('br')]), actions);
+    };
+
+    const patchSlot = slot => {
+        document.querySelectorAll(`[data-slot="${slot.meal_id}-${slot.meal_type}"]`)
+            .forEach(container => renderSlot(container, slot));
+    };
+
+    let removeUrl = document.querySelector('.remove-meal-link')?.dataset.url;
+
+    // Remove links are redrawn by renderSlot, so listen on the document
+    document.addEventListener('click', event => {
+        const link = event.target.closest('.remove-meal-link');
+        if (!link) return;
+        event.preventDefault();
+
+        if (!confirm("Are you sure you want to remove this meal?")) return;
+
+        const { mealId, mealType, day, week, url } = link.dataset;
+        removeUrl = url;
+
+        const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]')?.value;
+
+        if (!csrfToken) {
+            console.error('CSRF token not found');
+            alert('CSRF token missing');
+            return;
+        }
+
+        fetch(url, {
+            method: 'POST',
+            headers: {
+                'X-CSRFToken': csrfToken,
+                'Content-Type': 'application/x-www-form-urlencoded'
+            },
+            body: new URLSearchParams({
+                'meal_id': mealId,
+                'meal_type': mealType,
+                'day': day,
+                'week': week
             })
-            .catch(err => {
-                console.error('Error during removal:', err);
-                alert('Something went wrong.');
-            });
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                patchSlot(data.slot);
+            } else {
+                console.error('Failed to remove meal:', data.error);
+                alert('Error removing meal: ' + (data.error || 'Unknown error'));
+            }
+        })
+        .catch(err => {
+            console.error('Error during removal:', err);
+            alert('Something went wrong.');
         });
     });
 });
@@ -85,10 +85,10 @@ document.addEventListener('DOMContentLoaded', function () {
             })
             .then(data => {
                 if (data.success) {
-                    if (data.meal_plan_created) {
+                    if (data.meal_plan_queued) {
                         location.reload();
                     } else {
-                        alert("Child added, but meal plan generation failed. Please try again or edit preferences.");
+                        alert("Child added, but we couldn't start preparing their meal plan. Please try again or edit preferences.");
                     }
                 } else {
                     console.error('Error adding child:', data.error);
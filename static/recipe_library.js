@@ -1,14 +1,52 @@
 document.addEventListener('DOMContentLoaded', function () {
     const filterForm = document.getElementById('filter-form');
 
-    // Attach change event listeners to form inputs
-    const filterInputs = filterForm.querySelectorAll('input, select');
-    filterInputs.forEach(input => {
-        input.addEventListener('change', () => {
-            applyFilters();
-        });
+    // Listen on the form, so filter options redrawn by updateFacets keep working
+    filterForm.addEventListener('change', () => {
+        applyFilters();
     });
 
+    // Typeahead: suggest recipe titles and ingredient names while typing
+    const searchInput = filterForm.querySelector('[data-autocomplete-url]');
+    const suggestions = document.getElementById('search-suggestions');
+    let suggestTimer = null;
+    if (searchInput && suggestions) {
+        searchInput.addEventListener('input', () => {
+            clearTimeout(suggestTimer);
+            suggestTimer = setTimeout(() => {
+                const query = searchInput.value.trim();
+                if (!query) {
+                    suggestions.innerHTML = '';
+                    return;
+                }
+                fetch(`${searchInput.dataset.autocompleteUrl}?q=${encodeURIComponent(query)}`)
+                    .then(response => response.json())
+                    .then(data => {
+                        if (searchInput.value.trim() !== data.query) return;  // a newer request is on its way
+                        suggestions.innerHTML = '';
+                        data.results.forEach(result => {
+                            const option = document.createElement('option');
+                            option.value = result.label;
+                            suggestions.appendChild(option);
+                        });
+                    })
+                    .catch(error => {
+                        console.error("Error fetching suggestions:", error);
+                    });
+            }, 150);
+        });
+    }
+
+    // Refresh the filter options and their result counts from a fetched page
+    function updateFacets(doc) {
+        const newFacets = doc.querySelectorAll('[data-facets]');
+        document.querySelectorAll('[data-facets]').forEach((element, i) => {
+            if (newFacets[i]) {
+                element.innerHTML = newFacets[i].innerHTML;
+            }
+        });
+    }
+
     function applyFilters() {
         // Collect filter data from the form
         const formData = new FormData(filterForm);
@@ -56,6 +94,8 @@ document.addEventListener('DOMContentLoaded', function () {
                 oldPagination.innerHTML = newPagination.innerHTML;
             }
 
+            updateFacets(doc);
+
             // Update allergen alert
             const newAlert = doc.querySelector('.alert.alert-warning');
             const oldAlert = document.querySelector('.alert.alert-warning');
@@ -76,6 +116,46 @@ document.addEventListener('DOMContentLoaded', function () {
         });
     }
 
+    // In swap mode, swap the slot with one small request and head back to the
+    // dashboard; the link's href stays as the no-JS fallback. The library is a
+    // page of its own, so there is no week grid here to patch the returned
+    // slot into: the dashboard is loaded again, and only the changed plan's
+    // grid misses the fragment cache. replace() keeps the finished swap out of
+    // the back button's history.
+    document.addEventListener('click', event => {
+        const button = event.target.closest('.select-recipe-button[data-swap-url]');
+        if (!button) return;
+        event.preventDefault();
+
+        const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]')?.value;
+        fetch(button.dataset.swapUrl, {
+            method: 'POST',
+            headers: {
+                'X-CSRFToken': csrfToken,
+                'Content-Type': 'application/x-www-form-urlencoded'
+            },
+            body: new URLSearchParams({
+                'meal_id': button.dataset.mealId,
+                'meal_type': button.dataset.mealType,
+                'recipe_id': button.dataset.recipeId,
+                'day': button.dataset.day,
+                'week': button.dataset.week
+            })
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                window.location.replace(button.dataset.dashboardUrl);
+            } else {
+                alert('Error swapping meal: ' + (data.error || 'Unknown error'));
+            }
+        })
+        .catch(error => {
+            console.error("Error swapping meal:", error);
+            window.location.href = button.href;
+        });
+    });
+
     // Handle browser back/forward buttons
     window.addEventListener('popstate', () => {
         fetch(window.location.href, {
@@ -108,6 +188,8 @@ document.addEventListener('DOMContentLoaded', function () {
                 oldPagination.innerHTML = newPagination.innerHTML;
             }
 
+            updateFacets(doc);
+
             // Update allergen alert
             const newAlert = doc.querySelector('.alert.alert-warning');
             const oldAlert = document.querySelector('.alert.alert-warning');
@@ -98,6 +98,33 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR.parent / 'db.sqlite3',
+        'OPTIONS': {
+            # Seconds a writer waits for the write lock held by another
+            # (e.g. the pregenerate_meal_plans worker pool). Transactions
+            # that read before writing take the lock up front with
+            # planner.write_transaction.
+            'timeout': 20,
+        },
+    }
+}
+
+
+# Cache for dashboard week fragments, library facet counts and so on. The
+# catalog version these are keyed on lives in the database (see catalog.py).
+# CACHE_BACKEND picks the backend: "locmem" (default, per process), "file"
+# (CACHE_LOCATION is a directory) or "redis" (CACHE_LOCATION is a redis://
+# URL; any Redis-compatible server works).
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'tottable'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR.parent / 'cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379'),
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.getenv('CACHE_LOCATION', CACHE_BACKENDS[CACHE_BACKEND][1]),
     }
 }
 
@@ -152,6 +179,39 @@ MEDIA_ROOT = BASE_DIR.parent / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Meal plan job queue: views queue generation and return at once; the
+# run_meal_plan_jobs worker runs the jobs. MEAL_PLAN_JOBS_EAGER=True runs them
+# inline in the request instead (development settings turn it on)
+MEAL_PLAN_JOBS_EAGER = os.getenv('MEAL_PLAN_JOBS_EAGER', 'False') == 'True'
+
+# Meal planner candidate pools, memoized per constraint signature and
+# discarded whenever the recipe catalog changes
+CANDIDATE_POOL_CACHE_SIZE = 1024
+CANDIDATE_POOL_CACHE_TTL = 600  # seconds
+
+# Autocomplete prefix index: how often a process checks the catalog version
+# for changes made by other processes (its own changes apply at once)
+AUTOCOMPLETE_VERSION_CHECK_INTERVAL = 30  # seconds
+
+# Rendered dashboard week grids; entries are keyed on the plan's updated_at,
+# so edits never serve a stale grid and old entries just expire
+DASHBOARD_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24  # seconds
+
+# Recipe library facet counts; keyed on the catalog version and filters
+LIBRARY_FACET_CACHE_TIMEOUT = 60 * 60  # seconds
+
+# Per-child recipe scores for the library's "best for" ordering; keyed on the
+# child's preferences version, so edits take effect immediately
+CHILD_RANKING_CACHE_TIMEOUT = 60 * 60 * 24  # seconds
+
+# Static HTML copies of the public pages (landing, legal, blog, public recipe
+# pages), written by prerender_pages / distill-local for nginx to serve to
+# visitors without a session cookie
+DISTILL_DIR = BASE_DIR.parent / 'prerendered'
+
+# Absolute origin for canonical links and structured data on public pages
+PUBLIC_SITE_URL = os.getenv('PUBLIC_SITE_URL', 'https://tottable.com')
+
 # Login/Logout redirects
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = '/'
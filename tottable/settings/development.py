@@ -1,7 +1,11 @@
 from .base import *
 import logging
+import os
 
 DEBUG = True
+
+# Run meal plan jobs inline, so no run_meal_plan_jobs worker is needed locally
+MEAL_PLAN_JOBS_EAGER = os.getenv('MEAL_PLAN_JOBS_EAGER', 'True') == 'True'
 ALLOWED_HOSTS = ['127.0.0.1', 'localhost', 'cb47-62-167-164-221.ngrok-free.app']
 
 LOGGING = {